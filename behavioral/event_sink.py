@@ -0,0 +1,228 @@
+'''
+In this module, we define where the examples in this folder send their output.
+
+The devices in `mediator.py` and the users in `observer.py` report every state change or
+notification as a small structured record (source, event, values) instead of calling print().
+The active sink decides what happens with the records:
+- ConsoleSink: prints the same text as before (the default).
+- NullSink: does nothing, for benchmarks and large simulations.
+- RingBufferSink: keeps the latest records in memory.
+- BatchedWriterSink: writes JSON lines to a file in batches, on a background thread.
+
+The sink is selected in one place: call set_sink() (or use the `using_sink()` context manager),
+or set the environment variable EVENT_SINK to 'console', 'null', 'ring' or 'jsonl:<path>'.
+The sink of EVENT_SINK is only created by the first record, so importing this module opens no file.
+'''
+
+
+from abc import ABC, abstractmethod
+import atexit
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+_log = logging.getLogger(__name__)
+
+
+# This class is one structured output record.
+# template is the console text with `{}` placeholders for the values.
+class EventRecord:
+    __slots__ = ('timestamp', 'source', 'event', 'template', 'values')
+
+    def __init__(self, timestamp: float, source: str, event: str, template: str, values: tuple) -> None:
+        self.timestamp = timestamp
+        self.source = source
+        self.event = event
+        self.template = template
+        self.values = values
+
+    @property
+    def text(self) -> str:
+        return self.template.format(*self.values)
+
+    def to_dict(self) -> dict:
+        return {'timestamp': self.timestamp, 'source': self.source, 'event': self.event, 'values': list(self.values)}
+
+    def __repr__(self) -> str:
+        return f'EventRecord({self.source!r}, {self.event!r}, {self.values!r})'
+
+
+# The base class of the sinks. emit_batch handles many records of the same kind at once.
+class EventSink(ABC):
+    @abstractmethod
+    def emit(self, source: str, event: str, template: str, *values) -> None:
+        pass
+
+    def emit_batch(self, source: str, event: str, template: str, rows: object) -> None:
+        for values in rows:
+            self.emit(source, event, template, *values)
+
+    def close(self) -> None:
+        pass
+
+
+# This sink prints the record text, exactly like the print() calls it replaces.
+class ConsoleSink(EventSink):
+    def __init__(self, stream: object=None) -> None:
+        # stream: where to write. By default the current sys.stdout at the time of each call.
+        self.stream = stream
+
+    def emit(self, source: str, event: str, template: str, *values) -> None:
+        print(template.format(*values), file=self.stream or sys.stdout)
+
+    def emit_batch(self, source: str, event: str, template: str, rows: object) -> None:
+        # One write for the whole batch.
+        print('\n'.join(template.format(*values) for values in rows), file=self.stream or sys.stdout)
+
+
+# This sink does nothing.
+class NullSink(EventSink):
+    def emit(self, source: str, event: str, template: str, *values) -> None:
+        pass
+
+    def emit_batch(self, source: str, event: str, template: str, rows: object) -> None:
+        pass
+
+
+# This sink keeps the latest `capacity` records in memory (older records are dropped).
+class RingBufferSink(EventSink):
+    def __init__(self, capacity: int=10_000) -> None:
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, source: str, event: str, template: str, *values) -> None:
+        self.records.append(EventRecord(time.time(), source, event, template, values))
+
+    def emit_batch(self, source: str, event: str, template: str, rows: object) -> None:
+        now = time.time()
+        self.records.extend(EventRecord(now, source, event, template, values) for values in rows)
+
+    def texts(self) -> list:
+        # The console text of the records in the buffer.
+        return [record.text for record in self.records]
+
+
+# This sink writes records as JSON lines. emit only appends to a pending list;
+# a background thread writes the pending records every `flush_interval` seconds
+# or as soon as `batch_size` records are waiting. The sink is closed at exit if it is still open,
+# so the pending records are not lost. A batch that cannot be written is logged and counted in `failed`.
+class BatchedWriterSink(EventSink):
+    def __init__(self, path: str, batch_size: int=4096, flush_interval: float=0.5) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0 # Number of records written to the file.
+        self.failed = 0 # Number of records in batches that could not be written.
+        self._file = open(path, 'a', encoding='utf-8')
+        self._pending = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name='event-sink-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def emit(self, source: str, event: str, template: str, *values) -> None:
+        with self._condition:
+            self._pending.append((time.time(), source, event, values))
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def emit_batch(self, source: str, event: str, template: str, rows: object) -> None:
+        now = time.time()
+        with self._condition:
+            self._pending.extend((now, source, event, values) for values in rows)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                closed = self._closed
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception: # e.g. a full disk. The thread keeps going, so the next batches are still written.
+                    self.failed += len(batch)
+                    _log.exception('Could not write %d event records to %s.', len(batch), self.path)
+            if closed:
+                return
+
+    def _write(self, batch: list) -> None:
+        dumps = json.JSONEncoder(default=str, separators=(',', ':')).encode
+        self._file.write(''.join(
+            dumps({'timestamp': timestamp, 'source': source, 'event': event, 'values': values}) + '\n'
+            for timestamp, source, event, values in batch
+        ))
+        self._file.flush()
+        self.written += len(batch)
+
+    def close(self) -> None:
+        # Write every pending record and close the file.
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        atexit.unregister(self.close)
+        self._writer.join()
+        self._file.close()
+
+
+# Create a sink from its name: 'console', 'null', 'ring' or 'jsonl:<path>'.
+def sink_from_name(name: str) -> EventSink:
+    if name == 'console':
+        return ConsoleSink()
+    if name == 'null':
+        return NullSink()
+    if name == 'ring':
+        return RingBufferSink()
+    if name.startswith('jsonl:'):
+        return BatchedWriterSink(name[len('jsonl:'):])
+    raise ValueError(f"Unknown event sink {name!r}. Use 'console', 'null', 'ring' or 'jsonl:<path>'.")
+
+
+_sink = None # Created from EVENT_SINK by the first get_sink() (or emit) if set_sink() was not called.
+_sink_lock = threading.Lock()
+
+
+def get_sink() -> EventSink:
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = sink_from_name(os.environ.get('EVENT_SINK', 'console'))
+    return _sink
+
+
+# Select the sink used by every example. Returns the previous sink(None if no sink was used yet).
+def set_sink(sink: EventSink) -> EventSink:
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+# Use a sink only inside a `with` block.
+@contextlib.contextmanager
+def using_sink(sink: EventSink):
+    previous = set_sink(sink)
+    try:
+        yield sink
+    finally:
+        set_sink(previous)
+
+
+# Send one record to the active sink. This is what the examples call instead of print().
+def emit(source: str, event: str, template: str, *values) -> None:
+    (_sink or get_sink()).emit(source, event, template, *values)
+
+
+# Send many records of the same kind to the active sink.
+def emit_batch(source: str, event: str, template: str, rows: object) -> None:
+    (_sink or get_sink()).emit_batch(source, event, template, rows)
@@ -0,0 +1,286 @@
+'''
+In this module, we define the metrics(counters, histograms and timing spans) of the examples.
+
+The hot paths are instrumented by replacing methods: a module registers an instrumented version
+of a method with `METRICS.patch(owner, name, replacement)`, and the replacement is only installed
+while the metrics are enabled. When they are disabled the original method is restored, so the
+disabled cost is zero: the instrumented code does not even check a flag.
+The instrumented methods are:
+- `Channel.send_message`(observer.py): messages and deliveries per channel, and the time of each
+  follower's `channel_updated`(per follower class: a label per user would make a series per user).
+- the `SmartHomeHub` routines(mediator.py): runs and time per routine, and the device commands really sent.
+- `create_instance` of every `VehicleFactory`(creational/factory_method.py): instances and time per factory.
+  The creational folder does not import this module: `factory_method.instrument_factories(metrics)` registers
+  them, and `METRICS.instrument_modules()` calls it once both modules are imported(in either order).
+
+Counters count every call. Timing is sampled: a `sample_rate` share of the calls is timed, because
+reading the clock costs more than incrementing a counter.
+
+Enable the metrics with `METRICS.enable(sample_rate)`, or set the environment variable
+INSTRUMENTATION_SAMPLE_RATE(e.g. to 0.01). `METRICS.to_prometheus()` returns a snapshot in the Prometheus
+text format, `write_prometheus(path)` writes it to a file and `serve(port)` serves it over HTTP.
+'''
+
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+# The modules of other folders that register their instrumented methods themselves: module name -> the name of
+# the function that takes the Metrics object. They are found in `sys.modules`, so they are never imported from here.
+INSTRUMENTED_MODULES = {'factory_method': 'instrument_factories'}
+
+# The upper bounds of the default histogram buckets, in seconds(from 1 microsecond to 1 second).
+DEFAULT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0)
+
+
+def _escape(value: object) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str='') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+# A counter of events, with one value per combination of label values.
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: tuple=()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {} # label values -> count.
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float=1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.label_names, labels)} {value}' for labels, value in values]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+# A histogram of observed values(e.g. durations in seconds), with one histogram per combination of label values.
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, label_names: tuple=(), buckets: tuple=DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {} # label values -> [counts per bucket(the last one is +Inf), sum].
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    # The number of observations and their sum.
+    def totals(self, *label_values) -> tuple:
+        entry = self._values.get(label_values)
+        return (sum(entry[0]), entry[1]) if entry is not None else (0, 0.0)
+
+    def samples(self) -> list:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _format_labels(self.label_names, labels, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+# Times the body of a `with` block into a histogram, if the call is sampled.
+class Span:
+    __slots__ = ('histogram', 'label_values', '_start')
+
+    def __init__(self, histogram: Histogram, label_values: tuple, sampled: bool) -> None:
+        self.histogram = histogram
+        self.label_values = label_values
+        self._start = time.perf_counter() if sampled else None
+
+    def __enter__(self) -> 'Span':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._start is not None:
+            self.histogram.observe(time.perf_counter() - self._start, *self.label_values)
+
+
+# The registry of the metrics and of the instrumented methods.
+class Metrics:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_rate = 0.0
+        self._credit = 0.0 # Grows by `sample_rate` per call; a call is timed each time it reaches 1.
+        self._metrics = {} # name -> Counter or Histogram.
+        self._patches = [] # (owner, name, original, replacement)
+        self._instrumented_modules = set() # The names of the INSTRUMENTED_MODULES that registered their methods.
+        self._lock = threading.RLock()
+
+    def counter(self, name: str, help_text: str, label_names: tuple=()) -> Counter:
+        return self._register(Counter, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: tuple=(), buckets: tuple=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, label_names, buckets)
+
+    # Return the metric with this name, or create it. Registering the same name twice returns the same metric.
+    def _register(self, kind: type, name: str, *args) -> Counter | Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = kind(name, *args)
+            elif not isinstance(metric, kind):
+                raise ValueError(f'The metric {name!r} is already registered as a {metric.kind}.')
+            return metric
+
+    # Register an instrumented version of `owner.name`. It is installed while the metrics are enabled.
+    def patch(self, owner: object, name: str, replacement: object) -> None:
+        with self._lock:
+            self._patches.append((owner, name, owner.__dict__[name], replacement))
+            if self.enabled:
+                setattr(owner, name, replacement)
+
+    # Let the imported INSTRUMENTED_MODULES register their methods(once each). Called when this module is imported,
+    # and by those modules when they are imported after it.
+    def instrument_modules(self) -> None:
+        with self._lock:
+            for module_name, function_name in INSTRUMENTED_MODULES.items():
+                module = sys.modules.get(module_name)
+                if module is not None and module_name not in self._instrumented_modules:
+                    self._instrumented_modules.add(module_name)
+                    getattr(module, function_name)(self)
+
+    # The same as `timed_method(self, ...)`, for modules that only get the Metrics object.
+    def timed(self, method: object, counter: Counter, histogram: Histogram, label_values: tuple) -> object:
+        return timed_method(self, method, counter, histogram, label_values)
+
+    def enable(self, sample_rate: float=0.01) -> None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError('sample_rate must be between 0 and 1.')
+        with self._lock:
+            self.sample_rate = sample_rate
+            self._credit = 0.0
+            self.enabled = True
+            for owner, name, _, replacement in self._patches:
+                setattr(owner, name, replacement)
+
+    def disable(self) -> None:
+        with self._lock:
+            self.enabled = False
+            for owner, name, original, _ in self._patches:
+                setattr(owner, name, original)
+
+    # Return True for a `sample_rate` share of the calls, e.g. 2 calls in 3 for 0.67(an accumulator,
+    # cheaper than a random number and exact for any rate).
+    def sampled(self) -> bool:
+        credit = self._credit + self.sample_rate
+        if credit < 1.0:
+            self._credit = credit
+            return False
+        self._credit = credit - 1.0
+        return True
+
+    def span(self, histogram: Histogram, *label_values) -> Span:
+        return Span(histogram, label_values, self.sampled())
+
+    # Set every metric back to zero.
+    def reset(self) -> None:
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    # Write a snapshot to a file. The file is replaced atomically, so a scraper never reads half of it.
+    def write_prometheus(self, path: str) -> None:
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(self.to_prometheus())
+        os.replace(temporary_path, path)
+
+    # Serve the snapshot at http://host:port/metrics on a daemon thread. Call `shutdown()` on the result to stop.
+    def serve(self, port: int=9100, host: str='127.0.0.1') -> object:
+        # Imported here: http.server is slow to import and most programs never serve the metrics.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass # No access log on the console.
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
+
+
+# Wrap a method so each call increments `counter` and sampled calls are timed into `histogram`,
+# both with the same label values.
+def timed_method(metrics: Metrics, method: object, counter: Counter, histogram: Histogram, label_values: tuple) -> object:
+    def instrumented(self, *args, **kwargs):
+        counter.inc(*label_values)
+        if not metrics.sampled():
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, *label_values)
+    instrumented.__name__ = method.__name__
+    instrumented.__qualname__ = method.__qualname__
+    instrumented.__doc__ = method.__doc__
+    return instrumented
+
+
+# The metrics used by every example.
+METRICS = Metrics()
+METRICS.instrument_modules()
+
+if os.environ.get('INSTRUMENTATION_SAMPLE_RATE'):
+    METRICS.enable(float(os.environ['INSTRUMENTATION_SAMPLE_RATE']))
@@ -4,60 +4,408 @@ For this purpose, we are simulating a smart home system that works based on temp
 
 The Mediator pattern suggests that you should cease all direct communication between the components which you want to make independent of each other. 
 
+The hub can also be driven by a stream of sensor events (temperature, time of day, presence).
+Declarative rules are compiled into a dispatch table keyed by event type (and event value),
+so each event only checks the rules that can match it. See SensorEvent, Rule and RuleEngine.
+
+The routines of the hub do not call the devices directly: they change a desired state, and at
+the end of a tick the hub sends only the commands that are needed to reach it (see SmartHomeHub.tick).
+Several routines in the same tick are merged into one batch of commands per device.
+
+The devices report their state changes through `event_sink.emit` (printed on the console by default).
+While `instrumentation.METRICS` is enabled, the hub counts and times its routines and counts the device
+commands it really sends (e.g. how often the temperature routine turns the AC on and off).
+
+The routines can also run on a schedule (morning at 07:00, night at 21:00) with debounce and throttle
+windows per device, see `smart_home_scheduler.py`.
+
 You can read more about this Design Pattern from this url: https://www.geeksforgeeks.org/system-design/mediator-design-pattern/
 '''
 
 
 
+import asyncio
+import contextlib
+import json
 import time
-import sys
+
+from event_sink import NullSink, emit, using_sink
+from instrumentation import METRICS, timed_method
 
 
 # This class is the center of the smart home. It calls device actions.
 class SmartHomeHub:
-    def __init__(self, smart_door: object, smart_ac: object, smart_lights: object, smart_curtains: object, ai_assistant: object) -> None:
+    def __init__(self, smart_door: object, smart_ac: object, smart_lights: object, smart_curtains: object, ai_assistant: object, rules: list=None) -> None:
         # Store the device objects passed from outside. The hub will use them.
         self.door = smart_door        
         self.ac = smart_ac        
         self.lights = smart_lights     
         self.curtains = smart_curtains        
         self.ai_assistant = ai_assistant
+        # The rules used to react to sensor events. DEFAULT_RULES is used when no rules are passed
+        # (compiled once and shared by every hub that uses them).
+        self.rule_engine = default_rule_engine() if rules is None else RuleEngine(rules)
+        # The routines only change a desired state. The commands are sent when the tick ends (see tick).
+        self.command_stats = CommandStats()
+        self._desired = None
+        self._speeches = []
+
+    # Return the state of every device as a small dictionary (e.g. to move the hub to another process).
+    def state(self) -> dict:
+        return {
+            'door': self.door.mode,
+            'ac': (self.ac.mode, self.ac.intensity),
+            'lights': (self.lights.mode, self.lights.intensity),
+            'curtains': self.curtains.mode,
+        }
+
+    # Create a hub with new device objects in the given state (see SmartHomeHub.state).
+    @classmethod
+    def from_state(cls, state: dict, rules: list=None) -> 'SmartHomeHub':
+        return cls(
+            smart_door=SmartDoor(state['door']),
+            smart_ac=SmartAC(*state['ac']),
+            smart_lights=SmartLights(*state['lights']),
+            smart_curtains=SmartCurtains(state['curtains']),
+            ai_assistant=AIAssistant(),
+            rules=rules,
+        )
+
+    # React to one sensor event by running the actions of every matching rule.
+    def handle_event(self, event: 'SensorEvent') -> int:
+        actions = self.rule_engine.match(event)
+        for action in actions:
+            action(self, event)
+        return len(actions)
+
+    # Consume sensor events from an asyncio queue until `None` is received.
+    # Events that are already waiting are handled in one go, without going back to the event loop.
+    # handle: the function called with each event(handle_event by default, e.g. HubScheduler.submit).
+    async def run(self, events: asyncio.Queue, handle: object=None) -> int:
+        handle = self.handle_event if handle is None else handle
+        handled = 0
+        while True:
+            event = await events.get()
+            while event is not None:
+                handle(event)
+                handled += 1
+                events.task_done()
+                if events.empty():
+                    break
+                event = events.get_nowait()
+            if event is None:
+                events.task_done()
+                return handled
 
     # Adjust AC based on a short label for temperature.
     def temperature(self, current_temp: str='o') -> None:
-        # If user says it is cold, lower AC intensity or turn it off.
-        if current_temp in ('c', 'cold'):
-            if self.ac.intensity == 'high':
-                self.ac.set_low()
-            else:
-                self.ac.turn_off()
-        # If user says it is warm, raise AC intensity or turn it on then set low.
-        elif current_temp in ('w', 'warm'):
-            if self.ac.intensity == 'low':
-                self.ac.set_high()
-            else:
-                self.ac.turn_on()
-                self.ac.set_low()
+        # The decision uses the desired AC state, so it also sees the commands of earlier routines in the same tick.
+        with self.tick():
+            intensity = self._desired['ac'][1]
+            # If user says it is cold, lower AC intensity or turn it off.
+            if current_temp in ('c', 'cold'):
+                if intensity == 'high':
+                    self.command('ac', 'set_low')
+                else:
+                    self.command('ac', 'turn_off')
+            # If user says it is warm, raise AC intensity or turn it on then set low.
+            elif current_temp in ('w', 'warm'):
+                if intensity == 'low':
+                    self.command('ac', 'set_high')
+                else:
+                    self.command('ac', 'turn_on')
+                    self.command('ac', 'set_low')
             
     # Morning routine: lights low and curtains open.
     def morning(self) -> None:
-        self.lights.turn_on()
-        self.lights.set_low()
-        self.curtains.open()
+        with self.tick():
+            self.command('lights', 'turn_on')
+            self.command('lights', 'set_low')
+            self.command('curtains', 'open')
 
     # Night routine: lights high and curtains closed.
     def night(self) -> None:
-        self.lights.turn_on()
-        self.lights.set_high()
-        self.curtains.close()
+        with self.tick():
+            self.command('lights', 'turn_on')
+            self.command('lights', 'set_high')
+            self.command('curtains', 'close')
 
     # Leave-home routine: lock door, turn off AC and lights, close curtains, say goodbye.
     def leave_home(self) -> None:
-        self.door.lock()
-        self.ac.turn_off()
-        self.lights.turn_off()
-        self.curtains.close()
-        self.ai_assistant.say('Have a good time. See you later!')
+        with self.tick():
+            self.command('door', 'lock')
+            self.command('ac', 'turn_off')
+            self.command('lights', 'turn_off')
+            self.command('curtains', 'close')
+            self.announce('Have a good time. See you later!')
+
+    # Collect the commands of every routine run inside the `with` block and send them together.
+    # At the end of the block the hub compares the desired state with the actual device state and
+    # sends only the commands needed to get there (one batch per device). Ticks can be nested;
+    # only the outermost one sends commands. If the block raises, nothing is sent.
+    @contextlib.contextmanager
+    def tick(self):
+        if self._desired is not None:
+            yield self
+            return
+        self._desired = self.state()
+        self._speeches = []
+        try:
+            yield self
+        except BaseException:
+            self._desired = None
+            raise
+        desired, speeches = self._desired, self._speeches
+        self._desired = None
+        self._send(desired, speeches)
+
+    # Request one device command. It only changes the desired state until the tick ends.
+    def command(self, device: str, method: str) -> None:
+        if self._desired is None: # Not inside a tick: this command is a tick of its own.
+            with self.tick():
+                self.command(device, method)
+            return
+        self._desired[device] = device_transition(device, self._desired[device], method)
+        self.command_stats.requested += 1
+
+    # Queue an AI assistant message. It is said after the device commands of the tick.
+    def announce(self, speech: str) -> None:
+        if self._desired is None:
+            with self.tick():
+                self._speeches.append(speech)
+            return
+        self._speeches.append(speech)
+
+    # Send the minimal commands from the actual state to the desired state, then the speeches.
+    def _send(self, desired: dict, speeches: list) -> None:
+        actual = self.state()
+        for device in DEVICE_NAMES:
+            methods = command_path(device, actual[device], desired[device])
+            target = getattr(self, device)
+            for method in methods:
+                getattr(target, method)()
+            self.command_stats.sent += len(methods)
+        for speech in speeches:
+            self.ai_assistant.say(speech)
+
+
+# The metrics of the hub. The instrumented methods below are only installed while METRICS is enabled.
+_ROUTINES = METRICS.counter('hub_routines_total', 'Routines run by a hub.', ('routine',))
+_ROUTINE_SECONDS = METRICS.histogram('hub_routine_seconds', 'Time of one routine, with its commands (sampled).', ('routine',))
+_COMMANDS = METRICS.counter('hub_commands_total', 'Device commands sent by a hub.', ('device', 'method'))
+_send = SmartHomeHub._send
+
+
+def _instrumented_send(self: SmartHomeHub, desired: dict, speeches: list) -> None:
+    actual = self.state()
+    for device in DEVICE_NAMES:
+        for method in command_path(device, actual[device], desired[device]):
+            _COMMANDS.inc(device, method)
+    _send(self, desired, speeches)
+
+
+METRICS.patch(SmartHomeHub, '_send', _instrumented_send)
+for _routine in ('temperature', 'morning', 'night', 'leave_home'):
+    METRICS.patch(SmartHomeHub, _routine, timed_method(
+        METRICS, getattr(SmartHomeHub, _routine), _ROUTINES, _ROUTINE_SECONDS, (_routine,),
+    ))
+
+
+# This class counts the device commands of a hub: requested by the routines and really sent to the devices.
+class CommandStats:
+    def __init__(self) -> None:
+        self.requested = 0
+        self.sent = 0
+
+    @property
+    def saved(self) -> int:
+        return self.requested - self.sent
+
+    def __repr__(self) -> str:
+        return f'CommandStats(requested={self.requested}, sent={self.sent}, saved={self.saved})'
+
+
+# The device attributes of SmartHomeHub, in the order their commands are sent.
+DEVICE_NAMES = ('door', 'ac', 'lights', 'curtains')
+
+_transitions = None
+_command_paths = {}
+
+
+# Return the device transitions: device name -> {(state, method): new state}.
+# States use the same format as SmartHomeHub.state. The table is built once, on first use,
+# by running every method on a device object in every state (with its output sent to a NullSink).
+def _device_transitions() -> dict:
+    global _transitions
+    if _transitions is None:
+        power_states = [(mode, intensity) for mode in ('off', 'on') for intensity in (None, False, True, 'low', 'high')]
+        devices = {
+            'door': (lambda state: SmartDoor(state), lambda door: door.mode, ('locked', 'unlocked'), ('lock', 'unlock')),
+            'ac': (lambda state: SmartAC(*state), lambda ac: (ac.mode, ac.intensity), power_states, ('turn_on', 'turn_off', 'set_low', 'set_high')),
+            'lights': (lambda state: SmartLights(*state), lambda lights: (lights.mode, lights.intensity), power_states, ('turn_on', 'turn_off', 'set_low', 'set_high')),
+            'curtains': (lambda state: SmartCurtains(state), lambda curtains: curtains.mode, ('closed', 'open'), ('open', 'close')),
+        }
+        transitions = {}
+        with using_sink(NullSink()):
+            for name, (make_device, read_state, states, methods) in devices.items():
+                table = transitions[name] = {}
+                for state in states:
+                    for method in methods:
+                        device = make_device(state)
+                        getattr(device, method)()
+                        table[(state, method)] = read_state(device)
+        _transitions = transitions
+    return _transitions
+
+
+# Return the state of a device after running one method in the given state.
+def device_transition(device: str, state: object, method: str) -> object:
+    try:
+        return _device_transitions()[device][(state, method)]
+    except KeyError:
+        raise ValueError(f'Unknown {device} state or command: {state!r}, {method!r}') from None
+
+
+# Return the shortest list of methods that moves a device from one state to another (a breadth-first search, cached).
+def command_path(device: str, start: object, goal: object) -> tuple:
+    key = (device, start, goal)
+    path = _command_paths.get(key)
+    if path is not None:
+        return path
+    table = _device_transitions()[device]
+    methods = tuple(dict.fromkeys(method for _, method in table))
+    paths = {start: ()}
+    frontier = [start]
+    while frontier and goal not in paths:
+        next_frontier = []
+        for state in frontier:
+            for method in methods:
+                new_state = table.get((state, method))
+                if new_state is not None and new_state not in paths:
+                    paths[new_state] = paths[state] + (method,)
+                    next_frontier.append(new_state)
+        frontier = next_frontier
+    if goal not in paths:
+        raise ValueError(f'The {device} cannot go from {start!r} to {goal!r}.')
+    _command_paths[key] = paths[goal]
+    return paths[goal]
+
+
+# This class is a single sensor reading sent to the hub.
+# event_type is 'temperature', 'time_of_day' or 'presence'. value is the reading, e.g. 'cold', 21.5, 'morning' or 'away'.
+class SensorEvent:
+    __slots__ = ('event_type', 'value', 'timestamp')
+
+    def __init__(self, event_type: str, value: object, timestamp: float=None) -> None:
+        self.event_type = event_type
+        self.value = value
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def to_json(self) -> str:
+        return json.dumps({'type': self.event_type, 'value': self.value, 'timestamp': self.timestamp})
+
+    @classmethod
+    def from_json(cls, line: str) -> 'SensorEvent':
+        record = json.loads(line)
+        return cls(record['type'], record['value'], record.get('timestamp'))
+
+    def __repr__(self) -> str:
+        return f'SensorEvent({self.event_type!r}, {self.value!r})'
+
+
+# This class is one declarative rule of the hub: "when an event of this type (with one of these values) arrives, run the action".
+# values: the event values this rule reacts to. They are compiled into a dictionary lookup.
+# when: an optional predicate(event) for conditions that are not simple value matches (e.g. a numeric threshold).
+# action: a function action(hub, event).
+class Rule:
+    def __init__(self, event_type: str, action: object, values: tuple=None, when: object=None) -> None:
+        if values is None and when is None:
+            raise ValueError('A rule needs `values`, `when` or both.')
+        self.event_type = event_type
+        self.action = action
+        self.values = values
+        self.when = when
+
+
+# This class compiles rules into a dispatch table: event type -> event value -> actions.
+# Rules with a `when` predicate are kept in a short list per event type and checked after the value lookup.
+class RuleEngine:
+    def __init__(self, rules: list) -> None:
+        self.rules = list(rules)
+        self._by_value = {} # event_type -> {value: (actions...)}
+        self._by_predicate = {} # event_type -> ((when, values, action)...)
+        for rule in self.rules:
+            if rule.when is None:
+                table = self._by_value.setdefault(rule.event_type, {})
+                for value in rule.values:
+                    table[value] = table.get(value, ()) + (rule.action,)
+            else:
+                predicates = self._by_predicate.get(rule.event_type, ())
+                self._by_predicate[rule.event_type] = predicates + ((rule.when, rule.values, rule.action),)
+
+    # Return the actions of every rule that matches this event, in rule order per kind of rule.
+    def match(self, event: SensorEvent) -> tuple:
+        table = self._by_value.get(event.event_type)
+        try:
+            actions = table.get(event.value, ()) if table is not None else ()
+        except TypeError: # Unhashable value: only the predicate rules can match it.
+            actions = ()
+        predicates = self._by_predicate.get(event.event_type)
+        if predicates:
+            actions += tuple(
+                action for when, values, action in predicates
+                if (values is None or event.value in values) and when(event)
+            )
+        return actions
+
+
+# The default rules of the hub. They do the same as the interactive loop at the end of this module.
+DEFAULT_RULES = (
+    Rule('presence', lambda hub, event: hub.leave_home(), values=('away', 'y', 'yes')),
+    Rule('time_of_day', lambda hub, event: hub.morning(), values=('morning', 'm')),
+    Rule('time_of_day', lambda hub, event: hub.night(), values=('night', 'n')),
+    Rule('temperature', lambda hub, event: hub.temperature(event.value), values=('c', 'cold', 'w', 'warm')),
+    # Numeric readings in degrees Celsius.
+    Rule('temperature', lambda hub, event: hub.temperature('cold'), when=lambda event: isinstance(event.value, (int, float)) and event.value < 18),
+    Rule('temperature', lambda hub, event: hub.temperature('warm'), when=lambda event: isinstance(event.value, (int, float)) and event.value > 26),
+)
+
+
+_default_rule_engine = None
+
+
+# Return the RuleEngine compiled from DEFAULT_RULES. It is created on first use and then shared.
+def default_rule_engine() -> RuleEngine:
+    global _default_rule_engine
+    if _default_rule_engine is None:
+        _default_rule_engine = RuleEngine(DEFAULT_RULES)
+    return _default_rule_engine
+
+
+# Read a replayable event log: one JSON object per line ({"type": ..., "value": ..., "timestamp": ...}).
+def load_event_log(path: str) -> list:
+    with open(path, encoding='utf-8') as log_file:
+        return [SensorEvent.from_json(line) for line in log_file if line.strip()]
+
+
+# Write events to a replayable event log (see load_event_log).
+def save_event_log(path: str, events: list) -> None:
+    with open(path, 'w', encoding='utf-8') as log_file:
+        for event in events:
+            log_file.write(event.to_json() + '\n')
+
+
+# Replay a list of events through the hub on an asyncio event loop. Returns the number of handled events.
+async def replay_events(hub: SmartHomeHub, events: list, queue_size: int=0) -> int:
+    queue = asyncio.Queue(maxsize=queue_size)
+    consumer = asyncio.get_running_loop().create_task(hub.run(queue))
+    for event in events:
+        if queue.full():
+            await queue.put(event)
+        else:
+            queue.put_nowait(event)
+    await queue.put(None)
+    return await consumer
 
 
 # This class simulates a smart door with two states: locked or unlocked.
@@ -66,17 +414,17 @@ class SmartDoor:
         # mode holds the door state. Default is 'locked'.
         self.mode = mode
 
-    # Unlock the door if it is locked. Then print the state.
+    # Unlock the door if it is locked. Then report the state.
     def unlock(self) -> None:
         if self.mode == 'locked':
             self.mode = 'unlocked'
-        print(f'\nDoor: {self.mode}')
+        emit('Door', 'mode', '\nDoor: {}', self.mode)
 
-    # Lock the door if it is unlocked. Then print the state.
+    # Lock the door if it is unlocked. Then report the state.
     def lock(self) -> None:
         if self.mode == 'unlocked':
             self.mode = 'locked'
-        print(f'\nDoor: {self.mode}')
+        emit('Door', 'mode', '\nDoor: {}', self.mode)
 
 
 # This class simulates a simple air conditioner.
@@ -91,26 +439,26 @@ class SmartAC:
         if self.mode == 'off' and not self.intensity:
             self.mode = 'on'
             self.intensity = True
-        print(f'\nAC: turned {self.mode}')
+        emit('AC', 'mode', '\nAC: turned {}', self.mode)
 
     # Turn the AC off. If it was on and had an intensity, clear it.
     def turn_off(self) -> None:
         if self.mode == 'on' and self.intensity:
             self.mode = 'off'
             self.intensity = False
-        print(f'\nAC: turned {self.mode}')
+        emit('AC', 'mode', '\nAC: turned {}', self.mode)
 
-    # Set AC to low intensity when it is on. Then print the intensity.
+    # Set AC to low intensity when it is on. Then report the intensity.
     def set_low(self) -> None:
         if self.mode == 'on':
             self.intensity = 'low'
-        print(f'\nAC intensity: {self.intensity}')
+        emit('AC', 'intensity', '\nAC intensity: {}', self.intensity)
 
-    # Set AC to high intensity when it is on. Then print the intensity.
+    # Set AC to high intensity when it is on. Then report the intensity.
     def set_high(self) -> None:
         if self.mode == 'on':
             self.intensity = 'high'
-        print(f'\nAC intensity: {self.intensity}')
+        emit('AC', 'intensity', '\nAC intensity: {}', self.intensity)
 
 
 # This class simulates smart lights with mode and intensity.
@@ -125,26 +473,26 @@ class SmartLights:
         if self.mode == 'off' and not self.intensity:
             self.mode = 'on'
             self.intensity = True
-        print(f'\nLights: {self.mode}')
+        emit('Lights', 'mode', '\nLights: {}', self.mode)
 
     # Turn lights off. If they were on and had an intensity, clear it.
     def turn_off(self) -> None:
         if self.mode == 'on' and self.intensity:
             self.mode = 'off'
             self.intensity = False
-        print(f'\nLights: {self.mode}')
+        emit('Lights', 'mode', '\nLights: {}', self.mode)
 
-    # Set lights to low intensity when they are on. Then print intensity.
+    # Set lights to low intensity when they are on. Then report intensity.
     def set_low(self) -> None:
         if self.mode == 'on' and (self.intensity == 'high' or self.intensity):
             self.intensity = 'low'
-        print(f'\nLights intensity: {self.intensity}')
+        emit('Lights', 'intensity', '\nLights intensity: {}', self.intensity)
 
-    # Set lights to high intensity when they are on. Then print intensity.
+    # Set lights to high intensity when they are on. Then report intensity.
     def set_high(self) -> None:
         if self.mode == 'on' and (self.intensity == 'low' or self.intensity):
             self.intensity = 'high'
-        print(f'\nLights intensity: {self.intensity}')
+        emit('Lights', 'intensity', '\nLights intensity: {}', self.intensity)
 
 
 # This class simulates curtains with open/closed states.
@@ -153,28 +501,31 @@ class SmartCurtains:
         # mode is 'open' or 'closed'. Default is 'closed'.
         self.mode = mode
 
-    # Open the curtains if they are closed. Then print the state.
+    # Open the curtains if they are closed. Then report the state.
     def open(self) -> None:
         if self.mode == 'closed':
             self.mode = 'open'
-        print(f'\nCurtains: {self.mode}')
+        emit('Curtains', 'mode', '\nCurtains: {}', self.mode)
 
-    # Close the curtains if they are open. Then print the state.
+    # Close the curtains if they are open. Then report the state.
     def close(self) -> None:
         if self.mode == 'open':
             self.mode = 'closed'
-        print(f'\nCurtains: {self.mode}')
+        emit('Curtains', 'mode', '\nCurtains: {}', self.mode)
 
 
 # A small wrapper for an AI assistant voice output.
 class AIAssistant:
-    # Say a short message. This prints the assistant speech.
+    # Say a short message. This reports the assistant speech.
     def say(self, speech: str) -> None:
-        print(f'\n** AI Assistant: {speech} **')
+        emit('AIAssistant', 'say', '\n** AI Assistant: {} **', speech)
 
 
 # Main interactive loop. This code runs if the module is executed directly.
+# The questions are read on a helper thread and turned into sensor events, so the hub's
+# event loop is never blocked by input(). The same event loop runs the scheduled routines.
 if __name__ == '__main__':
+    from smart_home_scheduler import HubScheduler, Scheduler
 
     # Create device objects with default states.
     smart_door_obj = SmartDoor()
@@ -186,53 +537,48 @@ if __name__ == '__main__':
     # Create the hub and pass device objects to it.
     smart_home_obj = SmartHomeHub(smart_door=smart_door_obj, smart_ac=smart_ac_obj, smart_lights=smart_lights_obj, smart_curtains=smart_curtains_obj, ai_assistant=ai_assistant_obj)
 
-    # Run a simple text loop to ask the user about actions.
-    while True:
-        print('\n\n\n\n\n')
-
-        # Map user answers to functions. This makes input handling simple.
-        activity_input_dict = {
-            'y': smart_home_obj.leave_home,
-            'yes': smart_home_obj.leave_home,
-            'e': sys.exit,
-            'exit': sys.exit,
-        }
-        time_period_input_dict = {
-            'm': smart_home_obj.morning,
-            'morning': smart_home_obj.morning,
-            'n': smart_home_obj.night,
-            'night': smart_home_obj.night,
-            'e': sys.exit,
-            'exit': sys.exit,
-        }
-
-        # Ask the user if they are leaving home.
-        activity = input('\nAre you going to leave home(y/n)? ').strip().lower()
-
-        # Find a function for this activity and run it if found.
-        func = activity_input_dict.get(activity)
-        if func:
-            func()
-        else:
+    # Run the morning and night routines every day, and handle at most one temperature answer every 5 seconds.
+    scheduler = Scheduler()
+    hub_scheduler = HubScheduler(smart_home_obj, scheduler, throttle={'ac': 5.0})
+    hub_scheduler.schedule_routines()
+
+    # Ask the user questions and put the answers into the queue as sensor events.
+    async def ask_user(events: asyncio.Queue) -> None:
+        while True:
+            print('\n\n\n\n\n')
+
+            # Ask the user if they are leaving home.
+            activity = (await asyncio.to_thread(input, '\nAre you going to leave home(y/n)? ')).strip().lower()
+            if activity in ('e', 'exit'):
+                break
+            if activity in ('y', 'yes'):
+                await events.put(SensorEvent('presence', 'away'))
+                await events.join() # Let the hub react before asking again.
+                continue
             # If the answer is not yes/leave, check for no.
             if activity not in ('n', 'no'):
                 print('\n!! It seems you have entered an invalid input as the answer of the questions !!')
                 continue
 
-        # If the user is not leaving, ask about time and temperature.
-        if activity not in ('y', 'yes'):
-            time_period = input('\nIs it morning or night(m/n)? ').strip().lower()
-            temperature = input('\nWhat do you think of current temperature? Cold, Warm or ok(c/w/o)? ').strip().lower()
-
-            func = time_period_input_dict.get(time_period)
-            if func:
-                # Only act if temperature input is one of allowed short labels.
-                if temperature in ('c', 'cold', 'w', 'warm', 'o', 'ok'):
-                    func()
-                    smart_home_obj.temperature(temperature)
+            # If the user is not leaving, ask about time and temperature.
+            time_period = (await asyncio.to_thread(input, '\nIs it morning or night(m/n)? ')).strip().lower()
+            temperature = (await asyncio.to_thread(input, '\nWhat do you think of current temperature? Cold, Warm or ok(c/w/o)? ')).strip().lower()
+            if 'e' in (time_period, temperature) or 'exit' in (time_period, temperature):
+                break
+            # Only act if both answers are one of the allowed short labels.
+            if time_period in ('m', 'morning', 'n', 'night') and temperature in ('c', 'cold', 'w', 'warm', 'o', 'ok'):
+                await events.put(SensorEvent('time_of_day', time_period))
+                await events.put(SensorEvent('temperature', temperature))
+                await events.join()
             else:
                 print('\n!! It seems you have entered an invalid input as the answer of the questions !!')
-                continue
+        await events.put(None)
+
+    # Run the hub's event loop, the scheduler and the question loop together.
+    async def main() -> None:
+        events = asyncio.Queue()
+        serving = asyncio.create_task(scheduler.serve())
+        await asyncio.gather(smart_home_obj.run(events, hub_scheduler.submit), ask_user(events))
+        serving.cancel()
 
-        # Wait a little bit before the next loop. This gives time to read outputs.
-        time.sleep(3)
+    asyncio.run(main())
@@ -6,38 +6,671 @@ The Observer Design Pattern lets one object (the Subject) notify many other obje
 and User as the Observer.
 
 Notes:
-- Channel keeps a list of followers (observers).
+- Channel keeps its followers (observers) in a FollowerSet. It only holds weak
+  references, so a follower that is not used anywhere else is removed automatically.
 - When Channel.send_message is called, every follower receives the update
   through their channel_updated method.
+- Channel.send_messages delivers many messages at once. Followers are grouped by
+  their concrete class and a class that defines the `channels_updated_batch`
+  classmethod receives the whole group in a single call (see BatchDeliveryEngine).
+- A Channel can be given a dispatcher that decides how followers are notified:
+  InlineDispatcher (on the caller's thread), ThreadPoolDispatcher (on worker threads)
+  or AsyncioDispatcher (awaits `async def channel_updated` coroutines concurrently).
+  Dispatchers isolate errors per observer and report DeliveryStats.
+- BufferedDispatcher gives every follower a bounded buffer that is drained on a
+  background thread. When a buffer is full, an overflow policy decides what
+  happens: block the publisher, drop the oldest or newest message, or coalesce
+  messages by key so only the latest state is delivered.
+- ChannelRegistry routes messages by dotted topic names (e.g. 'sports.f1').
+  Observers subscribe to exact topics or wildcards: '*' matches one level and
+  '#' matches any number of trailing levels (e.g. 'sports.*', 'news.#').
+- User notifications are reported through `event_sink` (printed on the console by default).
+- While `instrumentation.METRICS` is enabled, send_message counts messages and deliveries
+  per channel and times each follower's channel_updated (sampled, per follower class).
 - This is a local and simple implementation. For production code you may want
-  thread-safety, weak references, error isolation, logging, and unsubscribe support.
+  thread-safety as well.
 
 You can read more about this Design Pattern here:
 https://www.geeksforgeeks.org/system-design/observer-pattern-set-1-introduction/
 '''
 
 
+import asyncio
+import inspect
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from event_sink import emit, emit_batch
+from instrumentation import METRICS
+
+
+# A weak reference that also remembers the key of its follower in FollowerSet.
+class _FollowerRef(weakref.ref):
+    __slots__ = ('key',)
+
+
+# This class stores the followers of a Channel as weak references.
+# Adding and removing a follower is O(1), and followers that are garbage collected
+# are pruned automatically, so the channel never keeps an unused observer alive.
+# Iteration walks an immutable snapshot of the references that is rebuilt only after
+# the set changes, so followers can be added or removed while a message is being sent.
+class FollowerSet:
+    def __init__(self, followers: list=None) -> None:
+        self._refs = {} # id(follower) -> _FollowerRef (insertion ordered).
+        self._snapshot = () # Tuple of the references, rebuilt lazily after a change.
+        self._changed = False
+        # The prune callback only holds a weak reference to the set, to avoid a reference cycle.
+        self_ref = weakref.ref(self)
+
+        def prune(ref: _FollowerRef) -> None:
+            follower_set = self_ref()
+            if follower_set is not None and follower_set._refs.get(ref.key) is ref:
+                del follower_set._refs[ref.key]
+                follower_set._changed = True
+
+        self._prune = prune
+        for follower in followers or ():
+            self.add(follower)
+
+    def add(self, follower: object) -> None:
+        # Adding a follower that is already in the set does nothing.
+        key = id(follower)
+        if key in self._refs:
+            return
+        ref = _FollowerRef(follower, self._prune)
+        ref.key = key
+        self._refs[key] = ref
+        self._changed = True
+
+    def remove(self, follower: object) -> None:
+        key = id(follower)
+        ref = self._refs.get(key)
+        if ref is None or ref() is not follower:
+            raise KeyError(f'{follower!r} is not a follower.')
+        del self._refs[key]
+        self._changed = True
+
+    def snapshot(self) -> tuple:
+        # Return a tuple of the live followers (strong references).
+        return tuple(self)
+
+    def __iter__(self):
+        if self._changed:
+            self._snapshot = tuple(self._refs.values())
+            self._changed = False
+        for ref in self._snapshot:
+            follower = ref()
+            if follower is not None:
+                yield follower
+
+    def __contains__(self, follower: object) -> bool:
+        ref = self._refs.get(id(follower))
+        return ref is not None and ref() is follower
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+
 # This class is the Subject in the Observer pattern.
-# It keeps a list of followers and notifies them when a message is sent.
+# It keeps a set of followers and notifies them when a message is sent.
 class Channel:
-    def __init__(self, channel_name: str, followers: list=None) -> None:
+    def __init__(self, channel_name: str, followers: list=None, dispatcher: object=None) -> None:
         # channel_name: the name of this channel
         # followers: an optional initial list of observer objects
-        # Use a new list when no followers are provided to avoid shared mutable default.
+        # dispatcher: an optional dispatcher (see InlineDispatcher) used by send_message
         self.channel_name = channel_name
-        self.followers = [] if followers is None else followers
+        self.followers = FollowerSet(followers)
+        self.dispatcher = dispatcher
 
     def add_follower(self, follower: object) -> None:
-        # Add a follower (observer) to this channel's list.
+        # Add a follower (observer) to this channel.
         # The follower is expected to implement channel_updated(channel_name, message).
-        self.followers.append(follower)
+        self.followers.add(follower)
 
-    def send_message(self, message: str) -> None:
+    def remove_follower(self, follower: object) -> None:
+        # Remove a follower (unsubscribe). Raises KeyError if it is not following the channel.
+        self.followers.remove(follower)
+
+    def send_message(self, message: str) -> object:
         # Notify every follower about a new message.
-        # For each follower call its channel_updated method with channel name and message.
-        for follower in self.followers:
-            follower.channel_updated(self.channel_name, message)
-    
+        # Without a dispatcher, call each follower's channel_updated method directly.
+        if self.dispatcher is None:
+            for follower in self.followers:
+                follower.channel_updated(self.channel_name, message)
+            return None
+        # With a dispatcher, hand it a snapshot of the followers and return its result
+        # (DeliveryStats, or a Future/Task that resolves to DeliveryStats).
+        return self.dispatcher.dispatch(self.followers.snapshot(), self.channel_name, message)
+
+    def delivery_metrics(self) -> object:
+        # Return the ChannelMetrics (queue depth, drops, lag) of a buffered dispatcher, or None
+        # (also before the dispatcher received a message of this channel).
+        metrics = getattr(self.dispatcher, 'metrics', None)
+        return metrics(self.channel_name) if metrics is not None else None
+
+    def send_messages(self, messages: list, engine: object=None) -> None:
+        # Notify every follower about several new messages in one pass.
+        # The engine receives the followers grouped by class, so the grouping
+        # cost is paid once per batch instead of once per message.
+        if not messages:
+            return
+        groups = BatchDeliveryEngine.group_by_class(self.followers)
+        (engine or DEFAULT_BATCH_ENGINE).deliver(groups, self.channel_name, list(messages))
+
+
+# The metrics of Channel.send_message. The instrumented version below is only installed while METRICS is enabled.
+_MESSAGES = METRICS.counter('observer_messages_total', 'Messages sent by a channel.', ('channel',))
+_DELIVERIES = METRICS.counter('observer_deliveries_total', 'Messages sent to the followers of a channel.', ('channel',))
+_DELIVERY_SECONDS = METRICS.histogram('observer_delivery_seconds', 'Time of one channel_updated call (sampled).', ('follower',))
+_DISPATCH_SECONDS = METRICS.histogram('observer_dispatch_seconds', 'Time to hand a message to the dispatcher (sampled).', ('channel',))
+_send_message = Channel.send_message
+
+
+def _instrumented_send_message(self: Channel, message: str) -> object:
+    _MESSAGES.inc(self.channel_name)
+    _DELIVERIES.inc(self.channel_name, amount=len(self.followers))
+    if not METRICS.sampled():
+        return _send_message(self, message)
+    clock = time.perf_counter
+    if self.dispatcher is not None: # The followers are notified by the dispatcher(maybe later, on other threads).
+        start = clock()
+        try:
+            return _send_message(self, message)
+        finally:
+            _DISPATCH_SECONDS.observe(clock() - start, self.channel_name)
+    for follower in self.followers:
+        start = clock()
+        follower.channel_updated(self.channel_name, message)
+        _DELIVERY_SECONDS.observe(clock() - start, type(follower).__name__)
+    return None
+
+
+METRICS.patch(Channel, 'send_message', _instrumented_send_message)
+
+
+# This class is the batch fan-out engine used by Channel.send_messages.
+# For every group of followers that share a concrete class it calls the class-level
+# `channels_updated_batch(observers, channel_name, messages)` hook once.
+# Classes without that hook fall back to one channel_updated call per follower and message.
+class BatchDeliveryEngine:
+    # Group observers by their concrete class while keeping the subscription order.
+    @staticmethod
+    def group_by_class(followers: list) -> dict:
+        groups = {}
+        for follower in followers:
+            group = groups.get(type(follower))
+            if group is None:
+                groups[type(follower)] = group = []
+            group.append(follower)
+        return groups
+
+    def deliver(self, groups: dict, channel_name: str, messages: list) -> None:
+        for observer_class, observers in groups.items():
+            batch_hook = getattr(observer_class, 'channels_updated_batch', None)
+            if batch_hook is not None:
+                # One call for the whole group: the class decides how to process it in bulk.
+                batch_hook(observers, channel_name, messages)
+                continue
+            # Fallback path: the class only knows how to receive one message at a time.
+            for message in messages:
+                for observer in observers:
+                    observer.channel_updated(channel_name, message)
+
+
+# The engine used when Channel.send_messages is called without an explicit engine.
+DEFAULT_BATCH_ENGINE = BatchDeliveryEngine()
+
+
+# This class holds the result of delivering one message to a group of followers.
+class DeliveryStats:
+    def __init__(self) -> None:
+        self.delivered = 0 # Number of followers that received the message without an error.
+        self.failed = 0 # Number of followers whose channel_updated raised an exception.
+        self.errors = [] # A list of (follower, exception) pairs for the failed deliveries.
+        self.elapsed = 0.0 # Seconds between the start of the dispatch and the last delivery.
+
+    def record(self, follower: object, error: BaseException=None) -> None:
+        if error is None:
+            self.delivered += 1
+        else:
+            self.failed += 1
+            self.errors.append((follower, error))
+
+    def __repr__(self) -> str:
+        return f'DeliveryStats(delivered={self.delivered}, failed={self.failed}, elapsed={self.elapsed:.6f})'
+
+
+# This dispatcher notifies followers one after another on the caller's thread.
+# It is the same as the default Channel behavior, but one failing follower
+# does not stop the others from receiving the message.
+class InlineDispatcher:
+    def dispatch(self, followers: tuple, channel_name: str, message: str) -> DeliveryStats:
+        stats = DeliveryStats()
+        start = time.perf_counter()
+        for follower in followers:
+            try:
+                follower.channel_updated(channel_name, message)
+            except Exception as error:
+                stats.record(follower, error)
+            else:
+                stats.record(follower)
+        stats.elapsed = time.perf_counter() - start
+        return stats
+
+
+# This dispatcher notifies followers on a pool of worker threads.
+# dispatch returns at once with a Future, so a slow follower never stalls the publisher.
+class ThreadPoolDispatcher:
+    def __init__(self, max_workers: int=None, executor: ThreadPoolExecutor=None) -> None:
+        # Use the given executor or create one owned by this dispatcher.
+        self._owns_executor = executor is None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='observer') if executor is None else executor
+
+    def dispatch(self, followers: tuple, channel_name: str, message: str) -> Future:
+        result = Future()
+        stats = DeliveryStats()
+        lock = threading.Lock()
+        remaining = [len(followers)]
+        start = time.perf_counter()
+
+        if not followers:
+            result.set_result(stats)
+            return result
+
+        # Each follower runs in its own task. The last task to finish resolves the Future.
+        def deliver(follower: object) -> None:
+            error = None
+            try:
+                follower.channel_updated(channel_name, message)
+            except Exception as exc:
+                error = exc
+            with lock:
+                stats.record(follower, error)
+                remaining[0] -= 1
+                done = remaining[0] == 0
+            if done:
+                stats.elapsed = time.perf_counter() - start
+                result.set_result(stats)
+
+        for follower in followers:
+            self.executor.submit(deliver, follower)
+        return result
+
+    # Shut down the executor if it was created by this dispatcher.
+    def close(self, wait: bool=True) -> None:
+        if self._owns_executor:
+            self.executor.shutdown(wait=wait)
+
+
+# This dispatcher notifies followers on a running asyncio event loop.
+# Followers with an `async def channel_updated` are awaited concurrently,
+# with at most `max_concurrency` coroutines running at the same time.
+class AsyncioDispatcher:
+    def __init__(self, max_concurrency: int=100) -> None:
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1.')
+        self.max_concurrency = max_concurrency
+
+    # Schedule the delivery on the running loop and return the Task (resolves to DeliveryStats).
+    # This must be called from inside a running event loop.
+    def dispatch(self, followers: tuple, channel_name: str, message: str) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(self.deliver(followers, channel_name, message))
+
+    # Deliver the message to every follower and return the DeliveryStats when all are done.
+    async def deliver(self, followers: tuple, channel_name: str, message: str) -> DeliveryStats:
+        stats = DeliveryStats()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+
+        async def deliver_one(follower: object) -> None:
+            async with semaphore:
+                try:
+                    result = follower.channel_updated(channel_name, message)
+                    # Plain (non-async) observers are already done at this point.
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as error:
+                    stats.record(follower, error)
+                else:
+                    stats.record(follower)
+
+        await asyncio.gather(*(deliver_one(follower) for follower in followers))
+        stats.elapsed = time.perf_counter() - start
+        return stats
+
+
+# This class holds the buffered delivery counters of one channel (see BufferedDispatcher).
+class ChannelMetrics:
+    def __init__(self) -> None:
+        self.depth = 0 # Messages waiting in the followers' buffers.
+        self.delivered = 0 # Messages delivered without an error.
+        self.failed = 0 # Messages whose channel_updated call raised an exception.
+        self.dropped = 0 # Messages dropped by the 'drop-oldest' / 'drop-newest' policies or a block timeout.
+        self.coalesced = 0 # Messages replaced by a newer message with the same key.
+        self.last_lag = 0.0 # Seconds between enqueue and delivery of the last delivered message.
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    @property
+    def average_lag(self) -> float:
+        handled = self.delivered + self.failed
+        return self.total_lag / handled if handled else 0.0
+
+    def __repr__(self) -> str:
+        return (f'ChannelMetrics(depth={self.depth}, delivered={self.delivered}, failed={self.failed}, '
+                f'dropped={self.dropped}, coalesced={self.coalesced}, max_lag={self.max_lag:.6f})')
+
+
+# The bounded buffer of one follower in BufferedDispatcher.
+# Each entry is a list [channel_name, key, message, enqueued_at] so coalescing can update it in place.
+class _SubscriberBuffer:
+    __slots__ = ('follower_ref', 'entries', 'pending_keys', 'scheduled')
+
+    def __init__(self, follower: object) -> None:
+        self.follower_ref = weakref.ref(follower)
+        self.entries = deque()
+        self.pending_keys = {} # (channel_name, key) -> entry, only used by the 'coalesce' policy.
+        self.scheduled = False # True while the buffer is in the dispatcher's ready queue.
+
+
+# This dispatcher puts every message into a bounded buffer per follower and returns at once.
+# A background thread drains the buffers round-robin, so a slow follower only delays itself.
+# When a follower's buffer is full, the overflow policy decides what happens:
+# - 'block': wait until there is space (or until block_timeout, then drop the new message)
+# - 'drop-oldest': drop the oldest waiting message to make room
+# - 'drop-newest': drop the new message
+# - 'coalesce': replace the waiting message with the same key, so only the latest state is
+#   delivered. If no message has the same key, the oldest waiting message is dropped.
+class BufferedDispatcher:
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop-oldest'
+    DROP_NEWEST = 'drop-newest'
+    COALESCE = 'coalesce'
+    POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+    def __init__(self, capacity: int=1024, policy: str='block', key: object=None, block_timeout: float=None) -> None:
+        # capacity: the maximum number of waiting messages per follower
+        # key: a function message -> key, required by the 'coalesce' policy
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1.')
+        if policy not in self.POLICIES:
+            raise ValueError(f'Unknown overflow policy {policy!r}. Choose one of {self.POLICIES}.')
+        if policy == self.COALESCE and key is None:
+            raise ValueError("The 'coalesce' policy needs a key function.")
+        self.capacity = capacity
+        self.policy = policy
+        self.key = key
+        self.block_timeout = block_timeout
+        self._condition = threading.Condition()
+        self._buffers = weakref.WeakKeyDictionary() # Follower -> _SubscriberBuffer.
+        self._ready = deque() # Buffers that have waiting messages, in round-robin order.
+        self._metrics = {} # Channel name -> ChannelMetrics.
+        self._in_flight = 0 # Messages taken from a buffer whose delivery has not finished yet.
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='observer-buffer', daemon=True)
+        self._worker.start()
+
+    def dispatch(self, followers: tuple, channel_name: str, message: str) -> None:
+        key = self.key(message) if self.key is not None else None
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('This dispatcher has already closed.')
+            metrics = self._metrics.get(channel_name)
+            if metrics is None:
+                self._metrics[channel_name] = metrics = ChannelMetrics()
+            for follower in followers:
+                buffer = self._buffers.get(follower)
+                if buffer is None:
+                    self._buffers[follower] = buffer = _SubscriberBuffer(follower)
+                self._put(buffer, metrics, channel_name, key, message)
+            self._condition.notify_all()
+
+    # Add one message to a follower's buffer, applying the overflow policy. Called with the lock held.
+    def _put(self, buffer: _SubscriberBuffer, metrics: ChannelMetrics, channel_name: str, key: object, message: str) -> None:
+        now = time.perf_counter()
+        if self.policy == self.COALESCE:
+            entry = buffer.pending_keys.get((channel_name, key))
+            if entry is not None:
+                entry[2] = message
+                entry[3] = now
+                metrics.coalesced += 1
+                return
+
+        if len(buffer.entries) >= self.capacity:
+            if self.policy == self.BLOCK:
+                deadline = None if self.block_timeout is None else now + self.block_timeout
+                while len(buffer.entries) >= self.capacity and not self._closed:
+                    remaining = None if deadline is None else deadline - time.perf_counter()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if len(buffer.entries) >= self.capacity:
+                    metrics.dropped += 1
+                    return
+            elif self.policy == self.DROP_NEWEST:
+                metrics.dropped += 1
+                return
+            else:
+                # Drop the oldest message ('drop-oldest' and 'coalesce'). It may belong to another channel.
+                dropped = self._pop(buffer)
+                self._metrics[dropped[0]].dropped += 1
+
+        entry = [channel_name, key, message, now]
+        buffer.entries.append(entry)
+        if self.policy == self.COALESCE:
+            buffer.pending_keys[(channel_name, key)] = entry
+        metrics.depth += 1
+        if not buffer.scheduled:
+            buffer.scheduled = True
+            self._ready.append(buffer)
+
+    # Remove the oldest entry of a buffer and update the depth. Called with the lock held.
+    def _pop(self, buffer: _SubscriberBuffer) -> list:
+        entry = buffer.entries.popleft()
+        if buffer.pending_keys.get((entry[0], entry[1])) is entry:
+            del buffer.pending_keys[(entry[0], entry[1])]
+        self._metrics[entry[0]].depth -= 1
+        return entry
+
+    # The background thread: deliver one message of the next ready buffer, round-robin.
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._ready and not self._closed:
+                    self._condition.wait()
+                if not self._ready:
+                    return # Closed and nothing left to deliver.
+                buffer = self._ready.popleft()
+                entry = self._pop(buffer)
+                self._in_flight += 1
+                if buffer.entries:
+                    self._ready.append(buffer)
+                else:
+                    buffer.scheduled = False
+                # Wake up publishers blocked on a full buffer and threads waiting in flush().
+                self._condition.notify_all()
+
+            channel_name, _, message, enqueued_at = entry
+            follower = buffer.follower_ref()
+            error = None
+            if follower is not None: # A garbage collected follower's messages are discarded.
+                try:
+                    follower.channel_updated(channel_name, message)
+                except Exception as exc:
+                    error = exc
+            lag = time.perf_counter() - enqueued_at
+
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+                if follower is None:
+                    continue
+                metrics = self._metrics[channel_name]
+                if error is None:
+                    metrics.delivered += 1
+                else:
+                    metrics.failed += 1
+                metrics.last_lag = lag
+                metrics.total_lag += lag
+                if lag > metrics.max_lag:
+                    metrics.max_lag = lag
+
+    def metrics(self, channel_name: str) -> ChannelMetrics | None:
+        # Return the delivery counters of one channel, or None if no message of that channel was dispatched.
+        # The counters are created by dispatch, so asking about other channels adds nothing.
+        with self._condition:
+            return self._metrics.get(channel_name)
+
+    def flush(self, timeout: float=None) -> bool:
+        # Wait until every buffer is empty. Returns False if the timeout expired first.
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._ready and not self._in_flight, timeout)
+
+    def close(self, drain: bool=True) -> None:
+        # Stop the background thread. With drain=False the waiting messages are discarded.
+        with self._condition:
+            self._closed = True
+            if not drain:
+                while self._ready:
+                    buffer = self._ready.popleft()
+                    buffer.scheduled = False
+                    while buffer.entries:
+                        self._metrics[self._pop(buffer)[0]].dropped += 1
+            self._condition.notify_all()
+        self._worker.join()
+
+
+# A node of the topic trie used by ChannelRegistry. Each level of a dotted topic is one node.
+class _TopicNode:
+    __slots__ = ('children', 'subscribers')
+
+    def __init__(self) -> None:
+        self.children = {} # Topic level (or '*' / '#') -> child _TopicNode.
+        self.subscribers = {} # Observers subscribed at this node (a dict is used as an ordered set).
+
+
+# This class keeps a trie-based index of topic subscriptions for many channels.
+# Resolving the subscribers of a published topic walks the trie one level at a time,
+# so its cost depends on the depth of the topic, not on the number of channels.
+# The subscribers of the last `cache_size` resolved topics are cached(least recently used first out)
+# until a subscription changes.
+class ChannelRegistry:
+    SEPARATOR = '.'
+    SINGLE_LEVEL = '*' # Matches exactly one topic level.
+    MULTI_LEVEL = '#' # Matches zero or more trailing topic levels.
+
+    def __init__(self, dispatcher: object=None, cache_size: int=4096) -> None:
+        # dispatcher: an optional dispatcher (see InlineDispatcher) used by publish
+        if cache_size < 1:
+            raise ValueError('cache_size must be at least 1.')
+        self.dispatcher = dispatcher
+        self.cache_size = cache_size
+        self._root = _TopicNode()
+        self._by_observer = {} # Observer -> dict of its patterns (reverse index for subscriptions()).
+        self._resolved = OrderedDict() # Cache: topic -> tuple of subscribers, the least recently used first.
+
+    # Split a topic and check that it is not empty.
+    def _levels(self, topic: str) -> list:
+        levels = topic.split(self.SEPARATOR)
+        if not topic or '' in levels:
+            raise ValueError(f'Invalid topic: {topic!r}')
+        return levels
+
+    def subscribe(self, observer: object, pattern: str) -> None:
+        # Subscribe the observer to an exact topic or a wildcard pattern.
+        levels = self._levels(pattern)
+        if self.MULTI_LEVEL in levels[:-1]:
+            raise ValueError(f"'{self.MULTI_LEVEL}' is only allowed as the last level: {pattern!r}")
+        node = self._root
+        for level in levels:
+            child = node.children.get(level)
+            if child is None:
+                node.children[level] = child = _TopicNode()
+            node = child
+        node.subscribers[observer] = None
+        self._by_observer.setdefault(observer, {})[pattern] = None
+        self._resolved.clear()
+
+    def unsubscribe(self, observer: object, pattern: str) -> None:
+        # Remove one subscription. Empty trie branches are pruned on the way back.
+        path = [self._root]
+        for level in self._levels(pattern):
+            node = path[-1].children.get(level)
+            if node is None:
+                raise KeyError(f'{observer!r} is not subscribed to {pattern!r}')
+            path.append(node)
+        if observer not in path[-1].subscribers:
+            raise KeyError(f'{observer!r} is not subscribed to {pattern!r}')
+        del path[-1].subscribers[observer]
+        levels = pattern.split(self.SEPARATOR)
+        for depth in range(len(levels), 0, -1):
+            node = path[depth]
+            if node.subscribers or node.children:
+                break
+            del path[depth - 1].children[levels[depth - 1]]
+        patterns = self._by_observer[observer]
+        del patterns[pattern]
+        if not patterns:
+            del self._by_observer[observer]
+        self._resolved.clear()
+
+    def subscriptions(self, observer: object) -> list:
+        # Return the patterns this observer is subscribed to, without scanning the trie.
+        return list(self._by_observer.get(observer, ()))
+
+    def resolve(self, topic: str) -> tuple:
+        # Return every observer subscribed to a pattern that matches this topic.
+        subscribers = self._resolved.get(topic)
+        if subscribers is not None:
+            self._resolved.move_to_end(topic)
+            return subscribers
+
+        # A published topic is a concrete name: a wildcard would match the subscribers of other topics.
+        if self.SINGLE_LEVEL in topic or self.MULTI_LEVEL in topic:
+            raise ValueError(f"A published topic can't contain '{self.SINGLE_LEVEL}' or '{self.MULTI_LEVEL}': {topic!r}")
+        levels = self._levels(topic)
+        matched = {}
+        nodes = [self._root]
+        for level in levels:
+            next_nodes = []
+            for node in nodes:
+                # '#' also matches the remaining levels, so its subscribers match right here.
+                multi = node.children.get(self.MULTI_LEVEL)
+                if multi is not None:
+                    matched.update(multi.subscribers)
+                for key in (level, self.SINGLE_LEVEL):
+                    child = node.children.get(key)
+                    if child is not None:
+                        next_nodes.append(child)
+            nodes = next_nodes
+            if not nodes:
+                break
+        for node in nodes:
+            matched.update(node.subscribers)
+            # 'a.#' also matches 'a' itself (zero trailing levels).
+            multi = node.children.get(self.MULTI_LEVEL)
+            if multi is not None:
+                matched.update(multi.subscribers)
+
+        subscribers = tuple(matched)
+        if len(self._resolved) >= self.cache_size:
+            self._resolved.popitem(last=False)
+        self._resolved[topic] = subscribers
+        return subscribers
+
+    def publish(self, topic: str, message: str) -> object:
+        # Deliver the message to every matching subscriber.
+        # The topic is passed as the channel name to channel_updated.
+        subscribers = self.resolve(topic)
+        if self.dispatcher is not None:
+            return self.dispatcher.dispatch(subscribers, topic, message)
+        for subscriber in subscribers:
+            subscriber.channel_updated(topic, message)
+        return None
+
 
 # This class defines the Observer interface.
 # In Python this is a simple base class with the expected method signature.
@@ -48,6 +681,10 @@ class Observer:
         pass
 
 
+# The console text of a User notification.
+USER_NOTIFICATION = "\n For `{}`, there's a new message from channel `{}`: {}\n"
+
+
 # This class is a concrete Observer.
 # Each User receives notifications from channels it follows.
 class User(Observer):
@@ -57,8 +694,18 @@ class User(Observer):
 
     def channel_updated(self, channel_name: str, message: str) -> None:
         # Called by Channel when a new message is sent.
-        # Print a readable notification for this user.
-        print(f"\n For `{self.username}`, there's a new message from channel `{channel_name}`: {message}\n")
+        # Report a readable notification for this user (printed on the console by default).
+        emit('User', 'message', USER_NOTIFICATION, self.username, channel_name, message)
+
+    @classmethod
+    def channels_updated_batch(cls, observers: list, channel_name: str, messages: list) -> None:
+        # Called by BatchDeliveryEngine with every User following the channel.
+        # Report the same notifications as channel_updated for all of them in one batch.
+        emit_batch('User', 'message', USER_NOTIFICATION, (
+            (observer.username, channel_name, message)
+            for message in messages
+            for observer in observers
+        ))
     
 
 # Example usage: create channels and users, subscribe users, then send messages.
@@ -88,4 +735,15 @@ if __name__ == '__main__':
     technology_channel.send_message('Hi! There is just a new Samsung phone that is going to be published very soon! Its name is S26 Ultra.')
     sports_channel.send_message('Hello sport fans! In the previous F1 grand prix in Monza italy, the winner of the race was Max Verstappen!!!')
 
+    # Send several messages at once: every User of the channel is notified in one batch call.
+    sports_channel.send_messages(['Qualifying starts at 14:00.', 'The race starts tomorrow at 15:00.'])
+
+    # Route messages by topic: `Rosy` follows every sports topic with one wildcard subscription.
+    registry = ChannelRegistry()
+    registry.subscribe(user6, 'sports.*')
+    registry.subscribe(user2, 'sports.f1')
+    registry.publish('sports.f1', 'Practice sessions are over.')
+    registry.publish('sports.football', 'The match ended 2-2.')
+    print(f'\n Subscriptions of `{user6.username}`: {registry.subscriptions(user6)}')
+
     print('\n\n\n\n\n')
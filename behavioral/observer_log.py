@@ -0,0 +1,574 @@
+'''
+In this module, we persist the messages of a Channel (`observer.py`) in an append-only log, so a follower
+that subscribes late (or restarts) can replay what it missed instead of the whole history being sent again.
+
+A ChannelLog is a directory of segment files. Every message gets an offset (0, 1, 2, ...) and the messages
+are written in records: a 29-byte header (offset of the first message, timestamp, message count, payload
+size, CRC-32, payload format) followed by the UTF-8 messages. One record holds up to `batch_messages`
+messages, so replaying a record costs one header, one decode and one split, not one Python call per message.
+- Segments: the log is split into files of about `segment_bytes`, named after their first offset
+  (`00000000000000000000.log`). Only the last segment is written.
+- Index: every segment has a sparse `.index` file with an (offset, timestamp, position) entry every
+  `index_interval` bytes, so an offset or a timestamp is found with a binary search and a short scan.
+- Replay: `replay(offset)` reads the segments sequentially through `mmap` and yields batches of messages.
+- Retention: sealed segments are deleted when the log is larger than `retention_bytes` or older than
+  `retention_seconds`, and `compact()` merges the small records of old segments into large ones.
+- Recovery: when a log is opened, a torn record at the end of the last segment(a crash during a write) is
+  found with the CRC and cut off, and missing indexes are rebuilt.
+
+LoggedChannel is a Channel that appends every message to its log before the followers are notified, and
+`subscribe(observer, offset=...)` or `subscribe(observer, timestamp=...)` replays the log to a new follower
+in batches (through BatchDeliveryEngine) before it receives the live messages, without gaps or duplicates.
+
+Notes:
+- The messages given to `append` are buffered in memory until there are `batch_messages` of them or
+  `flush()` is called. `append_many` and `send_messages` write their records at once.
+- The data is written to the operating system, not to the disk. With `durable=True` every record is
+  followed by an fsync, which is safe after a power loss but much slower.
+- A log has one writer. Other processes can replay it, but only the records written so far.
+'''
+
+
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+from observer import DEFAULT_BATCH_ENGINE, Channel
+
+# The header of a record: offset of its first message, timestamp(ns since the epoch), number of messages,
+# payload size, CRC-32 of the payload and payload format.
+_RECORD = struct.Struct('<QqIIIB')
+RECORD_HEADER_SIZE = _RECORD.size
+
+# Payload formats.
+JOINED = 0 # The messages joined by '\n'(none of them contains a newline).
+SIZED = 1 # The UTF-8 size of every message(uint32), followed by the messages.
+
+_SEGMENT_SUFFIX = '.log'
+_INDEX_SUFFIX = '.index'
+_INDEX_FIELDS = 3 # An index entry is three int64 values: offset, timestamp and position in the segment.
+
+
+def encode_record(offset: int, timestamp: int, messages: list) -> bytes:
+    joined = '\n'.join(messages)
+    if joined.count('\n') == len(messages) - 1: # Checked in C, not message by message.
+        kind = JOINED
+        payload = joined.encode('utf-8')
+    else:
+        kind = SIZED
+        encoded = [message.encode('utf-8') for message in messages]
+        payload = struct.pack(f'<{len(encoded)}I', *map(len, encoded)) + b''.join(encoded)
+    return _RECORD.pack(offset, timestamp, len(messages), len(payload), zlib.crc32(payload), kind) + payload
+
+
+def decode_payload(kind: int, count: int, payload: object) -> list:
+    if kind == JOINED:
+        return str(payload, 'utf-8').split('\n')
+    sizes = struct.unpack_from(f'<{count}I', payload)
+    messages = []
+    position = 4 * count
+    for size in sizes:
+        messages.append(str(payload[position:position + size], 'utf-8'))
+        position += size
+    return messages
+
+
+# One segment file and its sparse index.
+class _Segment:
+    def __init__(self, directory: str, base_offset: int) -> None:
+        self.base_offset = base_offset
+        self.path = os.path.join(directory, f'{base_offset:020d}{_SEGMENT_SUFFIX}')
+        self.index_path = self.path[:-len(_SEGMENT_SUFFIX)] + _INDEX_SUFFIX
+        self.offsets = array('q') # The index, one array per field.
+        self.timestamps = array('q')
+        self.positions = array('q')
+        self.size = 0
+        self.end_offset = base_offset # The offset after the last message.
+
+    def load_index(self) -> None:
+        entries = array('q')
+        try:
+            with open(self.index_path, 'rb') as index_file:
+                data = index_file.read()
+        except FileNotFoundError:
+            return
+        entry_size = _INDEX_FIELDS * entries.itemsize
+        entries.frombytes(data[:len(data) - len(data) % entry_size])
+        self.offsets = entries[0::3]
+        self.timestamps = entries[1::3]
+        self.positions = entries[2::3]
+
+    def write_index(self) -> None:
+        entries = array('q', [0]) * (_INDEX_FIELDS * len(self.offsets))
+        entries[0::3] = self.offsets
+        entries[1::3] = self.timestamps
+        entries[2::3] = self.positions
+        with open(self.index_path, 'wb') as index_file:
+            index_file.write(entries.tobytes())
+
+    # Add an index entry if the record is `index_interval` bytes after the previous entry. Returns the entry or None.
+    def index(self, offset: int, timestamp: int, position: int, index_interval: int) -> bytes | None:
+        if self.positions and position - self.positions[-1] < index_interval:
+            return None
+        self.offsets.append(offset)
+        self.timestamps.append(timestamp)
+        self.positions.append(position)
+        return array('q', (offset, timestamp, position)).tobytes()
+
+    # The position of the last indexed record that starts at or before `offset`.
+    def position_of(self, offset: int) -> int:
+        entry = bisect_right(self.offsets, offset) - 1
+        return self.positions[entry] if entry >= 0 else 0
+
+    def __repr__(self) -> str:
+        return f'_Segment({self.base_offset}, end_offset={self.end_offset}, size={self.size})'
+
+
+# Walk the records of a buffer from `position` to `end`.
+# Yields (position, offset, timestamp, count, payload start, payload end, crc, kind) for every complete record.
+def _records(buffer: object, position: int, end: int):
+    unpack_from = _RECORD.unpack_from
+    while end - position >= RECORD_HEADER_SIZE:
+        offset, timestamp, count, size, crc, kind = unpack_from(buffer, position)
+        payload_start = position + RECORD_HEADER_SIZE
+        if payload_start + size > end:
+            return
+        yield position, offset, timestamp, count, payload_start, payload_start + size, crc, kind
+        position = payload_start + size
+
+
+# The append-only log of one channel, stored in `directory`.
+class ChannelLog:
+    def __init__(self, directory: str, segment_bytes: int=64 << 20, index_interval: int=4096,
+                 batch_messages: int=1024, retention_bytes: int | None=None,
+                 retention_seconds: float | None=None, durable: bool=False) -> None:
+        if index_interval < 1 or batch_messages < 1:
+            raise ValueError('index_interval and batch_messages must be at least 1.')
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.batch_messages = batch_messages
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+        self.durable = durable
+        self.lock = threading.RLock() # Held while writing. LoggedChannel holds it while it notifies the followers.
+        self.closed = False
+        self._pending = [] # Appended messages that are not written yet.
+        self._pending_timestamp = 0
+        self._last_timestamp = 0
+        os.makedirs(directory, exist_ok=True)
+        self._segments = self._load()
+        self._open_active()
+
+    # Open the segments of the directory, rebuild the missing indexes and cut off a torn record at the end.
+    def _load(self) -> list:
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(_SEGMENT_SUFFIX))
+        segments = [_Segment(self.directory, int(name[:-len(_SEGMENT_SUFFIX)])) for name in names]
+        if not segments:
+            return [_Segment(self.directory, 0)]
+        for segment, following in zip(segments, segments[1:] + [None]):
+            segment.load_index()
+            segment.size = os.path.getsize(segment.path)
+            if following is not None and segment.offsets:
+                segment.end_offset = following.base_offset
+            else:
+                self._recover(segment)
+        last = segments[-1]
+        self._last_timestamp = max(last.timestamps[-1] if last.timestamps else 0, self._scan_timestamp(last))
+        return segments
+
+    # Check the records of a segment after its last index entry, then cut the file after the last valid record.
+    def _recover(self, segment: _Segment) -> None:
+        position = segment.positions[-1] if segment.positions else 0
+        entries = len(segment.offsets)
+        valid_end = position
+        segment.end_offset = segment.offsets[-1] if segment.offsets else segment.base_offset
+        if segment.size > position:
+            with open(segment.path, 'rb') as segment_file, \
+                    mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for record_position, offset, timestamp, count, start, end, crc, _ in _records(view, position, segment.size):
+                    if offset != segment.end_offset or zlib.crc32(view[start:end]) != crc:
+                        break
+                    segment.index(offset, timestamp, record_position, self.index_interval)
+                    segment.end_offset = offset + count
+                    valid_end = end
+        if valid_end < segment.size:
+            os.truncate(segment.path, valid_end)
+            segment.size = valid_end
+        while segment.positions and segment.positions[-1] >= valid_end:
+            for field in (segment.offsets, segment.timestamps, segment.positions):
+                field.pop()
+        if len(segment.offsets) != entries or not os.path.exists(segment.index_path):
+            segment.write_index()
+
+    # The timestamp of the last record of a segment(it may be after the last index entry).
+    def _scan_timestamp(self, segment: _Segment) -> int:
+        timestamp = 0
+        position = segment.positions[-1] if segment.positions else 0
+        if segment.size > position:
+            with open(segment.path, 'rb') as segment_file, \
+                    mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for record in _records(view, position, segment.size):
+                    timestamp = record[2]
+        return timestamp
+
+    def _open_active(self) -> None:
+        segment = self._segments[-1]
+        self._file = open(segment.path, 'ab')
+        self._index_file = open(segment.index_path, 'ab')
+
+    # The first offset still in the log(older messages were removed by the retention).
+    @property
+    def start_offset(self) -> int:
+        return self._segments[0].base_offset
+
+    # The offset of the next message, including the messages not written yet.
+    @property
+    def end_offset(self) -> int:
+        return self._segments[-1].end_offset + len(self._pending)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(segment.size for segment in self._segments)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    # Append a message and return its offset. It is written with the next batch(see `flush`).
+    def append(self, message: str) -> int:
+        with self.lock:
+            if not self._pending:
+                if self.closed:
+                    raise RuntimeError('This log has already closed.')
+                self._pending_timestamp = time.time_ns()
+            self._pending.append(message)
+            offset = self._segments[-1].end_offset + len(self._pending) - 1
+            if len(self._pending) >= self.batch_messages:
+                self._write_pending()
+            return offset
+
+    # Append many messages and write them at once. Returns the offset of the first one.
+    def append_many(self, messages: list) -> int:
+        with self.lock:
+            if self.closed:
+                raise RuntimeError('This log has already closed.')
+            self._write_pending()
+            first_offset = self._segments[-1].end_offset
+            timestamp = time.time_ns()
+            for start in range(0, len(messages), self.batch_messages):
+                self._write_record(messages[start:start + self.batch_messages], timestamp)
+            return first_offset
+
+    # Write the buffered messages, so they can be replayed(also by other processes).
+    def flush(self) -> None:
+        with self.lock:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        if self._pending:
+            messages = self._pending
+            self._pending = []
+            self._write_record(messages, self._pending_timestamp)
+
+    def _write_record(self, messages: list, timestamp: int) -> None:
+        timestamp = max(timestamp, self._last_timestamp) # The timestamps never go back, so they can be searched.
+        segment = self._segments[-1]
+        record = encode_record(segment.end_offset, timestamp, messages)
+        if segment.size and segment.size + len(record) > self.segment_bytes:
+            segment = self._roll()
+        self._file.write(record)
+        self._file.flush()
+        entry = segment.index(segment.end_offset, timestamp, segment.size, self.index_interval)
+        if entry is not None:
+            self._index_file.write(entry)
+            self._index_file.flush()
+        if self.durable:
+            os.fsync(self._file.fileno())
+        segment.size += len(record)
+        segment.end_offset += len(messages)
+        self._last_timestamp = timestamp
+
+    # Seal the active segment and start a new one. The retention runs when a segment is sealed.
+    def _roll(self) -> _Segment:
+        if self.durable:
+            os.fsync(self._file.fileno())
+            os.fsync(self._index_file.fileno())
+        self._file.close()
+        self._index_file.close()
+        self._segments.append(_Segment(self.directory, self._segments[-1].end_offset))
+        self._open_active()
+        self.apply_retention()
+        return self._segments[-1]
+
+    # Delete the oldest sealed segments while the log is larger than `retention_bytes` or they are older than
+    # `retention_seconds`. The active segment is never deleted. Returns the number of deleted segments.
+    def apply_retention(self, now: float | None=None) -> int:
+        with self.lock:
+            cutoff = None
+            if self.retention_seconds is not None:
+                cutoff = int(((time.time() if now is None else now) - self.retention_seconds) * 1e9)
+            total = self.size_bytes
+            deleted = 0
+            while len(self._segments) > 1:
+                segment, following = self._segments[0], self._segments[1]
+                # Every message of a segment is older than the first message of the next one.
+                newest = following.timestamps[0] if following.timestamps else self._last_timestamp
+                too_large = self.retention_bytes is not None and total > self.retention_bytes
+                too_old = cutoff is not None and newest <= cutoff
+                if not (too_large or too_old):
+                    break
+                self._segments.pop(0)
+                self._remove_files(segment)
+                total -= segment.size
+                deleted += 1
+            return deleted
+
+    @staticmethod
+    def _remove_files(segment: _Segment) -> None:
+        for path in (segment.path, segment.index_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # Rewrite the sealed segments whose records are small(e.g. many flushes of a few messages) with records of up
+    # to `batch_messages` messages, and merge adjacent small segments. A merged record keeps the timestamp of its
+    # first message and only merges records less than `resolution` seconds apart, so the timestamps of a compacted
+    # segment are accurate to `resolution`. Returns the number of segments that were rewritten.
+    def compact(self, resolution: float=1.0) -> int:
+        with self.lock:
+            rewritten = 0
+            # First rewrite the fragmented segments one by one, then merge the adjacent segments that fit in one.
+            for segment in self._segments[:-1]:
+                if self._fragmented(segment):
+                    self._replace([segment], self._rewrite([segment], int(resolution * 1e9)))
+                    rewritten += 1
+            groups = []
+            for segment in self._segments[:-1]:
+                if groups and sum(item.size for item in groups[-1]) + segment.size <= self.segment_bytes:
+                    groups[-1].append(segment)
+                else:
+                    groups.append([segment])
+            for group in groups:
+                if len(group) > 1:
+                    self._replace(group, self._rewrite(group, int(resolution * 1e9)))
+                    rewritten += len(group)
+            return rewritten
+
+    def _replace(self, group: list, compacted: _Segment) -> None:
+        start = self._segments.index(group[0])
+        self._segments[start:start + len(group)] = [compacted]
+        for segment in group[1:]:
+            self._remove_files(segment)
+
+    # True if the records of a segment hold less than half of `batch_messages` messages on average.
+    def _fragmented(self, segment: _Segment) -> bool:
+        if not segment.size:
+            return False
+        with open(segment.path, 'rb') as segment_file, \
+                mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            records = sum(1 for _ in _records(view, 0, segment.size))
+        return (segment.end_offset - segment.base_offset) / max(records, 1) < self.batch_messages / 2
+
+    def _rewrite(self, group: list, resolution: int) -> _Segment:
+        compacted = _Segment(self.directory, group[0].base_offset)
+        compacted.end_offset = compacted.base_offset
+        temporary_path = compacted.path + '.compacting'
+        with open(temporary_path, 'wb') as output:
+            messages = []
+            first_timestamp = 0
+
+            def write_record() -> None:
+                record = encode_record(compacted.end_offset, first_timestamp, messages)
+                compacted.index(compacted.end_offset, first_timestamp, compacted.size, self.index_interval)
+                output.write(record)
+                compacted.size += len(record)
+                compacted.end_offset += len(messages)
+
+            for segment in group:
+                with open(segment.path, 'rb') as segment_file, \
+                        mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    for _, offset, timestamp, count, start, end, _, kind in _records(view, 0, segment.size):
+                        if offset < compacted.end_offset + len(messages):
+                            continue # Left by a compaction that stopped before it removed the old segments.
+                        if messages and (len(messages) + count > self.batch_messages
+                                         or timestamp - first_timestamp >= resolution):
+                            write_record()
+                            messages = []
+                        if not messages:
+                            first_timestamp = timestamp
+                        messages.extend(decode_payload(kind, count, view[start:end]))
+            if messages:
+                write_record()
+            output.flush()
+            os.fsync(output.fileno())
+        # A missing index is rebuilt when the log is opened, so the old index is removed before the segment is
+        # replaced and the new one is written after it. A reader that already opened the old file keeps reading it.
+        os.remove(compacted.index_path)
+        os.replace(temporary_path, compacted.path)
+        compacted.write_index()
+        return compacted
+
+    # The offset of the first message sent at or after `timestamp`(seconds since the epoch, like time.time()).
+    def offset_at(self, timestamp: float) -> int:
+        target = int(timestamp * 1e9)
+        with self.lock:
+            segments = [segment for segment in self._segments if segment.timestamps]
+            if not segments:
+                return self.start_offset
+            entry = bisect_left([segment.timestamps[0] for segment in segments], target) - 1
+            segment = segments[max(entry, 0)]
+            entry = bisect_left(segment.timestamps, target) - 1
+            position = segment.positions[entry] if entry >= 0 else 0
+            with open(segment.path, 'rb') as segment_file, \
+                    mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for record in _records(view, position, segment.size):
+                    if record[2] >= target:
+                        return record[1]
+            return segment.end_offset
+
+    # Find the segment that holds `offset` and open it. Returns (segment file, start position, size) or None at the end.
+    def _open_at(self, offset: int) -> tuple | None:
+        with self.lock:
+            entry = bisect_right([segment.base_offset for segment in self._segments], offset) - 1
+            segment = self._segments[max(entry, 0)]
+            if offset >= segment.end_offset or not segment.size:
+                return None
+            # Opened while the lock is held, so a compaction or retention cannot replace it before it is read.
+            return open(segment.path, 'rb'), segment.position_of(offset), segment.size
+
+    # Replay the written messages from `offset` in batches of about `batch_size` messages. Yields
+    # (offset of the first message, messages). If the messages at `offset` were removed by the retention,
+    # the replay starts at the oldest message left. `stop` is an offset to stop at(the end of the log by default).
+    def replay(self, offset: int=0, batch_size: int=8192, stop: int | None=None, verify: bool=False):
+        with self.lock:
+            self._write_pending()
+            end = self._segments[-1].end_offset if stop is None else stop
+            offset = max(offset, self.start_offset)
+        batch = []
+        batch_offset = offset
+        while offset < end:
+            opened = self._open_at(offset)
+            if opened is None:
+                break
+            segment_file, position, size = opened
+            segment_offset = offset
+            with segment_file, mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    view.madvise(mmap.MADV_SEQUENTIAL) # Let the kernel read ahead.
+                for _, record_offset, _, count, start, payload_end, crc, kind in _records(view, position, size):
+                    if record_offset + count <= offset:
+                        continue
+                    payload = view[start:payload_end]
+                    if verify and zlib.crc32(payload) != crc:
+                        raise ValueError(f'The record at offset {record_offset} of {self.directory!r} is corrupted.')
+                    messages = decode_payload(kind, count, payload)
+                    if record_offset < offset:
+                        messages = messages[offset - record_offset:]
+                    if record_offset + count > end:
+                        messages = messages[:end - max(record_offset, offset)]
+                    if not batch:
+                        batch_offset = offset
+                    batch.extend(messages)
+                    offset += len(messages)
+                    if len(batch) >= batch_size:
+                        yield batch_offset, batch
+                        batch = []
+                    if offset >= end:
+                        break
+            if offset == segment_offset:
+                raise ValueError(f'The message at offset {offset} of {self.directory!r} is missing.')
+        if batch:
+            yield batch_offset, batch
+
+    def close(self) -> None:
+        with self.lock:
+            if self.closed:
+                return
+            self._write_pending()
+            if self.durable:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._index_file.close()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (f'ChannelLog({self.directory!r}, offsets={self.start_offset}..{self.end_offset}, '
+                f'segments={len(self._segments)}, size_bytes={self.size_bytes})')
+
+
+# A Channel whose messages are appended to a ChannelLog before they are sent to the followers.
+class LoggedChannel(Channel):
+    def __init__(self, channel_name: str, log: ChannelLog, followers: list=None, dispatcher: object=None) -> None:
+        super().__init__(channel_name, followers, dispatcher)
+        self.log = log
+
+    def send_message(self, message: str) -> object:
+        # The lock makes the append and the notification one step for `subscribe`.
+        with self.log.lock:
+            self.log.append(message)
+            return super().send_message(message)
+
+    def send_messages(self, messages: list, engine: object=None) -> None:
+        with self.log.lock:
+            self.log.append_many(messages)
+            super().send_messages(messages, engine)
+
+    # Add a follower. With an offset or a timestamp(seconds since the epoch), the messages from there are replayed
+    # to it first, in batches(a class with `channels_updated_batch` receives each batch in one call).
+    # Returns the number of replayed messages.
+    def subscribe(self, observer: object, offset: int | None=None, timestamp: float | None=None,
+                  batch_size: int=8192, engine: object=None) -> int:
+        if offset is None and timestamp is None:
+            self.add_follower(observer)
+            return 0
+        if timestamp is not None:
+            offset = self.log.offset_at(timestamp)
+        deliver = (engine or DEFAULT_BATCH_ENGINE).deliver
+        groups = {type(observer): [observer]}
+        replayed = 0
+        # Most of the log is replayed while new messages are still sent. The last part is replayed with the lock held,
+        # then the observer is added before any other message is sent.
+        for catch_up in (False, True):
+            if catch_up:
+                self.log.lock.acquire()
+            try:
+                for first_offset, messages in self.log.replay(offset, batch_size):
+                    deliver(groups, self.channel_name, messages)
+                    replayed += len(messages)
+                    offset = first_offset + len(messages)
+                if catch_up:
+                    self.add_follower(observer)
+            finally:
+                if catch_up:
+                    self.log.lock.release()
+        return replayed
+
+
+# Example usage: a user that subscribes late receives the messages it missed.
+if __name__ == '__main__':
+    import tempfile
+    from observer import User
+
+    with tempfile.TemporaryDirectory() as directory, ChannelLog(directory) as news_log:
+        news = LoggedChannel('NEWS', news_log)
+        user1 = User('Ali')
+        user2 = User('Reza')
+        news.add_follower(user1)
+        news.send_message('The first message.')
+        news.send_message('The second message.')
+        print(f'{news_log}\nReza subscribes from offset 0:')
+        news.subscribe(user2, offset=0)
+        news.send_message('The third message.')
@@ -0,0 +1,618 @@
+'''
+In this module, we let the followers of a Channel (`observer.py`) live in other processes.
+
+The messages cross the process boundary in a compact binary framing: a 7-byte header
+(frame kind, channel name length, payload length) followed by the UTF-8 channel name and message.
+A proxy follower in the publishing process implements `channel_updated`, so it is added to a
+Channel like any local observer. It appends the frames to a buffer, and a background thread writes
+the whole buffer at once (one syscall or one copy per batch, not per message).
+
+There are two transports:
+- Unix domain sockets: a ChannelServer accepts subscriber processes. A ChannelClient subscribes its
+  local observers to channels by name and the server adds a proxy (RemoteFollower) to those channels.
+- Shared memory: a SharedMemoryRing is a single-producer, single-consumer ring buffer for high
+  message rates on one host. A RingFollower writes the frames of the channels it follows into the ring
+  and a RingSubscriber in the other process reads them and notifies its local observers.
+
+On the subscriber side the local observers are called by `poll()` (or by the thread started with `start()`).
+'''
+
+
+from abc import ABC, abstractmethod
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+# Frame kinds.
+MESSAGE = 0
+SUBSCRIBE = 1
+UNSUBSCRIBE = 2
+SUBSCRIBED = 3 # The server's answer to SUBSCRIBE, after the follower was added to the channel.
+PADDING = 255 # Fills the end of the ring buffer when a batch does not fit before it wraps.
+
+_HEADER = struct.Struct('<BHI') # kind, channel name length, payload length.
+HEADER_SIZE = _HEADER.size
+
+
+def encode_frame(kind: int, channel_name: bytes, payload: bytes=b'') -> bytes:
+    return _HEADER.pack(kind, len(channel_name), len(payload)) + channel_name + payload
+
+
+# Decode the complete frames at the start of a buffer. Returns the frames as (kind, channel name, payload)
+# with the names and payloads still as bytes, and the number of bytes used(a partial frame at the end is left).
+def decode_frames(buffer: object) -> tuple:
+    frames = []
+    position = 0
+    end = len(buffer)
+    unpack_from = _HEADER.unpack_from
+    while end - position >= HEADER_SIZE:
+        kind, name_length, payload_length = unpack_from(buffer, position)
+        frame_end = position + HEADER_SIZE + name_length + payload_length
+        if frame_end > end:
+            break
+        if kind != PADDING:
+            name_end = position + HEADER_SIZE + name_length
+            frames.append((kind, bytes(buffer[position + HEADER_SIZE:name_end]), bytes(buffer[name_end:frame_end])))
+        position = frame_end
+    return frames, position
+
+
+# The base of the proxy followers: `channel_updated` appends a frame to a buffer, and a background thread
+# writes the buffer with `_write` when it reaches `batch_bytes` or every `flush_interval` seconds.
+# At most `max_buffer` bytes wait for the writer thread. When a message would go past it, `overflow` decides:
+# - 'block': `channel_updated` waits until the writer thread takes the buffer(the publisher slows down to the peer);
+# - 'drop': the peer is disconnected.
+# A write that fails or times out disconnects the peer too. A disconnected follower drops its buffer and every
+# later message, and counts them in `dropped`.
+class _BatchingFollower(ABC):
+    def __init__(self, batch_bytes: int=65536, flush_interval: float=0.002, max_buffer: int=8 << 20,
+                 overflow: str='block') -> None:
+        if overflow not in ('block', 'drop'):
+            raise ValueError(f"overflow must be 'block' or 'drop', not {overflow!r}.")
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.overflow = overflow
+        self.sent = 0 # Number of messages written.
+        self.dropped = 0 # Number of messages dropped because the peer was disconnected.
+        self.disconnected = False
+        self._buffer = bytearray()
+        self._count = 0
+        self._names = {} # channel name -> its UTF-8 bytes.
+        lock = threading.Lock() # A plain lock is cheaper than the default RLock.
+        self._condition = threading.Condition(lock) # Wakes the writer thread.
+        self._space = threading.Condition(lock) # Wakes the publishers blocked on a full buffer.
+        self._write_lock = threading.Lock() # Keeps the batches in order.
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name=f'{type(self).__name__}-writer', daemon=True)
+        self._writer.start()
+
+    def channel_updated(self, channel_name: str, message: str) -> None:
+        name = self._names.get(channel_name)
+        if name is None:
+            name = self._names[channel_name] = channel_name.encode('utf-8')
+        payload = message.encode('utf-8')
+        frame = b''.join((_HEADER.pack(MESSAGE, len(name), len(payload)), name, payload))
+        with self._condition:
+            while self._buffer and len(self._buffer) + len(frame) > self.max_buffer and not self.disconnected:
+                if self.overflow == 'drop' or self._closed:
+                    self._disconnect()
+                    break
+                self._condition.notify()
+                self._space.wait()
+            if self.disconnected:
+                self.dropped += 1
+                return
+            self._buffer += frame
+            self._count += 1
+            if len(self._buffer) >= self.batch_bytes:
+                self._condition.notify()
+
+    # Write a frame that is not a message(e.g. an answer of the server) after the buffered messages.
+    def send_frame(self, frame: bytes) -> None:
+        with self._condition:
+            if self.disconnected:
+                return
+            self._buffer += frame
+        self.flush()
+
+    # Write the buffered messages now.
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._condition:
+                data, count = bytes(self._buffer), self._count
+                self._buffer.clear()
+                self._count = 0
+                self._space.notify_all()
+            if not data:
+                return
+            try:
+                written = not self.disconnected and self._write(data)
+            except OSError: # The other side is gone(see RemoteFollower).
+                written = False
+            if written:
+                self.sent += count
+                return
+            with self._condition:
+                self.dropped += count
+                if not self.disconnected:
+                    self._disconnect()
+
+    # Called with `_condition` held.
+    def _disconnect(self) -> None:
+        self.disconnected = True
+        self.dropped += self._count
+        self._buffer.clear()
+        self._count = 0
+        self._space.notify_all()
+        self._condition.notify()
+        self._disconnected()
+
+    # Let the peer know that it was disconnected.
+    def _disconnected(self) -> None:
+        pass
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._closed and len(self._buffer) < self.batch_bytes:
+                    self._condition.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed or self.disconnected:
+                return
+
+    # Write a batch. Returns False(or raises OSError) if it could not be written.
+    @abstractmethod
+    def _write(self, data: bytes) -> bool:
+        pass
+
+    # Write every buffered message and stop the background thread.
+    def close(self) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+            self._space.notify_all()
+        self._writer.join()
+
+
+# The proxy of one subscriber process connected to a ChannelServer. A write that takes longer than
+# `write_timeout` seconds(the subscriber stopped reading) disconnects it.
+class RemoteFollower(_BatchingFollower):
+    def __init__(self, connection: socket.socket, batch_bytes: int=65536, flush_interval: float=0.002,
+                 max_buffer: int=8 << 20, overflow: str='block', write_timeout: float=5.0) -> None:
+        self.connection = connection
+        self.connection.settimeout(write_timeout)
+        self.channels = set() # The names of the channels this follower was added to.
+        super().__init__(batch_bytes, flush_interval, max_buffer, overflow)
+
+    def _write(self, data: bytes) -> bool:
+        self.connection.sendall(data)
+        return True
+
+    # The server sees the end of the connection and removes the follower from its channels.
+    def _disconnected(self) -> None:
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+# Serves channels to subscriber processes over a Unix domain socket at `path`.
+# The channels must be added with `add_channel` before clients subscribe to them.
+# The other arguments are given to the RemoteFollower of each client.
+class ChannelServer:
+    def __init__(self, path: str, batch_bytes: int=65536, flush_interval: float=0.002, max_buffer: int=8 << 20,
+                 overflow: str='block', write_timeout: float=5.0) -> None:
+        self.path = path
+        self._follower_options = (batch_bytes, flush_interval, max_buffer, overflow, write_timeout)
+        self.channels = {} # channel name -> Channel
+        self._followers = {} # connection -> RemoteFollower(the channels only keep weak references).
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            os.unlink(path) # A socket file left by a process that stopped without closing its server.
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(path)
+        self._listener.listen()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self._wakeup_read, self._wakeup_write = socket.socketpair()
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='channel-server', daemon=True)
+        self._thread.start()
+
+    def add_channel(self, channel: object) -> None:
+        with self._lock:
+            self.channels[channel.channel_name] = channel
+
+    @property
+    def followers(self) -> list:
+        with self._lock:
+            return list(self._followers.values())
+
+    def _run(self) -> None:
+        buffers = {} # connection -> the bytes of a partial frame.
+        while not self._closed:
+            for key, _ in self._selector.select():
+                if key.fileobj is self._wakeup_read:
+                    continue
+                if key.fileobj is self._listener:
+                    connection, _ = self._listener.accept()
+                    with self._lock:
+                        self._followers[connection] = RemoteFollower(connection, *self._follower_options)
+                    buffers[connection] = b''
+                    self._selector.register(connection, selectors.EVENT_READ)
+                    continue
+                connection = key.fileobj
+                try:
+                    data = connection.recv(65536)
+                except OSError:
+                    data = b''
+                if not data:
+                    buffers.pop(connection, None)
+                    self._disconnect(connection)
+                    continue
+                frames, used = decode_frames(buffers[connection] + data)
+                buffers[connection] = (buffers[connection] + data)[used:]
+                for kind, name, _ in frames:
+                    self._handle(connection, kind, name.decode('utf-8'))
+
+    def _handle(self, connection: socket.socket, kind: int, channel_name: str) -> None:
+        with self._lock:
+            follower = self._followers.get(connection)
+            channel = self.channels.get(channel_name)
+        if follower is None:
+            return
+        if kind == SUBSCRIBE:
+            if channel is not None and channel_name not in follower.channels:
+                channel.add_follower(follower)
+                follower.channels.add(channel_name)
+            # Answered through the follower, so the answer comes after every message buffered before it.
+            follower.send_frame(encode_frame(SUBSCRIBED, channel_name.encode('utf-8'), b'1' if channel else b'0'))
+        elif kind == UNSUBSCRIBE and channel_name in follower.channels:
+            follower.channels.discard(channel_name)
+            channel.remove_follower(follower)
+
+    def _disconnect(self, connection: socket.socket) -> None:
+        self._selector.unregister(connection)
+        with self._lock:
+            follower = self._followers.pop(connection, None)
+        if follower is not None:
+            for channel_name in follower.channels:
+                channel = self.channels.get(channel_name)
+                if channel is not None and follower in channel.followers:
+                    channel.remove_follower(follower)
+            follower.channels.clear()
+            follower.close()
+        connection.close()
+
+    # Write the buffered messages of every follower now.
+    def flush(self) -> None:
+        for follower in self.followers:
+            follower.flush()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._wakeup_write.send(b'x')
+        self._thread.join()
+        for connection in list(self._followers):
+            self._disconnect(connection)
+        self._selector.close()
+        self._listener.close()
+        self._wakeup_read.close()
+        self._wakeup_write.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# The base of the subscriber side: the local observers of each channel, and the delivery of decoded frames.
+class _Subscriber(ABC):
+    def __init__(self) -> None:
+        self.received = 0 # Number of messages received.
+        self._observers = {} # channel name(bytes) -> list of local observers.
+        self._thread = None
+        self._stopping = False
+
+    def _deliver(self, frames: list) -> int:
+        for kind, name, payload in frames:
+            if kind != MESSAGE:
+                self._control(kind, name, payload)
+                continue
+            observers = self._observers.get(name)
+            if observers:
+                channel_name, message = name.decode('utf-8'), payload.decode('utf-8')
+                for observer in observers:
+                    observer.channel_updated(channel_name, message)
+            self.received += 1
+        return len(frames)
+
+    def _control(self, kind: int, name: bytes, payload: bytes) -> None:
+        pass
+
+    # Receive the available frames and notify the observers. Returns the number of frames.
+    @abstractmethod
+    def poll(self, timeout: float | None=None) -> int:
+        pass
+
+    # Call `poll` on a daemon thread until `stop()` is called.
+    def start(self) -> None:
+        self._stopping = False
+        self._thread = threading.Thread(target=self._poll_forever, name=f'{type(self).__name__}-reader', daemon=True)
+        self._thread.start()
+
+    def _poll_forever(self) -> None:
+        while not self._stopping:
+            self.poll(0.05)
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Subscribes local observers to the channels of a ChannelServer at `path`.
+class ChannelClient(_Subscriber):
+    def __init__(self, path: str, connect_timeout: float=5.0) -> None:
+        super().__init__()
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        deadline = time.monotonic() + connect_timeout
+        while True: # The server may still be starting.
+            try:
+                self._socket.connect(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+        self._buffer = b''
+        self._waiting = {} # channel name -> the observers waiting for the server's answer to their subscription.
+        self._answers = threading.Condition() # Notified when the server answers a subscription or the client closes.
+        self.closed = False
+
+    # Subscribe an observer to a channel of the server. The first observer of a channel sends the subscription
+    # and waits for the server's answer. Raises KeyError if the server has no such channel.
+    # After `start()`, only the reader thread receives: this method sends the request and waits for the reader
+    # to see the answer. Without a reader thread, it polls the socket itself(messages that arrive meanwhile are
+    # delivered).
+    def subscribe(self, channel_name: str, observer: object, timeout: float=5.0) -> None:
+        name = channel_name.encode('utf-8')
+        with self._answers:
+            observers = self._observers.get(name)
+            if observers:
+                observers.append(observer)
+                return
+            waiting = self._waiting.get(name)
+            first = waiting is None
+            if first:
+                waiting = self._waiting[name] = []
+            waiting.append(observer)
+        if first:
+            self._socket.sendall(encode_frame(SUBSCRIBE, name))
+        deadline = time.monotonic() + timeout
+        with self._answers:
+            while observer in self._waiting.get(name, ()):
+                remaining = deadline - time.monotonic()
+                if self.closed or remaining <= 0:
+                    waiting = self._waiting[name]
+                    waiting.remove(observer)
+                    if not waiting:
+                        del self._waiting[name]
+                    raise TimeoutError(f'The server did not answer the subscription to {channel_name!r}.')
+                if self._thread is not None:
+                    self._answers.wait(remaining)
+                else:
+                    self.poll(remaining)
+            # The reader moved the observer to the channel's observers if the server accepted the subscription.
+            if observer not in self._observers.get(name, ()):
+                raise KeyError(channel_name)
+
+    def unsubscribe(self, channel_name: str, observer: object) -> None:
+        name = channel_name.encode('utf-8')
+        with self._answers:
+            observers = self._observers.get(name, [])
+            observers.remove(observer)
+            if observers:
+                return
+            del self._observers[name]
+        self._socket.sendall(encode_frame(UNSUBSCRIBE, name))
+
+    # Called by the thread that receives. The waiting observers are added before the next frame is delivered,
+    # so they receive every message sent after the server added their proxy to the channel.
+    def _control(self, kind: int, name: bytes, payload: bytes) -> None:
+        if kind != SUBSCRIBED:
+            return
+        with self._answers:
+            waiting = self._waiting.pop(name, [])
+            if payload == b'1':
+                if waiting:
+                    self._observers.setdefault(name, []).extend(waiting)
+                elif name not in self._observers: # Every waiting observer gave up.
+                    self._socket.sendall(encode_frame(UNSUBSCRIBE, name))
+            self._answers.notify_all()
+
+    # Receive what is available(waiting up to `timeout` seconds, or forever if it is None) and notify
+    # the local observers. Returns the number of frames received; `closed` is set when the server is gone.
+    # After `start()`, only the reader thread may call it.
+    def poll(self, timeout: float | None=None) -> int:
+        if self.closed:
+            return 0
+        if self._thread is not None and threading.current_thread() is not self._thread:
+            raise RuntimeError('The reader thread receives the messages after start().')
+        self._socket.settimeout(timeout)
+        try:
+            data = self._socket.recv(1 << 20)
+        except (TimeoutError, BlockingIOError, socket.timeout):
+            return 0
+        except OSError: # The socket was closed by close().
+            data = b''
+        if not data:
+            self._set_closed()
+            return 0
+        frames, used = decode_frames(self._buffer + data if self._buffer else data)
+        self._buffer = (self._buffer + data)[used:] if self._buffer else data[used:]
+        return self._deliver(frames)
+
+    def _set_closed(self) -> None:
+        with self._answers:
+            self.closed = True
+            self._answers.notify_all()
+
+    def _poll_forever(self) -> None:
+        while not self._stopping and not self.closed:
+            self.poll(0.05)
+
+    def close(self) -> None:
+        self._set_closed()
+        self.stop()
+        self._socket.close()
+
+
+# A single-producer, single-consumer ring buffer of frames in shared memory.
+# The first 16 bytes hold the total number of bytes written and read(they only grow), the frames follow.
+# A batch is always written in one contiguous piece: if it does not fit before the end of the ring, the end is
+# filled with a PADDING frame(or left empty if it is shorter than a header) and the batch starts at the beginning.
+class SharedMemoryRing:
+    _POSITIONS = struct.Struct('<QQ')
+    _DATA = 64 # The frames start after a cache line, so the positions do not share it with data.
+
+    def __init__(self, name: str | None=None, size: int=1 << 22, create: bool=True) -> None:
+        if create:
+            self._memory = shared_memory.SharedMemory(name, create=True, size=self._DATA + size)
+            self._POSITIONS.pack_into(self._memory.buf, 0, 0, 0)
+        else:
+            self._memory = shared_memory.SharedMemory(name)
+        self.size = self._memory.size - self._DATA
+        self.owner = create
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    # Write a batch of whole frames. Waits while the ring is full; returns False if `timeout` passes first
+    # (a reader that stopped reading would otherwise block the writer forever). None waits without a limit.
+    def write(self, data: bytes, timeout: float | None=5.0) -> bool:
+        length = len(data)
+        if length > self.size // 2:
+            raise ValueError(f'A batch of {length} bytes is too large for a ring of {self.size} bytes.')
+        buffer = self._memory.buf
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pause = 0.0
+        while True:
+            written, read = self._POSITIONS.unpack_from(buffer, 0)
+            offset = written % self.size
+            to_end = self.size - offset
+            needed = length if length <= to_end else to_end + length
+            if self.size - (written - read) >= needed:
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(pause)
+            pause = min(0.001, pause * 2 or 0.00001) # Back off while the ring stays full.
+        if length > to_end:
+            if to_end >= HEADER_SIZE:
+                _HEADER.pack_into(buffer, self._DATA + offset, PADDING, 0, to_end - HEADER_SIZE)
+            written += to_end
+            offset = 0
+        buffer[self._DATA + offset:self._DATA + offset + length] = data
+        struct.pack_into('<Q', buffer, 0, written + length) # Published only after the data is in place.
+        return True
+
+    # Read every complete frame that was written, as (kind, channel name, payload).
+    def read(self) -> list:
+        buffer = self._memory.buf
+        written, read = self._POSITIONS.unpack_from(buffer, 0)
+        frames = []
+        while read < written:
+            offset = read % self.size
+            to_end = self.size - offset
+            if to_end < HEADER_SIZE: # Too short for a frame: the writer skipped it.
+                read += to_end
+                continue
+            block = min(written - read, to_end)
+            decoded, used = decode_frames(buffer[self._DATA + offset:self._DATA + offset + block])
+            frames.extend(decoded)
+            read += used if used else block
+        struct.pack_into('<Q', buffer, 8, read)
+        return frames
+
+    def close(self) -> None:
+        self._memory.close()
+
+    # Remove the shared memory block(only the process that created it should do this).
+    def unlink(self) -> None:
+        self._memory.unlink()
+
+
+# The proxy that writes the messages of the channels it follows into a SharedMemoryRing.
+# A batch that does not fit in the ring within `write_timeout` seconds(the reader is too slow or gone)
+# disconnects the follower: the messages are counted in `dropped`, so neither the writer thread nor
+# `close()` waits forever.
+class RingFollower(_BatchingFollower):
+    def __init__(self, ring: SharedMemoryRing, batch_bytes: int=65536, flush_interval: float=0.002,
+                 max_buffer: int=8 << 20, overflow: str='block', write_timeout: float=1.0) -> None:
+        self.ring = ring
+        self.write_timeout = write_timeout
+        super().__init__(min(batch_bytes, ring.size // 4), flush_interval, max_buffer, overflow)
+
+    def _write(self, data: bytes) -> bool:
+        limit = self.ring.size // 2
+        if len(data) <= limit:
+            return self.ring.write(data, self.write_timeout)
+        # A large buffer(the writer thread fell behind) is split at frame boundaries into pieces that fit in the ring.
+        view = memoryview(data)
+        while view:
+            frames, used = decode_frames(view[:limit])
+            if not used:
+                raise ValueError('A message is too large for the ring.')
+            if not self.ring.write(view[:used], self.write_timeout):
+                return False # The rest of the batch is dropped with this piece.
+            view = view[used:]
+        return True
+
+
+# Reads the frames of a SharedMemoryRing created by another process and notifies the local observers.
+class RingSubscriber(_Subscriber):
+    def __init__(self, ring_name: str) -> None:
+        super().__init__()
+        self.ring = SharedMemoryRing(ring_name, create=False)
+
+    def subscribe(self, channel_name: str, observer: object) -> None:
+        self._observers.setdefault(channel_name.encode('utf-8'), []).append(observer)
+
+    def unsubscribe(self, channel_name: str, observer: object) -> None:
+        self._observers[channel_name.encode('utf-8')].remove(observer)
+
+    # Read the available frames and notify the observers. If there are none, wait up to `timeout` seconds.
+    def poll(self, timeout: float | None=0.0) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pause = 0.0
+        while True:
+            frames = self.ring.read()
+            if frames:
+                return self._deliver(frames)
+            if deadline is not None and time.monotonic() >= deadline:
+                return 0
+            time.sleep(pause)
+            pause = min(0.001, pause * 2 or 0.00001) # Back off while the ring stays empty.
+
+    def close(self) -> None:
+        self.stop()
+        self.ring.close()
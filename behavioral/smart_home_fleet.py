@@ -0,0 +1,179 @@
+'''
+In this module, we scale the Mediator example (`mediator.py`) from one smart home to a fleet of homes.
+
+Every home has its own SmartHomeHub (the mediator of its devices). The hubs are split into
+a fixed number of shards by home id, and the shards are spread over a pool of worker
+processes, so the fleet can use every CPU core:
+- HubFleet.send_events groups events by owning worker and sends each group through a pipe in one message.
+- HubFleet.snapshot gathers the device state of every home from every shard.
+- HubFleet.add_worker starts a new process and moves some shards (with their hub state) to it.
+
+Hubs are created lazily in the workers the first time an event for their home arrives.
+'''
+
+
+import multiprocessing
+import os
+
+from event_sink import NullSink, set_sink
+from mediator import SensorEvent, SmartHomeHub
+
+
+# The device state of a home that has not received any event yet.
+FLEET_HOME_DEFAULT_STATE = {'door': 'locked', 'ac': ('off', None), 'lights': ('off', None), 'curtains': 'closed'}
+
+
+# The main function of a worker process. It owns some shards: shard id -> {home id: SmartHomeHub}.
+# Commands arrive through the pipe as tuples and are handled in order:
+# ('events', [(shard, home_id, event_type, value), ...]), ('snapshot',), ('export', shard_ids),
+# ('import', {shard: {home_id: state}}), ('ping',) and ('stop',).
+def _fleet_worker(connection: object, quiet: bool) -> None:
+    shards = {}
+    if quiet: # The devices report every change. A quiet worker sends the reports to a NullSink.
+        set_sink(NullSink())
+    while True:
+        command = connection.recv()
+        kind = command[0]
+        if kind == 'events':
+            for shard, home_id, event_type, value in command[1]:
+                homes = shards.get(shard)
+                if homes is None:
+                    shards[shard] = homes = {}
+                hub = homes.get(home_id)
+                if hub is None:
+                    homes[home_id] = hub = SmartHomeHub.from_state(FLEET_HOME_DEFAULT_STATE)
+                hub.handle_event(SensorEvent(event_type, value, 0.0))
+        elif kind == 'snapshot':
+            connection.send({shard: {home_id: hub.state() for home_id, hub in homes.items()} for shard, homes in shards.items()})
+        elif kind == 'export':
+            exported = {}
+            for shard in command[1]:
+                homes = shards.pop(shard, {})
+                exported[shard] = {home_id: hub.state() for home_id, hub in homes.items()}
+            connection.send(exported)
+        elif kind == 'import':
+            for shard, states in command[1].items():
+                shards[shard] = {home_id: SmartHomeHub.from_state(state) for home_id, state in states.items()}
+            connection.send(True)
+        elif kind == 'ping':
+            connection.send(True)
+        elif kind == 'stop':
+            connection.close()
+            return
+
+
+# This class manages many SmartHomeHub instances spread over worker processes.
+class HubFleet:
+    def __init__(self, workers: int=None, shards: int=256, quiet: bool=True) -> None:
+        # workers: the number of worker processes (default: the number of CPU cores)
+        # shards: the number of shards. It is fixed, so a home always stays in the same shard,
+        #         and it should be much larger than the number of workers to rebalance smoothly.
+        workers = workers or os.cpu_count() or 1
+        if shards < workers:
+            raise ValueError('There must be at least one shard per worker.')
+        self.shards = shards
+        self.quiet = quiet
+        self._context = multiprocessing.get_context()
+        self._workers = [] # (process, connection) per worker.
+        self._owner = [] # shard -> index of the worker that owns it.
+        for _ in range(workers):
+            self._start_worker()
+        self._owner = [shard % workers for shard in range(shards)]
+
+    def _start_worker(self) -> int:
+        parent_connection, child_connection = self._context.Pipe()
+        process = self._context.Process(target=_fleet_worker, args=(child_connection, self.quiet), daemon=True)
+        process.start()
+        child_connection.close()
+        self._workers.append((process, parent_connection))
+        return len(self._workers) - 1
+
+    @property
+    def workers(self) -> int:
+        return len(self._workers)
+
+    # Return the shard of a home. Only the parent process computes it, so hash() is stable enough.
+    def shard_of(self, home_id: object) -> int:
+        return hash(home_id) % self.shards
+
+    def send_events(self, events: list) -> None:
+        # events: a list of (home_id, event_type, value) tuples.
+        # The events are grouped by worker and each group is sent as a single message.
+        batches = [[] for _ in self._workers]
+        owner = self._owner
+        shards = self.shards
+        for home_id, event_type, value in events:
+            shard = hash(home_id) % shards
+            batches[owner[shard]].append((shard, home_id, event_type, value))
+        for (_, connection), batch in zip(self._workers, batches):
+            if batch:
+                connection.send(('events', batch))
+
+    def flush(self) -> None:
+        # Wait until every worker has handled all the events sent so far.
+        for _, connection in self._workers:
+            connection.send(('ping',))
+        for _, connection in self._workers:
+            connection.recv()
+
+    def snapshot(self) -> dict:
+        # Gather the device state of every home: {home_id: state}.
+        for _, connection in self._workers:
+            connection.send(('snapshot',))
+        states = {}
+        for _, connection in self._workers:
+            for homes in connection.recv().values():
+                states.update(homes)
+        return states
+
+    def add_worker(self) -> int:
+        # Start one more worker and move shards to it until every worker owns about the same number.
+        new_worker = self._start_worker()
+        target = self.shards // len(self._workers)
+        owned = {}
+        for shard, worker in enumerate(self._owner):
+            owned.setdefault(worker, []).append(shard)
+        moves = {}
+        moved = 0
+        for worker, worker_shards in sorted(owned.items(), key=lambda item: -len(item[1])):
+            while len(worker_shards) > target and moved < target:
+                moves.setdefault(worker, []).append(worker_shards.pop())
+                moved += 1
+
+        # Events already in the old worker's pipe are handled before the export, so no event is lost.
+        for worker, shards in moves.items():
+            self._workers[worker][1].send(('export', shards))
+            exported = self._workers[worker][1].recv()
+            self._workers[new_worker][1].send(('import', exported))
+            self._workers[new_worker][1].recv()
+            for shard in shards:
+                self._owner[shard] = new_worker
+        return new_worker
+
+    def close(self) -> None:
+        for process, connection in self._workers:
+            connection.send(('stop',))
+            connection.close()
+        for process, _ in self._workers:
+            process.join()
+        self._workers = []
+
+    def __enter__(self) -> 'HubFleet':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# A short example: 1,000 homes on two workers, then a third worker joins the fleet.
+if __name__ == '__main__':
+    with HubFleet(workers=2, shards=64) as fleet:
+        fleet.send_events([(home_id, 'time_of_day', 'morning') for home_id in range(1000)])
+        fleet.send_events([(home_id, 'temperature', 30) for home_id in range(0, 1000, 2)])
+        fleet.add_worker()
+        fleet.send_events([(home_id, 'presence', 'away') for home_id in range(0, 1000, 10)])
+        states = fleet.snapshot()
+        print(f'\n{len(states)} homes on {fleet.workers} workers')
+        print(f'Home 1: {states[1]}')
+        print(f'Home 2: {states[2]}')
+        print(f'Home 10: {states[10]}')
@@ -0,0 +1,366 @@
+'''
+In this module, we run the routines of the Mediator example (`mediator.py`) on a schedule.
+
+A Scheduler keeps its jobs in a heap of deadlines. Every deadline has a bucket of the jobs that are due at
+that time, so thousands of homes that all run `morning` at 07:00 cost one heap operation, not thousands.
+- One-shot jobs: `call_at(when, ...)` and `call_later(delay, ...)`.
+- Recurring jobs: `every(interval, ...)` and `daily('07:00', ...)`(in local time, so it follows the
+  daylight saving time changes).
+- Debounce: `debounce(key, window, ...)` runs the call once there was no other call with the same key for
+  `window` seconds(with the latest arguments). Throttle: `throttle(key, window, ...)` runs at most one call
+  per key every `window` seconds and drops the others.
+- Clocks: the scheduler reads the time from a clock. SystemClock is the real time and SimulatedClock is
+  moved forward by `run_until`, so a year of schedules runs as fast as the jobs themselves.
+
+A failing job does not stop the others: its exception is counted in SchedulerStats.
+
+HubScheduler connects one SmartHomeHub to a scheduler: daily routines, and sensor events that go through the
+debounce or throttle window of the device they control (e.g. repeated `temperature` events for the AC).
+FleetSchedule runs the daily routines of many homes stored in a HomeStateStore (`smart_home_store.py`):
+the homes with the same routine at the same time share one job, which runs the bulk routine on their mask.
+
+Use `run_pending()` to run the due jobs, `run_until(when)` to run the jobs until a time, or `await serve()`
+to run them on an asyncio event loop (add the jobs from the thread of that loop).
+'''
+
+
+import functools
+import heapq
+import time
+from collections import deque
+
+
+# The real time, in seconds since the epoch.
+class SystemClock:
+    def time(self) -> float:
+        return time.time()
+
+    def sleep_until(self, when: float) -> None:
+        delay = when - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# A clock that only moves when it is told to. `sleep_until` jumps to the time at once.
+class SimulatedClock:
+    def __init__(self, start: float | None=None) -> None:
+        self.now = time.time() if start is None else start
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep_until(self, when: float) -> None:
+        if when > self.now:
+            self.now = when
+
+    def advance(self, seconds: float) -> None:
+        self.sleep_until(self.now + seconds)
+
+
+# The next time after `after` when a local clock shows hour:minute. Cached, because the daily jobs
+# that ran at the same time all ask for the same next time.
+@functools.lru_cache(maxsize=4096)
+def next_daily(after: float, hour: int, minute: int) -> float:
+    local = time.localtime(after)
+    day = local.tm_mday
+    while True:
+        # mktime normalizes a day past the end of the month, and -1 lets it choose the daylight saving time.
+        when = time.mktime((local.tm_year, local.tm_mon, day, hour, minute, 0, 0, 0, -1))
+        if when > after:
+            return when
+        day += 1
+
+
+def parse_time_of_day(time_of_day: str) -> tuple:
+    hour, _, minute = time_of_day.partition(':')
+    hour, minute = int(hour), int(minute or 0)
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f'Invalid time of day: {time_of_day!r} (use "HH:MM").')
+    return hour, minute
+
+
+# This class is one scheduled call. `interval` is set for `every` jobs and `daily` for daily jobs.
+class Job:
+    __slots__ = ('when', 'callback', 'args', 'name', 'interval', 'daily', 'key', 'debounced', 'cancelled')
+
+    def __init__(self, when: float, callback: object, args: tuple, name: str | None=None,
+                 interval: float | None=None, daily: tuple | None=None, key: object=None) -> None:
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.name = name or getattr(callback, '__name__', 'job')
+        self.interval = interval
+        self.daily = daily # (hour, minute)
+        self.key = key # The key of a debounced call.
+        self.debounced = None # The scheduler's key -> pending Job dict, for a debounced call.
+        self.cancelled = False
+
+    # The job is removed from the scheduler the next time its deadline is reached. A debounced job is forgotten
+    # by its key now, so the next call with that key schedules a new job.
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.debounced is not None and self.debounced.get(self.key) is self:
+            del self.debounced[self.key]
+
+    def __repr__(self) -> str:
+        return f'Job({self.name!r}, when={self.when:.3f}, cancelled={self.cancelled})'
+
+
+# This class counts what a scheduler did.
+class SchedulerStats:
+    def __init__(self) -> None:
+        self.run = 0 # Jobs that ran, including the failed ones.
+        self.failed = 0
+        self.errors = deque(maxlen=100) # The latest (job, exception) pairs.
+        self.debounced = 0 # Debounced calls replaced by a later call with the same key.
+        self.throttled = 0 # Throttled calls that were dropped.
+
+    def __repr__(self) -> str:
+        return (f'SchedulerStats(run={self.run}, failed={self.failed}, debounced={self.debounced}, '
+                f'throttled={self.throttled})')
+
+
+class Scheduler:
+    def __init__(self, clock: object=None) -> None:
+        self.clock = SystemClock() if clock is None else clock
+        self.stats = SchedulerStats()
+        self._deadlines = [] # A heap of the distinct deadlines.
+        self._buckets = {} # deadline -> [Job, ...] in the order they were scheduled.
+        self._debounced = {} # key -> the pending Job.
+        self._throttled = {} # key -> the time of the last call that ran.
+        self._wakeup = None # The asyncio.Event of `serve`, set when an earlier deadline is added.
+
+    def time(self) -> float:
+        return self.clock.time()
+
+    def _push(self, job: Job) -> Job:
+        bucket = self._buckets.get(job.when)
+        if bucket is not None:
+            bucket.append(job)
+            return job
+        self._buckets[job.when] = [job]
+        if self._wakeup is not None and (not self._deadlines or job.when < self._deadlines[0]):
+            self._wakeup.set()
+        heapq.heappush(self._deadlines, job.when)
+        return job
+
+    def call_at(self, when: float, callback: object, *args, name: str | None=None) -> Job:
+        return self._push(Job(when, callback, args, name))
+
+    def call_later(self, delay: float, callback: object, *args, name: str | None=None) -> Job:
+        return self._push(Job(self.clock.time() + delay, callback, args, name))
+
+    # Run `callback(*args)` every `interval` seconds, the first time at `start`(one interval from now by default).
+    # A run that was missed(e.g. a job took longer than the interval) is skipped, not repeated.
+    def every(self, interval: float, callback: object, *args, start: float | None=None, name: str | None=None) -> Job:
+        if interval <= 0:
+            raise ValueError('interval must be positive.')
+        when = self.clock.time() + interval if start is None else start
+        return self._push(Job(when, callback, args, name, interval=interval))
+
+    # Run `callback(*args)` every day at `time_of_day`('HH:MM', local time).
+    def daily(self, time_of_day: str, callback: object, *args, name: str | None=None) -> Job:
+        hour, minute = parse_time_of_day(time_of_day)
+        when = next_daily(self.clock.time(), hour, minute)
+        return self._push(Job(when, callback, args, name, daily=(hour, minute)))
+
+    # Run `callback(*args)` once there were no calls with the same key for `window` seconds.
+    # A later call replaces the callback and arguments of the pending one and moves it back.
+    def debounce(self, key: object, window: float, callback: object, *args) -> Job:
+        when = self.clock.time() + window
+        job = self._debounced.get(key)
+        if job is not None and not job.cancelled:
+            # The job stays in the bucket of its first deadline and is moved when that deadline is reached.
+            # A burst of calls costs no heap operation.
+            job.when = max(job.when, when)
+            job.callback = callback
+            job.args = args
+            self.stats.debounced += 1
+            return job
+        job = self._debounced[key] = self._push(Job(when, callback, args, key=key))
+        job.debounced = self._debounced
+        return job
+
+    # Run `callback(*args)` now, unless a call with the same key ran less than `window` seconds ago.
+    # Returns True if it ran.
+    def throttle(self, key: object, window: float, callback: object, *args) -> bool:
+        now = self.clock.time()
+        last = self._throttled.get(key)
+        if last is not None and now - last < window:
+            self.stats.throttled += 1
+            return False
+        self._throttled[key] = now
+        callback(*args)
+        return True
+
+    # The time of the earliest job, or None. It may belong to a cancelled or moved job.
+    def next_deadline(self) -> float | None:
+        return self._deadlines[0] if self._deadlines else None
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    # Run every job that is due now. Returns the number of jobs that ran.
+    def run_pending(self) -> int:
+        return self._run(self.clock.time())
+
+    # Run the jobs in order until `until`, sleeping on the clock between them. With a SimulatedClock this
+    # fast-forwards: the clock jumps from one deadline to the next. Returns the number of jobs that ran.
+    def run_until(self, until: float) -> int:
+        run = self._run(until, self.clock.sleep_until)
+        self.clock.sleep_until(until)
+        return run
+
+    # Run the jobs due at or before `now`. With `sleep_until`, wait on the clock for each deadline first.
+    def _run(self, now: float, sleep_until: object=None) -> int:
+        deadlines = self._deadlines
+        buckets = self._buckets
+        heappop = heapq.heappop
+        stats = self.stats
+        run = 0
+        while deadlines and deadlines[0] <= now:
+            when = heappop(deadlines)
+            if sleep_until is not None:
+                sleep_until(when)
+            for job in buckets.pop(when):
+                if job.cancelled:
+                    continue
+                if job.when != when: # A debounced job that was moved back.
+                    self._push(job)
+                    continue
+                if job.key is not None:
+                    del self._debounced[job.key]
+                try:
+                    job.callback(*job.args)
+                except Exception as error:
+                    stats.failed += 1
+                    stats.errors.append((job, error))
+                run += 1
+                if job.daily is not None:
+                    job.when = next_daily(when, *job.daily)
+                elif job.interval is not None:
+                    job.when = when + job.interval
+                    current = now if sleep_until is None else self.clock.time()
+                    if job.when <= current: # Skip the runs that were missed.
+                        job.when += job.interval * (1 + int((current - job.when) // job.interval))
+                else:
+                    continue
+                if job.cancelled: # The callback may have cancelled its own job.
+                    continue
+                bucket = buckets.get(job.when)
+                if bucket is None:
+                    self._push(job)
+                else:
+                    bucket.append(job)
+        stats.run += run
+        return run
+
+    # Run the jobs on the running asyncio event loop until the task is cancelled. It waits in real time.
+    async def serve(self) -> None:
+        import asyncio # Imported here: most programs drive the scheduler with run_pending or run_until.
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self.run_pending()
+                deadline = self.next_deadline()
+                self._wakeup.clear()
+                try:
+                    timeout = None if deadline is None else max(0.0, deadline - self.clock.time())
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+
+
+# The device that reacts to each kind of sensor event(see the rules of `mediator.py`).
+EVENT_DEVICES = {'temperature': 'ac', 'time_of_day': 'lights', 'presence': 'door'}
+
+# The default times of the daily routines.
+MORNING_AT = '07:00'
+NIGHT_AT = '21:00'
+
+
+# This class runs the routines of one hub on a scheduler.
+# debounce and throttle map a device name to a window in seconds. An event for a debounced device is handled
+# once the events of that kind stopped for the window(only the latest one), and an event for a throttled
+# device is dropped if one was handled less than the window ago. The other events are handled at once.
+class HubScheduler:
+    def __init__(self, hub: object, scheduler: Scheduler, debounce: dict=None, throttle: dict=None) -> None:
+        self.hub = hub
+        self.scheduler = scheduler
+        self.debounce = dict(debounce or {})
+        self.throttle = dict(throttle or {})
+
+    # Run a hub routine('morning', 'night', ...) every day at `time_of_day`.
+    def daily(self, time_of_day: str, routine: str) -> Job:
+        return self.scheduler.daily(time_of_day, getattr(self.hub, routine), name=routine)
+
+    # Schedule the morning and night routines.
+    def schedule_routines(self, morning_at: str=MORNING_AT, night_at: str=NIGHT_AT) -> list:
+        return [self.daily(morning_at, 'morning'), self.daily(night_at, 'night')]
+
+    # Handle a sensor event through the window of its device. Returns True if it was handled at once.
+    def submit(self, event: object) -> bool:
+        device = EVENT_DEVICES.get(event.event_type)
+        window = self.debounce.get(device)
+        if window is not None:
+            self.scheduler.debounce((id(self.hub), device), window, self.hub.handle_event, event)
+            return False
+        window = self.throttle.get(device)
+        if window is not None:
+            return self.scheduler.throttle((id(self.hub), device), window, self.hub.handle_event, event)
+        self.hub.handle_event(event)
+        return True
+
+
+# This class runs the daily routines of the homes of a HomeStateStore. The homes with the same routine at the same
+# time share one mask and one job, so a routine costs a couple of bulk passes per time of day, not a call per home.
+class FleetSchedule:
+    def __init__(self, store: object, scheduler: Scheduler) -> None:
+        self.store = store
+        self.scheduler = scheduler
+        self._masks = {} # (time of day, routine) -> the mask of the homes.
+
+    def daily(self, home: int, time_of_day: str, routine: str) -> None:
+        key = (parse_time_of_day(time_of_day), routine)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._masks[key] = bytearray(self.store.homes)
+            self.scheduler.daily(time_of_day, self.store.run_routine, routine, mask, name=f'{routine} at {time_of_day}')
+        mask[home] = 1
+
+    def cancel(self, home: int, time_of_day: str, routine: str) -> None:
+        mask = self._masks.get((parse_time_of_day(time_of_day), routine))
+        if mask is not None:
+            mask[home] = 0
+
+    # The number of shared jobs.
+    def __len__(self) -> int:
+        return len(self._masks)
+
+
+# Example usage: a hub and a small fleet, fast-forwarded through two simulated days.
+if __name__ == '__main__':
+    from mediator import AIAssistant, SensorEvent, SmartAC, SmartCurtains, SmartDoor, SmartHomeHub, SmartLights
+    from smart_home_store import HomeStateStore
+
+    clock = SimulatedClock(start=time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1)))
+    scheduler = Scheduler(clock)
+    hub = SmartHomeHub(SmartDoor(), SmartAC(), SmartLights(), SmartCurtains(), AIAssistant())
+    hub_scheduler = HubScheduler(hub, scheduler, debounce={'ac': 30.0})
+    hub_scheduler.schedule_routines()
+
+    # A burst of temperature events: only the last one is handled, 30 simulated seconds later.
+    for value in ('warm', 'cold', 'warm', 'warm'):
+        hub_scheduler.submit(SensorEvent('temperature', value, clock.time()))
+        clock.advance(5)
+
+    store = HomeStateStore(1000)
+    fleet = FleetSchedule(store, scheduler)
+    for home in range(store.homes):
+        fleet.daily(home, '06:30' if home % 2 else MORNING_AT, 'morning')
+        fleet.daily(home, NIGHT_AT, 'night')
+
+    scheduler.run_until(clock.time() + 2 * 86400)
+    print(f'\n{scheduler.stats}, {len(fleet)} fleet jobs, home 0: {store.state(0)}')
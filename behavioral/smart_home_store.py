@@ -0,0 +1,277 @@
+'''
+In this module, we store the device state of many smart homes (see `mediator.py`) in a compact, columnar way.
+
+A SmartDoor, SmartAC, SmartLights or SmartCurtains object has its own `__dict__` with string
+modes and a mixed bool/str intensity, which costs hundreds of bytes per device. HomeStateStore
+keeps one byte per device instead: each device column is a `bytearray` of small state codes.
+
+- Door and curtains: the code is the mode ('locked'/'unlocked', 'closed'/'open').
+- AC and lights: the code is mode * 5 + intensity, where mode is 'off'/'on' and
+  intensity is None, False, True, 'low' or 'high'.
+
+Every device method (lock, turn_on, set_low, ...) becomes a 256-entry transition table that
+maps an old code to a new code. The tables are built from the device classes themselves, so the
+behavior is exactly the same. Views with `__slots__` (DoorView, ACView, LightsView, CurtainsView)
+keep the usual device API for one home, and bulk routines such as leave_home update every home in a
+mask with a couple of C-level passes (`int` OR for the mask and `bytes.translate` for the transition).
+
+Note: NumPy is not a dependency of this repository, so the columns use the standard library only.
+'''
+
+
+from event_sink import NullSink, emit, using_sink
+from mediator import AIAssistant, SmartAC, SmartCurtains, SmartDoor, SmartHomeHub, SmartLights
+
+
+DOOR_MODES = ('locked', 'unlocked')
+CURTAINS_MODES = ('closed', 'open')
+POWER_MODES = ('off', 'on')
+INTENSITIES = (None, False, True, 'low', 'high')
+
+# The high bit of a code marks the homes selected by a mask during a bulk transition.
+MASK_BIT = 0x80
+_MASK_FLAGS = bytes([0]) + bytes([MASK_BIT]) * 255 # 0 -> not selected, anything else -> selected.
+
+
+def _power_code(mode: str, intensity: object) -> int:
+    # `True == 1` and `False == 0` in Python, so look the intensity up by identity.
+    for index, value in enumerate(INTENSITIES):
+        if value is intensity or (isinstance(intensity, str) and value == intensity):
+            return POWER_MODES.index(mode) * 5 + index
+    raise ValueError(f'Unknown intensity: {intensity!r}')
+
+
+def _power_state(code: int) -> tuple:
+    return POWER_MODES[code // 5], INTENSITIES[code % 5]
+
+
+# Build the transition table of one device method by running it on a real device object for every code.
+# Unused codes map to themselves. The device output goes to a NullSink while the tables are built.
+def _transition_table(make_device: object, read_code: object, method: str, codes: int) -> bytes:
+    table = bytearray(range(256))
+    with using_sink(NullSink()):
+        for code in range(codes):
+            device = make_device(code)
+            getattr(device, method)()
+            table[code] = read_code(device)
+    return bytes(table)
+
+
+# Compose transition tables: the result applies `tables[0]` first, then `tables[1]`, and so on.
+def _compose(*tables: bytes) -> bytes:
+    result = bytes(range(256))
+    for table in tables:
+        result = result.translate(table)
+    return result
+
+
+# Turn a transition table into a masked one: codes with the mask bit are transitioned and
+# the mask bit is cleared, codes without it are left as they are.
+def _masked(table: bytes) -> bytes:
+    return bytes(table[code & ~MASK_BIT] if code & MASK_BIT else code for code in range(256))
+
+
+_DOOR = {method: _transition_table(lambda code: SmartDoor(DOOR_MODES[code]), lambda door: DOOR_MODES.index(door.mode), method, 2)
+         for method in ('lock', 'unlock')}
+_CURTAINS = {method: _transition_table(lambda code: SmartCurtains(CURTAINS_MODES[code]), lambda curtains: CURTAINS_MODES.index(curtains.mode), method, 2)
+             for method in ('open', 'close')}
+_AC = {method: _transition_table(lambda code: SmartAC(*_power_state(code)), lambda ac: _power_code(ac.mode, ac.intensity), method, 10)
+       for method in ('turn_on', 'turn_off', 'set_low', 'set_high')}
+_LIGHTS = {method: _transition_table(lambda code: SmartLights(*_power_state(code)), lambda lights: _power_code(lights.mode, lights.intensity), method, 10)
+           for method in ('turn_on', 'turn_off', 'set_low', 'set_high')}
+
+# The hub routines of `mediator.SmartHomeHub` as one composed table per device column.
+# A missing column is not changed by the routine.
+ROUTINES = {
+    'morning': {'lights': _compose(_LIGHTS['turn_on'], _LIGHTS['set_low']), 'curtains': _CURTAINS['open']},
+    'night': {'lights': _compose(_LIGHTS['turn_on'], _LIGHTS['set_high']), 'curtains': _CURTAINS['close']},
+    'leave_home': {'door': _DOOR['lock'], 'ac': _AC['turn_off'], 'lights': _LIGHTS['turn_off'], 'curtains': _CURTAINS['close']},
+}
+_MASKED_ROUTINES = {name: {column: _masked(table) for column, table in columns.items()} for name, columns in ROUTINES.items()}
+
+
+# This class keeps the device state of `homes` homes in four bytearray columns (one byte per device).
+class HomeStateStore:
+    COLUMNS = ('door', 'ac', 'lights', 'curtains')
+
+    def __init__(self, homes: int, door: str='locked', ac: tuple=('off', None), lights: tuple=('off', None), curtains: str='closed') -> None:
+        # The default states are the same as the default arguments of the device classes.
+        self.homes = homes
+        self.door = bytearray([DOOR_MODES.index(door)]) * homes
+        self.ac = bytearray([_power_code(*ac)]) * homes
+        self.lights = bytearray([_power_code(*lights)]) * homes
+        self.curtains = bytearray([CURTAINS_MODES.index(curtains)]) * homes
+
+    # Return a mask (one byte per home, 1 = selected) from an iterable of home indexes.
+    def mask_of(self, homes: object) -> bytearray:
+        mask = bytearray(self.homes)
+        for home in homes:
+            mask[home] = 1
+        return mask
+
+    def run_routine(self, routine: str, mask: bytes=None) -> None:
+        # Run a hub routine ('morning', 'night' or 'leave_home') for every home in the mask
+        # (a bytes-like object with one byte per home, non-zero = selected) or for every home if mask is None.
+        # Unlike the device objects, bulk routines do not report anything to the event sink.
+        if routine not in ROUTINES:
+            raise ValueError(f'Unknown routine {routine!r}. Choose one of {tuple(ROUTINES)}.')
+        if mask is None:
+            for column, table in ROUTINES[routine].items():
+                data = getattr(self, column)
+                data[:] = data.translate(table)
+            return
+        if len(mask) != self.homes:
+            raise ValueError('The mask must have one byte per home.')
+        flags = int.from_bytes(bytes(mask).translate(_MASK_FLAGS), 'little')
+        for column, table in _MASKED_ROUTINES[routine].items():
+            data = getattr(self, column)
+            marked = (int.from_bytes(data, 'little') | flags).to_bytes(self.homes, 'little')
+            data[:] = marked.translate(table)
+
+    def morning(self, mask: bytes=None) -> None:
+        self.run_routine('morning', mask)
+
+    def night(self, mask: bytes=None) -> None:
+        self.run_routine('night', mask)
+
+    def leave_home(self, mask: bytes=None) -> None:
+        self.run_routine('leave_home', mask)
+
+    # Return a SmartHomeHub for one home whose devices are views on this store.
+    def hub(self, home: int, ai_assistant: object=None, rules: list=None) -> SmartHomeHub:
+        return SmartHomeHub(
+            smart_door=DoorView(self, home),
+            smart_ac=ACView(self, home),
+            smart_lights=LightsView(self, home),
+            smart_curtains=CurtainsView(self, home),
+            ai_assistant=AIAssistant() if ai_assistant is None else ai_assistant,
+            rules=rules,
+        )
+
+    # The same dictionary as SmartHomeHub.state for one home.
+    def state(self, home: int) -> dict:
+        return {
+            'door': DOOR_MODES[self.door[home]],
+            'ac': _power_state(self.ac[home]),
+            'lights': _power_state(self.lights[home]),
+            'curtains': CURTAINS_MODES[self.curtains[home]],
+        }
+
+
+# A view on the door of one home in a HomeStateStore. It has the same API as SmartDoor.
+class DoorView:
+    __slots__ = ('_store', '_home')
+
+    def __init__(self, store: HomeStateStore, home: int) -> None:
+        self._store = store
+        self._home = home
+
+    @property
+    def mode(self) -> str:
+        return DOOR_MODES[self._store.door[self._home]]
+
+    def unlock(self) -> None:
+        door = self._store.door
+        door[self._home] = _DOOR['unlock'][door[self._home]]
+        emit('Door', 'mode', '\nDoor: {}', self.mode)
+
+    def lock(self) -> None:
+        door = self._store.door
+        door[self._home] = _DOOR['lock'][door[self._home]]
+        emit('Door', 'mode', '\nDoor: {}', self.mode)
+
+
+# A view on the curtains of one home in a HomeStateStore. It has the same API as SmartCurtains.
+class CurtainsView:
+    __slots__ = ('_store', '_home')
+
+    def __init__(self, store: HomeStateStore, home: int) -> None:
+        self._store = store
+        self._home = home
+
+    @property
+    def mode(self) -> str:
+        return CURTAINS_MODES[self._store.curtains[self._home]]
+
+    def open(self) -> None:
+        curtains = self._store.curtains
+        curtains[self._home] = _CURTAINS['open'][curtains[self._home]]
+        emit('Curtains', 'mode', '\nCurtains: {}', self.mode)
+
+    def close(self) -> None:
+        curtains = self._store.curtains
+        curtains[self._home] = _CURTAINS['close'][curtains[self._home]]
+        emit('Curtains', 'mode', '\nCurtains: {}', self.mode)
+
+
+# The shared part of ACView and LightsView: a mode and an intensity packed into one code.
+class _PowerView:
+    __slots__ = ('_store', '_home')
+    _column = None # The name of the store column.
+    _tables = None # Method name -> transition table.
+    _name = None # The device name reported to the event sink.
+    _mode_template = None # The console text of a mode change (the same as the device class).
+    _intensity_template = None # The console text of an intensity change.
+
+    def __init__(self, store: HomeStateStore, home: int) -> None:
+        self._store = store
+        self._home = home
+
+    @property
+    def mode(self) -> str:
+        return POWER_MODES[getattr(self._store, self._column)[self._home] // 5]
+
+    @property
+    def intensity(self) -> object:
+        return INTENSITIES[getattr(self._store, self._column)[self._home] % 5]
+
+    def _apply(self, method: str) -> None:
+        column = getattr(self._store, self._column)
+        column[self._home] = self._tables[method][column[self._home]]
+
+    def turn_on(self) -> None:
+        self._apply('turn_on')
+        emit(self._name, 'mode', self._mode_template, self.mode)
+
+    def turn_off(self) -> None:
+        self._apply('turn_off')
+        emit(self._name, 'mode', self._mode_template, self.mode)
+
+    def set_low(self) -> None:
+        self._apply('set_low')
+        emit(self._name, 'intensity', self._intensity_template, self.intensity)
+
+    def set_high(self) -> None:
+        self._apply('set_high')
+        emit(self._name, 'intensity', self._intensity_template, self.intensity)
+
+
+# A view on the AC of one home in a HomeStateStore. It has the same API as SmartAC.
+class ACView(_PowerView):
+    __slots__ = ()
+    _column = 'ac'
+    _tables = _AC
+    _name = 'AC'
+    _mode_template = '\nAC: turned {}'
+    _intensity_template = '\nAC intensity: {}'
+
+
+# A view on the lights of one home in a HomeStateStore. It has the same API as SmartLights.
+class LightsView(_PowerView):
+    __slots__ = ()
+    _column = 'lights'
+    _tables = _LIGHTS
+    _name = 'Lights'
+    _mode_template = '\nLights: {}'
+    _intensity_template = '\nLights intensity: {}'
+
+
+# A short example: 10 homes, a morning routine in one home through the usual hub API, then a bulk leave_home.
+if __name__ == '__main__':
+    store = HomeStateStore(10)
+    hub = store.hub(3)
+    hub.morning()
+    hub.temperature('warm')
+    store.leave_home(store.mask_of(range(0, 10, 2)))
+    print(f'\nHome 3: {store.state(3)}')
+    print(f'Home 4: {store.state(4)}')
@@ -0,0 +1,8 @@
+'''
+Benchmarks of the design pattern modules.
+
+Each `benchmarks/<module>_<topic>.py` script is a standalone benchmark of one feature.
+`python -m benchmarks` runs the workloads of every module through one harness: it reports
+ops/sec, p50/p99 latency and peak memory, saves the results as JSON and flags the
+regressions against a saved baseline. Run `python -m benchmarks --help` from the repository root.
+'''
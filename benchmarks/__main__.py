@@ -0,0 +1,79 @@
+'''
+Run the benchmark workloads of every module.
+
+    python -m benchmarks --list
+    python -m benchmarks --output results.json
+    python -m benchmarks --only observer. mediator. --set observer.fanout.followers=10000
+    python -m benchmarks --baseline baseline.json --tolerance 0.15
+
+With `--baseline`, the exit status is 1 if a workload regressed, so it can be used in CI.
+'''
+
+
+import argparse
+import ast
+import sys
+
+from .harness import WORKLOADS, compare, load_results, run_workload, save_results
+from . import workloads # Registers the workloads.
+
+
+# Parse the `--set name.param=value` options into {workload name: {param: value}}.
+def parse_overrides(options: list) -> dict:
+    overrides = {}
+    for option in options:
+        key, separator, value = option.partition('=')
+        name, _, param = key.rpartition('.')
+        if not separator or name not in WORKLOADS or param not in WORKLOADS[name].params:
+            raise SystemExit(f'Invalid --set {option!r}: expected <workload>.<param>=<value>.')
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            pass # A plain string.
+        overrides.setdefault(name, {})[param] = value
+    return overrides
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Design pattern benchmark suite.')
+    parser.add_argument('--list', action='store_true', help='list the workloads and their parameters')
+    parser.add_argument('--only', nargs='+', default=[], metavar='PREFIX', help='run the workloads with these name prefixes')
+    parser.add_argument('--set', nargs='+', default=[], metavar='NAME.PARAM=VALUE', help='change workload parameters')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds to time each workload')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results with this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative drop of ops/sec')
+    parser.add_argument('--latency-tolerance', type=float, default=0.50, help='allowed relative growth of p99 latency')
+    args = parser.parse_args()
+
+    if args.list:
+        for workload in WORKLOADS.values():
+            params = ', '.join(f'{key}={value!r}' for key, value in workload.params.items())
+            print(f'{workload.name:<22} {params:<36} {workload.description}')
+        return
+
+    overrides = parse_overrides(args.set)
+    selected = [workload for name, workload in WORKLOADS.items()
+                if not args.only or any(name.startswith(prefix) for prefix in args.only)]
+    results = []
+    print(f'{"workload":<22} {"ops/sec":>14} {"p50 (us)":>10} {"p99 (us)":>10} {"peak (KiB)":>11}')
+    for workload in selected:
+        result = run_workload(workload, overrides.get(workload.name), min_time=args.min_time)
+        results.append(result)
+        print(f'{result.name:<22} {result.ops_per_sec:>14,.0f} {result.p50_us:>10,.1f} {result.p99_us:>10,.1f} '
+              f'{result.peak_kib:>11,.1f}')
+
+    if args.output:
+        save_results(args.output, results)
+        print(f'saved {len(results)} results to {args.output}')
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance, args.latency_tolerance)
+        for name, metric, previous, current, change in regressions:
+            print(f'REGRESSION {name} {metric}: {previous:,.1f} -> {current:,.1f} ({change:+.1%})')
+        if not regressions:
+            print(f'no regressions against {args.baseline} (tolerance {args.tolerance:.0%})')
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
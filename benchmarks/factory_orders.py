@@ -0,0 +1,79 @@
+'''
+Benchmark of bulk order processing in `creational/factory_method.py`.
+
+It processes the same orders (random vehicle keys, with a few invalid ones) one at a
+time with `run_code(key)`, in bulk with `process_orders()` over an in-memory list and
+from a JSON-lines file to another with `process_order_file()`. It prints the orders/sec
+of each case and the peak resident memory at the end.
+
+Run it from the repository root:
+    python benchmarks/factory_orders.py
+    python benchmarks/factory_orders.py --orders 5000000 --batch-size 16384
+'''
+
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational'))
+
+from factory_method import process_order_file, process_orders, run_code
+
+
+KEYS = ('car', 'truck', 'bus', 'f1', 'bike', 'boat')
+
+
+def one_at_a_time(keys: list) -> int:
+    count = 0
+    for key in keys:
+        run_code(key)
+        count += 1
+    return count
+
+
+def bulk(keys: list, batch_size: int) -> int:
+    count = 0
+    for _ in process_orders(keys, batch_size):
+        count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Vehicle bulk order processing benchmark.')
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    keys = [rng.choice(KEYS) for _ in range(args.orders)]
+    directory = tempfile.mkdtemp()
+    input_path = os.path.join(directory, 'orders.jsonl')
+    output_path = os.path.join(directory, 'results.jsonl')
+    with open(input_path, 'w', encoding='utf-8') as orders_file:
+        orders_file.writelines(json.dumps({'id': i, 'vehicle': key}) + '\n' for i, key in enumerate(keys))
+
+    cases = [
+        ('run_code one at a time', lambda: one_at_a_time(keys)),
+        ('process_orders (list)', lambda: bulk(keys, args.batch_size)),
+        ('process_order_file', lambda: process_order_file(input_path, output_path, args.batch_size)),
+    ]
+    print(f'{"case":<24} {"orders/sec":>14}')
+    for name, run in cases:
+        start = time.perf_counter()
+        assert run() == args.orders
+        elapsed = time.perf_counter() - start
+        print(f'{name:<24} {args.orders / elapsed:>14,.0f}')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'peak RSS: {peak / 2**20 if sys.platform == "darwin" else peak / 2**10:.1f} MiB')
+    os.remove(input_path)
+    os.remove(output_path)
+
+
+if __name__ == '__main__':
+    main()
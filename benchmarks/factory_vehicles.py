@@ -0,0 +1,106 @@
+'''
+Benchmark of creating vehicles with `creational/factory_method.py`.
+
+It compares the old path (a new factory dictionary on every call and a new vehicle
+on every order) with the module-level registry, the shared(flyweight) vehicles and
+the `VehiclePool`. For each case it prints the orders/sec, the factory and vehicle
+objects constructed per order and the peak traced memory (measured on a shorter run).
+
+Run it from the repository root:
+    python benchmarks/factory_vehicles.py
+    python benchmarks/factory_vehicles.py --orders 10000000
+'''
+
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational'))
+
+from factory_method import (BicycleFactory, BusFactory, CarFactory, Formula1Factory, TruckFactory,
+                            Vehicle, VehicleFactory, VehiclePool, create_vehicle)
+
+
+KEYS = ('car', 'truck', 'bus', 'f1', 'bike')
+
+
+# The path `run_code` used before the registry: a new dictionary of factories for every order.
+def old_path(orders: int) -> int:
+    total = 0
+    for i in range(orders):
+        factory_dict = {
+            'car': CarFactory(),
+            'truck': TruckFactory(),
+            'bus': BusFactory(),
+            'f1': Formula1Factory(),
+            'bike': BicycleFactory(),
+        }
+        total += len(factory_dict.get(KEYS[i % 5]).create_instance().order())
+    return total
+
+
+def registry(orders: int) -> int:
+    total = 0
+    for i in range(orders):
+        total += len(create_vehicle(KEYS[i % 5]).order())
+    return total
+
+
+def shared(orders: int) -> int:
+    total = 0
+    for i in range(orders):
+        total += len(create_vehicle(KEYS[i % 5], shared=True).order())
+    return total
+
+
+def pooled(orders: int) -> int:
+    total = 0
+    pool = VehiclePool()
+    for i in range(orders):
+        vehicle = pool.acquire(KEYS[i % 5])
+        total += len(vehicle.order())
+        pool.release(vehicle)
+    return total
+
+
+# Run a case with counting constructors on `Vehicle` and `VehicleFactory`(no subclass defines `__init__`).
+# Returns the objects constructed per order and the peak traced memory in KiB.
+def allocations(run: object, orders: int) -> tuple:
+    constructed = 0
+    def counting_init(self) -> None:
+        nonlocal constructed
+        constructed += 1
+    Vehicle.__init__ = VehicleFactory.__init__ = counting_init
+    tracemalloc.start()
+    try:
+        run(orders)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        del Vehicle.__init__, VehicleFactory.__init__
+    return constructed / orders, peak / 2**10
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Vehicle factory registry and pool benchmark.')
+    parser.add_argument('--orders', type=int, default=2_000_000)
+    parser.add_argument('--allocation-orders', type=int, default=100_000)
+    args = parser.parse_args()
+
+    cases = [('old path', old_path), ('registry', registry), ('shared', shared), ('pool', pooled)]
+    expected = old_path(1000)
+    print(f'{"case":<10} {"orders/sec":>14} {"objects/order":>14} {"peak (KiB)":>11}')
+    for name, run in cases:
+        assert run(1000) == expected
+        objects, peak = allocations(run, args.allocation_orders)
+        start = time.perf_counter()
+        run(args.orders)
+        elapsed = time.perf_counter() - start
+        print(f'{name:<10} {args.orders / elapsed:>14,.0f} {objects:>14.3f} {peak:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
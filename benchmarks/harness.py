@@ -0,0 +1,156 @@
+'''
+The benchmark harness used by `python -m benchmarks`.
+
+A workload is registered with the `workload` decorator. Its setup function takes the workload's
+parameters and returns a callable that does one call of work (for example one message to all the
+followers of a channel). `ops` is the number of operations in one call, so the results of
+different workloads are all in operations per second.
+
+`run_workload` times each call separately to report the ops/sec and the p50/p99 latency of a call,
+then measures the peak memory with `tracemalloc` in a separate, shorter run, because tracing slows the
+code down. The results are saved as JSON, and `compare` flags the workloads that became slower than a
+saved baseline.
+'''
+
+
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules of the repository are plain modules in these directories(not packages).
+for directory in ('behavioral', 'creational'):
+    if os.path.join(ROOT, directory) not in sys.path:
+        sys.path.insert(0, os.path.join(ROOT, directory))
+
+
+class Workload:
+    def __init__(self, name: str, setup: object, ops: object, params: dict) -> None:
+        self.name = name
+        self.setup = setup
+        self.ops = ops # The operations in one call: a number, or a function of the parameters.
+        self.params = params # The default parameters.
+        self.description = (setup.__doc__ or '').strip()
+
+    def ops_per_call(self, params: dict) -> int:
+        return self.ops(params) if callable(self.ops) else self.ops
+
+
+# All the registered workloads: name -> Workload.
+WORKLOADS = {}
+
+
+# Register a workload. The keyword arguments are its default parameters.
+def workload(name: str, ops: object=1, **params):
+    def register(setup: object) -> object:
+        WORKLOADS[name] = Workload(name, setup, ops, params)
+        return setup
+    return register
+
+
+class Result:
+    def __init__(self, name: str, params: dict, calls: int, ops_per_sec: float, p50_us: float, p99_us: float,
+                 peak_kib: float) -> None:
+        self.name = name
+        self.params = params
+        self.calls = calls
+        self.ops_per_sec = ops_per_sec
+        self.p50_us = p50_us # The latency of one call, in microseconds.
+        self.p99_us = p99_us
+        self.peak_kib = peak_kib
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Result':
+        return cls(**data)
+
+    def __repr__(self) -> str:
+        return (f'Result({self.name!r}, ops_per_sec={self.ops_per_sec:,.0f}, p50_us={self.p50_us:.1f}, '
+                f'p99_us={self.p99_us:.1f}, peak_kib={self.peak_kib:.1f})')
+
+
+# The value at `fraction`(0 to 1) of sorted values(the nearest rank).
+def percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_workload(workload: Workload, params: dict | None=None, min_time: float=1.0, min_calls: int=10,
+                 warmup: int=2, memory_calls: int=3) -> Result:
+    params = {**workload.params, **(params or {})}
+    ops = workload.ops_per_call(params)
+
+    call = workload.setup(**params)
+    for _ in range(warmup):
+        call()
+    durations = []
+    gc.collect()
+    clock = time.perf_counter_ns
+    deadline = clock() + int(min_time * 1e9)
+    while len(durations) < min_calls or clock() < deadline:
+        start = clock()
+        call()
+        durations.append(clock() - start)
+    del call
+    durations.sort()
+
+    # The peak memory of the setup and a few calls, with the memory before the setup subtracted.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call = workload.setup(**params)
+        for _ in range(memory_calls):
+            call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return Result(
+        workload.name, params, len(durations),
+        ops * len(durations) / (sum(durations) / 1e9),
+        percentile(durations, 0.50) / 1e3,
+        percentile(durations, 0.99) / 1e3,
+        peak / 2**10,
+    )
+
+
+def save_results(path: str, results: list) -> None:
+    data = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': {result.name: result.to_dict() for result in results},
+    }
+    with open(path, 'w', encoding='utf-8') as results_file:
+        json.dump(data, results_file, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding='utf-8') as results_file:
+        data = json.load(results_file)
+    return {name: Result.from_dict(result) for name, result in data['results'].items()}
+
+
+# Compare results with a baseline(name -> Result). A workload regressed if its ops/sec dropped by more than
+# `tolerance`, or its p99 latency grew by more than `latency_tolerance`(fractions; the p99 of a short run is
+# noisier than its throughput). Workloads with other parameters are not compared.
+# Returns a list of (name, metric, baseline value, current value, relative change).
+def compare(results: list, baseline: dict, tolerance: float=0.10, latency_tolerance: float=0.50) -> list:
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None or previous.params != result.params:
+            continue
+        change = result.ops_per_sec / previous.ops_per_sec - 1
+        if change < -tolerance:
+            regressions.append((result.name, 'ops_per_sec', previous.ops_per_sec, result.ops_per_sec, change))
+        change = result.p99_us / previous.p99_us - 1
+        if change > latency_tolerance:
+            regressions.append((result.name, 'p99_us', previous.p99_us, result.p99_us, change))
+    return regressions
@@ -0,0 +1,72 @@
+'''
+Import-time benchmark of the modules of the repository.
+
+Each module is imported in a new interpreter with `python -X importtime`, a few times.
+The script prints the median of the module's own and cumulative import times (in microseconds).
+It also checks that importing does not print anything or start any threads.
+
+Run it from the repository root:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 20 --modules creational/singleton.py
+'''
+
+
+import argparse
+import glob
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports the module and prints the names of the threads that are alive afterwards to stderr.
+CHECK = 'import threading, sys; import {module}; print(*sorted(t.name for t in threading.enumerate()), file=sys.stderr)'
+
+
+def import_once(path: str) -> tuple:
+    module = os.path.splitext(os.path.basename(path))[0]
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHECK.format(module=module)],
+        cwd=os.path.dirname(path), capture_output=True, text=True, check=True,
+    )
+    self_time = cumulative = None
+    other_lines = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            other_lines.append(line)
+            continue
+        fields = [field.strip() for field in line[len('import time:'):].split('|')]
+        if fields[2] == module:
+            self_time, cumulative = int(fields[0]), int(fields[1])
+    return self_time, cumulative, result.stdout, other_lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Import time and import side effects of the modules.')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--modules', nargs='+', default=sorted(
+        glob.glob(os.path.join(ROOT, 'creational', '*.py')) + glob.glob(os.path.join(ROOT, 'behavioral', '*.py'))
+    ))
+    args = parser.parse_args()
+
+    failed = False
+    print(f'{"module":<34} {"self (us)":>10} {"cumulative (us)":>16}  side effects')
+    for path in args.modules:
+        runs = [import_once(os.path.abspath(path)) for _ in range(args.repeat)]
+        self_time = statistics.median(run[0] for run in runs)
+        cumulative = statistics.median(run[1] for run in runs)
+        _, _, output, other_lines = runs[-1]
+        problems = []
+        if output:
+            problems.append(f'printed {len(output.splitlines())} lines')
+        if other_lines != ['MainThread']:
+            problems.append(f'threads/stderr: {other_lines}')
+        failed = failed or bool(problems)
+        name = os.path.relpath(path, ROOT)
+        print(f'{name:<34} {self_time:>10,.0f} {cumulative:>16,.0f}  {", ".join(problems) or "none"}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+'''
+Overhead benchmark of `behavioral/instrumentation.py`.
+
+It times three instrumented hot paths:
+- `Channel.send_message` to 10 followers;
+- `SmartHomeHub.temperature`, alternating warm and cold;
+- `create_vehicle`, which calls `VehicleFactory.create_instance`.
+Each path is timed before the metrics were ever enabled (pristine), then in several rounds
+while they are disabled and enabled with 1% and 100% sampling. The best time of each mode is kept.
+
+The instrumented methods are only installed while the metrics are enabled, so the disabled
+paths run the original methods. The script checks that, and exits with status 1 if a disabled
+path is more than `--max-cost`(2% by default) slower than the pristine one. The best of `--repeat`
+rounds is compared, so use more rounds on a noisy machine.
+
+Run it from the repository root:
+    python benchmarks/instrumentation_overhead.py
+    python benchmarks/instrumentation_overhead.py --calls 50000 --repeat 20 --max-cost 0.1
+'''
+
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'behavioral'), os.path.join(ROOT, 'creational')]
+
+from event_sink import NullSink, set_sink
+from factory_method import CarFactory, create_vehicle
+from instrumentation import METRICS
+from mediator import AIAssistant, SmartAC, SmartCurtains, SmartDoor, SmartHomeHub, SmartLights
+from observer import Channel, User
+
+
+def make_paths() -> dict:
+    channel = Channel('news')
+    users = [User(f'user{i}') for i in range(10)]
+    for user in users:
+        channel.add_follower(user)
+    hub = SmartHomeHub(SmartDoor(), SmartAC(), SmartLights(), SmartCurtains(), AIAssistant())
+
+    def send(calls: int) -> None:
+        for _ in range(calls):
+            channel.send_message('news')
+    send.followers = users # The channel only keeps weak references to its followers.
+
+    def temperature(calls: int) -> None:
+        for i in range(calls):
+            hub.temperature('w' if i & 1 else 'c')
+
+    def create(calls: int) -> None:
+        for _ in range(calls):
+            create_vehicle('car')
+
+    return {'send_message': send, 'hub.temperature': temperature, 'create_instance': create}
+
+
+def rate(run: object, calls: int) -> float:
+    start = time.perf_counter()
+    run(calls)
+    return calls / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Instrumentation overhead benchmark.')
+    parser.add_argument('--calls', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--max-cost', type=float, default=0.02, help='fail if a disabled path is this much slower')
+    args = parser.parse_args()
+
+    set_sink(NullSink())
+    paths = make_paths()
+    originals = (Channel.send_message, SmartHomeHub.temperature, CarFactory.create_instance)
+    modes = ('pristine', 'disabled', 'enabled 1%', 'enabled 100%')
+    rates = {name: dict.fromkeys(modes, 0.0) for name in paths}
+    for name, run in paths.items():
+        for _ in range(args.repeat):
+            rates[name]['pristine'] = max(rates[name]['pristine'], rate(run, args.calls))
+    # The rounds alternate the modes, so a slow period of the machine does not favour one of them.
+    for _ in range(args.repeat):
+        for mode, sample_rate in (('disabled', None), ('enabled 1%', 0.01), ('enabled 100%', 1.0)):
+            if sample_rate is None:
+                METRICS.disable()
+            else:
+                METRICS.enable(sample_rate)
+            for name, run in paths.items():
+                rates[name][mode] = max(rates[name][mode], rate(run, args.calls))
+    METRICS.disable()
+    assert (Channel.send_message, SmartHomeHub.temperature, CarFactory.create_instance) == originals
+
+    print(f'{"path":<16}' + ''.join(f'{mode:>16}' for mode in modes) + f'{"disabled cost":>15}')
+    worst = 0.0
+    for name, by_mode in rates.items():
+        cost = by_mode['pristine'] / by_mode['disabled'] - 1
+        worst = max(worst, cost)
+        print(f'{name:<16}' + ''.join(f'{by_mode[mode]:>16,.0f}' for mode in modes) + f'{cost:>15.1%}')
+    print('calls/sec; the disabled paths run the original methods (checked).')
+    sys.exit(1 if worst > args.max_cost else 0)
+
+
+if __name__ == '__main__':
+    main()
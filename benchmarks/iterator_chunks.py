@@ -0,0 +1,96 @@
+'''
+Benchmark of per-item and chunked iteration in `creational/iterator.py`.
+
+It sums an `array.array` of int32 items (and the same items in a memory-mapped file)
+with a plain `for` loop, `Iterator.next()`, `PythonicIterator.__next__()` and
+`next_chunk(n)` for a few chunk sizes, and prints the items/sec of each.
+
+Run it from the repository root:
+    python benchmarks/iterator_chunks.py
+    python benchmarks/iterator_chunks.py --items 10000000 --chunks 1024 65536
+'''
+
+
+import argparse
+import array
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational'))
+
+from iterator import Iterator, MappedFileIterator, PythonicIterator
+
+
+def plain_for(items: object) -> int:
+    total = 0
+    for item in items:
+        total += item
+    return total
+
+
+def per_item_next(items: object) -> int:
+    total = 0
+    iterator = Iterator(items)
+    while iterator.has_next():
+        total += iterator.next()
+    return total
+
+
+def pythonic_next(items: object) -> int:
+    total = 0
+    for item in PythonicIterator(items):
+        total += item
+    return total
+
+
+def chunked(items: object, size: int) -> int:
+    total = 0
+    iterator = PythonicIterator(items)
+    while iterator.has_next():
+        total += sum(iterator.next_chunk(size))
+    return total
+
+
+def mapped_chunked(path: str, size: int) -> int:
+    total = 0
+    with MappedFileIterator(path, 'i') as iterator:
+        while iterator.has_next():
+            chunk = iterator.next_chunk(size)
+            total += sum(chunk)
+            chunk.release()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Iterator per-item vs chunked benchmark.')
+    parser.add_argument('--items', type=int, default=5_000_000)
+    parser.add_argument('--chunks', type=int, nargs='+', default=[64, 4096, 65536])
+    args = parser.parse_args()
+
+    items = array.array('i', range(args.items))
+    expected = sum(items)
+    path = os.path.join(tempfile.mkdtemp(), 'items.bin')
+    with open(path, 'wb') as binary_file:
+        items.tofile(binary_file)
+
+    cases = [
+        ('plain for loop', lambda: plain_for(items)),
+        ('Iterator.next()', lambda: per_item_next(items)),
+        ('PythonicIterator', lambda: pythonic_next(items)),
+    ]
+    cases += [(f'next_chunk({size})', lambda size=size: chunked(items, size)) for size in args.chunks]
+    cases += [(f'mmap next_chunk({size})', lambda size=size: mapped_chunked(path, size)) for size in args.chunks]
+
+    print(f'{"case":<26} {"items/sec":>16}')
+    for name, run in cases:
+        start = time.perf_counter()
+        assert run() == expected
+        elapsed = time.perf_counter() - start
+        print(f'{name:<26} {args.items / elapsed:>16,.0f}')
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Scaling benchmark of parallel_map/parallel_reduce in `creational/parallel_iterator.py`.
+
+A CPU-heavy function runs on every item of a range with 1 to N worker processes
+(the default is 1, 2, 4, ... up to the number of CPU cores), with ordered and
+unordered merging, and the speed-up over a single process is printed.
+
+Run it from the repository root:
+    python benchmarks/iterator_parallel.py
+    python benchmarks/iterator_parallel.py --items 200000 --work 200 --processes 1 2 4 8
+'''
+
+
+import argparse
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational'))
+
+from parallel_iterator import PartitionedIterator, parallel_map, parallel_reduce
+
+
+# A CPU-bound function: a small integer hash loop of `work` steps.
+def heavy(x: int, work: int=100) -> int:
+    value = x
+    for _ in range(work):
+        value = (value * 1103515245 + 12345) & 0x7FFFFFFF
+    return value & 0xFF
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def default_processes() -> list:
+    counts = []
+    count = 1
+    while count < (os.cpu_count() or 1):
+        counts.append(count)
+        count *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Parallel map/reduce scaling benchmark.')
+    parser.add_argument('--items', type=int, default=200_000)
+    parser.add_argument('--work', type=int, default=100)
+    parser.add_argument('--processes', type=int, nargs='+', default=default_processes())
+    args = parser.parse_args()
+    function = functools.partial(heavy, work=args.work) # A partial of a module-level function can be pickled.
+
+    start = time.perf_counter()
+    expected = sum(function(x) for x in range(args.items))
+    sequential = time.perf_counter() - start
+    print(f'sequential: {sequential:.2f}s ({os.cpu_count()} CPU cores)')
+    print(f'{"processes":>9} {"map ordered":>12} {"map unordered":>14} {"reduce":>8} {"speed-up":>9}')
+
+    for processes in args.processes:
+        timings = []
+        for run in ('ordered', 'unordered', 'reduce'):
+            start = time.perf_counter()
+            if run == 'reduce':
+                result = parallel_reduce(add, PartitionedIterator(range(args.items)), 0, map_function=function, processes=processes)
+            else:
+                result = sum(parallel_map(function, PartitionedIterator(range(args.items)), processes=processes, ordered=run == 'ordered'))
+            timings.append(time.perf_counter() - start)
+            assert result == expected
+        print(f'{processes:>9} {timings[0]:>11.2f}s {timings[1]:>13.2f}s {timings[2]:>7.2f}s {sequential / timings[2]:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+'''
+Benchmark of the lazy, fused pipeline operators of PythonicIterator in `creational/iterator.py`.
+
+The same chain of steps(map -> filter -> window -> batch -> map) runs eagerly with list
+comprehensions(a full intermediate list per step) and lazily as a Pipeline. The peak memory
+(measured with tracemalloc, in a separate run) and the run time of both are printed.
+
+Run it from the repository root:
+    python benchmarks/iterator_pipeline.py
+    python benchmarks/iterator_pipeline.py --items 10000000
+'''
+
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational'))
+
+from iterator import PythonicIterator
+
+
+def eager(items: range) -> int:
+    squares = [x * x for x in items]
+    odd = [x for x in squares if x & 1]
+    windows = [(odd[i], odd[i + 1]) for i in range(len(odd) - 1)]
+    batches = [windows[i:i + 100] for i in range(0, len(windows), 100)]
+    sizes = [len(batch) for batch in batches]
+    return sum(sizes)
+
+
+def lazy(items: range) -> int:
+    pipeline = PythonicIterator(items).map(lambda x: x * x).filter(lambda x: x & 1).window(2).batch(100).map(len)
+    return sum(pipeline)
+
+
+# Time one run without tracing(tracemalloc slows every allocation down), then trace a second run for the peak memory.
+def measure(function: object, items: range) -> tuple:
+    start = time.perf_counter()
+    result = function(items)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(items)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Lazy pipeline vs eager list comprehensions benchmark.')
+    parser.add_argument('--items', type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    items = range(args.items) # A range is a sequence that does not store its items.
+    print(f'{"mode":<8} {"peak memory (MiB)":>18} {"time (s)":>10}')
+    results = set()
+    for name, function in (('eager', eager), ('lazy', lazy)):
+        result, elapsed, peak = measure(function, items)
+        results.add(result)
+        print(f'{name:<8} {peak / 2**20:>18.2f} {elapsed:>10.2f}')
+    assert len(results) == 1
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+'''
+Benchmark of the event-driven SmartHomeHub in `behavioral/mediator.py`.
+
+It writes a replayable event log (JSON lines) with random temperature, time-of-day
+and presence events, loads it back and replays it through the hub's asyncio event
+loop. Device output is sent to a NullSink, so the rule dispatch is what is measured.
+
+Run it from the repository root:
+    python benchmarks/mediator_events.py
+    python benchmarks/mediator_events.py --events 1000000 --log events.jsonl
+'''
+
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from event_sink import NullSink, using_sink
+from mediator import (AIAssistant, SensorEvent, SmartAC, SmartCurtains, SmartDoor, SmartHomeHub,
+                      SmartLights, load_event_log, replay_events, save_event_log)
+
+
+def make_hub() -> SmartHomeHub:
+    return SmartHomeHub(SmartDoor(), SmartAC(), SmartLights(), SmartCurtains(), AIAssistant())
+
+
+# Random events with a realistic mix: mostly temperature readings, some time-of-day and presence changes.
+def make_events(count: int, seed: int=42) -> list:
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.7:
+            value = rng.choice(('c', 'w', 'o')) if rng.random() < 0.3 else round(rng.uniform(10, 35), 1)
+            events.append(SensorEvent('temperature', value, i))
+        elif roll < 0.9:
+            events.append(SensorEvent('time_of_day', rng.choice(('morning', 'night')), i))
+        else:
+            events.append(SensorEvent('presence', rng.choice(('home', 'away')), i))
+    return events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='SmartHomeHub event replay benchmark.')
+    parser.add_argument('--events', type=int, default=200_000)
+    parser.add_argument('--log', help='replay this event log instead of a generated one')
+    args = parser.parse_args()
+
+    if args.log and os.path.exists(args.log):
+        path = args.log
+    else:
+        path = args.log or os.path.join(tempfile.mkdtemp(), 'events.jsonl')
+        save_event_log(path, make_events(args.events))
+
+    start = time.perf_counter()
+    events = load_event_log(path)
+    print(f'load:   {len(events)} events in {time.perf_counter() - start:.2f}s from {path}')
+
+    with using_sink(NullSink()):
+        hub = make_hub()
+        start = time.perf_counter()
+        handled = asyncio.run(replay_events(hub, events))
+        elapsed = time.perf_counter() - start
+    print(f'replay: {handled} events in {elapsed:.2f}s = {handled / elapsed:,.0f} events/sec')
+    print(f'device commands: {hub.command_stats}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+'''
+Benchmark of HubFleet in `behavioral/smart_home_fleet.py`.
+
+It drives many simulated homes (100,000 by default) with a stream of sensor events,
+for a range of worker process counts, and reports the events/sec of each run.
+It also measures how long adding one worker (shard rebalancing) takes.
+
+Run it from the repository root:
+    python benchmarks/mediator_fleet.py
+    python benchmarks/mediator_fleet.py --homes 100000 --events-per-home 10 --workers 1 2 4 8
+'''
+
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from smart_home_fleet import HubFleet
+
+
+def make_batches(homes: int, events_per_home: int, batch_size: int, seed: int=42) -> list:
+    rng = random.Random(seed)
+    kinds = (('temperature', 12), ('temperature', 30), ('temperature', 'o'), ('time_of_day', 'morning'),
+             ('time_of_day', 'night'), ('presence', 'away'))
+    events = [(rng.randrange(homes),) + rng.choice(kinds) for _ in range(homes * events_per_home)]
+    return [events[i:i + batch_size] for i in range(0, len(events), batch_size)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='SmartHomeHub fleet benchmark.')
+    parser.add_argument('--homes', type=int, default=100_000)
+    parser.add_argument('--events-per-home', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--shards', type=int, default=256)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    batches = make_batches(args.homes, args.events_per_home, args.batch_size)
+    total = sum(len(batch) for batch in batches)
+    print(f'{total} events for {args.homes} homes ({os.cpu_count()} CPU cores)')
+    print(f'{"workers":>8} {"events/sec":>12} {"speed-up":>9} {"add worker (s)":>15}')
+
+    baseline = None
+    for workers in args.workers:
+        with HubFleet(workers=workers, shards=args.shards) as fleet:
+            fleet.send_events([(home_id, 'presence', 'home') for home_id in range(args.homes)])
+            fleet.flush()
+            start = time.perf_counter()
+            for batch in batches:
+                fleet.send_events(batch)
+            fleet.flush()
+            rate = total / (time.perf_counter() - start)
+            baseline = baseline or rate
+
+            start = time.perf_counter()
+            fleet.add_worker()
+            rebalance = time.perf_counter() - start
+            assert len(fleet.snapshot()) == args.homes
+        print(f'{workers:>8} {rate:>12,.0f} {rate / baseline:>8.2f}x {rebalance:>15.3f}')
+
+
+if __name__ == '__main__':
+    main()
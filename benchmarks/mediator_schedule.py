@@ -0,0 +1,129 @@
+'''
+Dispatch benchmark of the Scheduler in `behavioral/smart_home_scheduler.py`, on a SimulatedClock.
+
+- dispatch (distinct deadlines): `--jobs` no-op jobs every 10 minutes, each with its own phase, for one simulated day.
+- dispatch (shared deadlines): `--jobs` daily no-op jobs at 4 times of day, for `--days` days.
+- hub routines: `--homes` SmartHomeHub objects with their own morning and night jobs, for `--days` days.
+- fleet routines: `--fleet-homes` homes of a HomeStateStore in a FleetSchedule(one job per time of day), for `--days` days.
+- debounced events: bursts of temperature events for every hub, debounced per AC.
+The jobs/sec column counts the jobs run by the scheduler, and the routines/sec column counts a routine of one
+home as one. The device output goes to a NullSink.
+
+Run it from the repository root:
+    python benchmarks/mediator_schedule.py
+    python benchmarks/mediator_schedule.py --homes 5000 --fleet-homes 100000 --days 365
+'''
+
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from event_sink import NullSink, set_sink
+from mediator import AIAssistant, SensorEvent, SmartAC, SmartCurtains, SmartDoor, SmartHomeHub, SmartLights
+from smart_home_scheduler import FleetSchedule, HubScheduler, Scheduler, SimulatedClock
+from smart_home_store import HomeStateStore
+
+START = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+MORNINGS = ('06:00', '06:30', '07:00', '07:30')
+NIGHTS = ('21:00', '21:30', '22:00', '22:30')
+
+
+def noop() -> None:
+    pass
+
+
+# Run the scheduler until `seconds` later. Returns (jobs run, wall seconds).
+def fast_forward(scheduler: Scheduler, seconds: float) -> tuple:
+    start = time.perf_counter()
+    run = scheduler.run_until(scheduler.time() + seconds)
+    return run, time.perf_counter() - start
+
+
+def distinct_deadlines(jobs: int) -> tuple:
+    scheduler = Scheduler(SimulatedClock(START))
+    for i in range(jobs):
+        scheduler.every(600.0, noop, start=START + 600.0 * i / jobs)
+    run, seconds = fast_forward(scheduler, 86400)
+    return run, run, seconds
+
+
+def shared_deadlines(jobs: int, days: int) -> tuple:
+    scheduler = Scheduler(SimulatedClock(START))
+    for i in range(jobs):
+        scheduler.daily(MORNINGS[i % 4], noop)
+    run, seconds = fast_forward(scheduler, days * 86400)
+    return run, run, seconds
+
+
+def make_hub() -> SmartHomeHub:
+    return SmartHomeHub(SmartDoor(), SmartAC(), SmartLights(), SmartCurtains(), AIAssistant())
+
+
+def hub_routines(homes: int, days: int) -> tuple:
+    scheduler = Scheduler(SimulatedClock(START))
+    hubs = [make_hub() for _ in range(homes)]
+    for i, hub in enumerate(hubs):
+        HubScheduler(hub, scheduler).schedule_routines(MORNINGS[i % 4], NIGHTS[i % 4])
+    run, seconds = fast_forward(scheduler, days * 86400)
+    return run, run, seconds
+
+
+def fleet_routines(homes: int, days: int) -> tuple:
+    scheduler = Scheduler(SimulatedClock(START))
+    store = HomeStateStore(homes)
+    fleet = FleetSchedule(store, scheduler)
+    for home in range(homes):
+        fleet.daily(home, MORNINGS[home % 4], 'morning')
+        fleet.daily(home, NIGHTS[home % 4], 'night')
+    run, seconds = fast_forward(scheduler, days * 86400)
+    return run, 2 * homes * days, seconds
+
+
+# Every hub receives bursts of 10 temperature events, 1 second apart, every 10 minutes of a simulated day.
+# Returns (events, routines run, seconds).
+def debounced_events(homes: int) -> tuple:
+    clock = SimulatedClock(START)
+    scheduler = Scheduler(clock)
+    hub_schedulers = [HubScheduler(make_hub(), scheduler, debounce={'ac': 30.0}) for _ in range(homes)]
+    events = 0
+    start = time.perf_counter()
+    for burst in range(144):
+        for second in range(10):
+            for hub_scheduler in hub_schedulers:
+                hub_scheduler.submit(SensorEvent('temperature', 'warm' if (burst + second) % 2 else 'cold', clock.now))
+            events += homes
+            clock.advance(1)
+            scheduler.run_pending()
+        scheduler.run_until(clock.now + 590)
+    return events, scheduler.stats.run, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Scheduler dispatch benchmark.')
+    parser.add_argument('--jobs', type=int, default=10_000)
+    parser.add_argument('--homes', type=int, default=1000)
+    parser.add_argument('--fleet-homes', type=int, default=10_000)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    set_sink(NullSink())
+    cases = [
+        ('dispatch (distinct deadlines)', lambda: distinct_deadlines(args.jobs)),
+        ('dispatch (shared deadlines)', lambda: shared_deadlines(args.jobs, args.days)),
+        ('hub routines', lambda: hub_routines(args.homes, args.days)),
+        ('fleet routines', lambda: fleet_routines(args.fleet_homes, args.days)),
+    ]
+    print(f'{"case":<30} {"jobs":>12} {"jobs/sec":>12} {"routines/sec":>14} {"seconds":>9}')
+    for name, run in cases:
+        jobs, routines, seconds = run()
+        print(f'{name:<30} {jobs:>12,} {jobs / seconds:>12,.0f} {routines / seconds:>14,.0f} {seconds:>9.2f}')
+    events, run, seconds = debounced_events(args.homes // 10)
+    print(f'\ndebounced events: {events:,} events -> {run:,} routines, {events / seconds:,.0f} events/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+'''
+Benchmark of HomeStateStore in `behavioral/smart_home_store.py`.
+
+- Memory: bytes per home (4 devices) for device objects compared with the columnar store.
+- Bulk transitions: `leave_home` for the homes in a mask, with one call per device object
+  compared with one masked pass per store column.
+
+Run it from the repository root:
+    python benchmarks/mediator_store.py
+    python benchmarks/mediator_store.py --homes 1000000 --selected 0.5
+'''
+
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from event_sink import NullSink, using_sink
+from mediator import SmartAC, SmartCurtains, SmartDoor, SmartLights
+from smart_home_store import HomeStateStore
+
+
+# The devices of one home as plain objects (the hub routines only need the devices).
+def make_objects(homes: int) -> list:
+    return [(SmartDoor('unlocked'), SmartAC('on', 'high'), SmartLights('on', 'low'), SmartCurtains('open')) for _ in range(homes)]
+
+
+def measure(factory: object) -> tuple:
+    tracemalloc.start()
+    result = factory()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Columnar device state store benchmark.')
+    parser.add_argument('--homes', type=int, default=1_000_000)
+    parser.add_argument('--selected', type=float, default=0.5, help='fraction of homes in the mask')
+    args = parser.parse_args()
+
+    objects, objects_size = measure(lambda: make_objects(args.homes))
+    store, store_size = measure(lambda: HomeStateStore(args.homes, door='unlocked', ac=('on', 'high'), lights=('on', 'low'), curtains='open'))
+    print(f'memory per home (4 devices): objects {objects_size / args.homes:.1f} B, store {store_size / args.homes:.1f} B')
+
+    rng = random.Random(42)
+    selected = [home for home in range(args.homes) if rng.random() < args.selected]
+    mask = store.mask_of(selected)
+
+    with using_sink(NullSink()):
+        start = time.perf_counter()
+        for home in selected:
+            door, ac, lights, curtains = objects[home]
+            door.lock()
+            ac.turn_off()
+            lights.turn_off()
+            curtains.close()
+        objects_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.leave_home(mask)
+    store_time = time.perf_counter() - start
+
+    door, ac, lights, curtains = objects[selected[0]]
+    assert store.state(selected[0]) == {'door': door.mode, 'ac': (ac.mode, ac.intensity), 'lights': (lights.mode, lights.intensity), 'curtains': curtains.mode}
+    print(f'leave_home for {len(selected)} homes: objects {objects_time:.3f}s, store {store_time:.4f}s ({objects_time / store_time:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+Benchmark of the Observer fan-out in `behavioral/observer.py`.
+
+It compares the per-follower path (`Channel.send_message` called once per message)
+with the batch path (`Channel.send_messages` + BatchDeliveryEngine) for different
+numbers of followers and messages.
+
+Run it from the repository root:
+    python benchmarks/observer_fanout.py
+    python benchmarks/observer_fanout.py --followers 1000 100000 --messages 1 100
+'''
+
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from observer import Channel, Observer
+
+
+# An observer that only counts the messages it receives (no I/O, so we measure the fan-out itself).
+class CountingObserver(Observer):
+    def __init__(self) -> None:
+        self.received = 0
+
+    def channel_updated(self, channel_name: str, message: str) -> None:
+        self.received += 1
+
+
+# The same observer, but with a class-level batch hook used by BatchDeliveryEngine.
+class BatchCountingObserver(CountingObserver):
+    @classmethod
+    def channels_updated_batch(cls, observers: list, channel_name: str, messages: list) -> None:
+        count = len(messages)
+        for observer in observers:
+            observer.received += count
+
+
+# Run one scenario and return the elapsed seconds.
+def run(observer_class: type, followers: int, messages: int, batch: bool) -> float:
+    channel = Channel('benchmark')
+    # Keep strong references: the channel only holds weak references to its followers.
+    observers = [observer_class() for _ in range(followers)]
+    for observer in observers:
+        channel.add_follower(observer)
+    payload = [f'message {i}' for i in range(messages)]
+
+    start = time.perf_counter()
+    if batch:
+        channel.send_messages(payload)
+    else:
+        for message in payload:
+            channel.send_message(message)
+    elapsed = time.perf_counter() - start
+
+    # Make sure both paths did the same amount of work.
+    assert all(observer.received == messages for observer in observers)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Observer fan-out benchmark.')
+    parser.add_argument('--followers', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--messages', type=int, nargs='+', default=[1, 100])
+    args = parser.parse_args()
+
+    print(f'{"followers":>10} {"messages":>9} {"per-follower (s)":>17} {"batch (s)":>10} {"speed-up":>9}')
+    for followers in args.followers:
+        for messages in args.messages:
+            per_follower = run(CountingObserver, followers, messages, batch=False)
+            batch = run(BatchCountingObserver, followers, messages, batch=True)
+            print(f'{followers:>10} {messages:>9} {per_follower:>17.4f} {batch:>10.4f} {per_follower / batch:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+'''
+Write and replay benchmark of `behavioral/observer_log.py`.
+
+It writes `--messages` messages of `--size` bytes to a LoggedChannel (in batches with `send_messages`,
+and a smaller part one by one with `send_message`), then replays the whole log:
+- read files: a plain sequential read of the segment files, the upper bound of the disk(or page cache);
+- replay: `ChannelLog.replay`, the decoded batches of messages;
+- subscribe (batch): `LoggedChannel.subscribe` of an observer with `channels_updated_batch`;
+- subscribe (one by one): the same with an observer that only has `channel_updated`;
+- resend history: the old back-fill, every message sent again with `Channel.send_message` to the new observer.
+It also times `offset_at` (a timestamp lookup) and a replay from the middle of the log.
+
+The files were just written, so they are usually read from the page cache. Drop the cache between the
+write and the replay(e.g. `echo 3 > /proc/sys/vm/drop_caches` as root, with `--pause`) to read from the disk.
+
+Run it from the repository root:
+    python benchmarks/observer_log.py
+    python benchmarks/observer_log.py --messages 10000000 --size 64
+'''
+
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from observer import Channel, Observer
+from observer_log import ChannelLog, LoggedChannel
+
+
+class CountingObserver(Observer):
+    def __init__(self) -> None:
+        self.received = 0
+
+    def channel_updated(self, channel_name: str, message: str) -> None:
+        self.received += 1
+
+
+class BatchCountingObserver(CountingObserver):
+    @classmethod
+    def channels_updated_batch(cls, observers: list, channel_name: str, messages: list) -> None:
+        for observer in observers:
+            observer.received += len(messages)
+
+
+def timed(function: object) -> tuple:
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def read_files(directory: str) -> int:
+    total = 0
+    buffer = bytearray(1 << 20)
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb', buffering=0) as segment_file:
+            while read := segment_file.readinto(buffer):
+                total += read
+    return total
+
+
+def replay_all(log: ChannelLog) -> int:
+    return sum(len(messages) for _, messages in log.replay(0))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Channel log write and replay benchmark.')
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--size', type=int, default=32, help='bytes per message')
+    parser.add_argument('--batch', type=int, default=1024, help='messages per send_messages call')
+    parser.add_argument('--directory', default=None, help='where to write the log (a temporary directory by default)')
+    parser.add_argument('--pause', action='store_true', help='wait for Enter between the write and the replay')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(dir=args.directory)
+    template = f'%0{args.size}d'
+    one_by_one = min(args.messages // 10, 100_000)
+    try:
+        log = ChannelLog(directory)
+        channel = LoggedChannel('bench', log)
+        live = CountingObserver()
+        channel.add_follower(live)
+
+        def write_batches() -> None:
+            for start in range(0, args.messages - one_by_one, args.batch):
+                channel.send_messages([template % i for i in range(start, min(start + args.batch, args.messages - one_by_one))])
+
+        def write_one_by_one() -> None:
+            for i in range(args.messages - one_by_one, args.messages):
+                channel.send_message(template % i)
+            log.flush()
+
+        _, batch_seconds = timed(write_batches)
+        middle = time.time()
+        _, single_seconds = timed(write_one_by_one)
+        assert live.received == args.messages == log.end_offset
+        size = log.size_bytes
+        print(f'log: {args.messages:,} messages, {size / 2**20:,.1f} MiB in {log.segment_count} segment(s)\n')
+        if args.pause:
+            input('Drop the page cache now, then press Enter. ')
+
+        print(f'{"operation":<26} {"msgs/sec":>14} {"MiB/sec":>10} {"seconds":>9}')
+        rows = [
+            ('write (send_messages)', args.messages - one_by_one, batch_seconds),
+            ('write (send_message)', one_by_one, single_seconds),
+        ]
+        read, seconds = timed(lambda: read_files(directory))
+        rows.append(('read files', args.messages * read / size, seconds))
+        replayed, seconds = timed(lambda: replay_all(log))
+        rows.append(('replay', replayed, seconds))
+        for name, observer in (('subscribe (batch)', BatchCountingObserver()), ('subscribe (one by one)', CountingObserver())):
+            _, seconds = timed(lambda: channel.subscribe(observer, offset=0))
+            assert observer.received == args.messages
+            rows.append((name, args.messages, seconds))
+            channel.remove_follower(observer)
+
+        def resend() -> int:
+            observer = CountingObserver()
+            history = Channel('bench', [observer])
+            for i in range(args.messages):
+                history.send_message(template % i)
+            return observer.received
+        rows.append(('resend history', *timed(resend)))
+        for name, count, seconds in rows:
+            print(f'{name:<26} {count / seconds:>14,.0f} {size * count / args.messages / 2**20 / seconds:>10,.1f} {seconds:>9.3f}')
+
+        offset, seconds = timed(lambda: log.offset_at(middle))
+        print(f'\noffset_at(timestamp) -> {offset:,} in {seconds * 1e3:.2f} ms')
+        first, seconds = timed(lambda: next(log.replay(args.messages // 2)))
+        print(f'first batch of a replay from offset {args.messages // 2:,} in {seconds * 1e3:.2f} ms')
+        assert first[1][0] == template % (args.messages // 2)
+        log.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
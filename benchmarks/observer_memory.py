@@ -0,0 +1,65 @@
+'''
+Memory benchmark of the weak-reference FollowerSet used by `Channel` in `behavioral/observer.py`.
+
+It runs many subscribe/unsubscribe cycles with short-lived observers. Half of the
+observers are removed with `remove_follower` and the other half are simply dropped,
+so they are pruned by the weak-reference callback. The resident set size (RSS)
+is printed at regular steps and should stay flat.
+
+Run it from the repository root:
+    python benchmarks/observer_memory.py
+    python benchmarks/observer_memory.py --cycles 1000000 --steps 10
+'''
+
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from observer import Channel, User
+
+
+# Return the current RSS in MiB (from /proc on Linux, otherwise the peak RSS).
+def rss_mib() -> float:
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Observer follower storage memory benchmark.')
+    parser.add_argument('--cycles', type=int, default=10_000_000)
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--resident', type=int, default=10_000, help='followers that stay subscribed the whole time')
+    args = parser.parse_args()
+
+    channel = Channel('benchmark')
+    resident = [User(f'resident{i}') for i in range(args.resident)]
+    for user in resident:
+        channel.add_follower(user)
+
+    step = max(1, args.cycles // args.steps)
+    start = time.perf_counter()
+    print(f'{"cycles":>12} {"followers":>10} {"rss (MiB)":>10}')
+    print(f'{0:>12} {len(channel.followers):>10} {rss_mib():>10.1f}')
+    for cycle in range(1, args.cycles + 1):
+        user = User('churn')
+        channel.add_follower(user)
+        if cycle & 1:
+            channel.remove_follower(user)
+        del user # The even cycles rely on the weak-reference callback to prune the follower.
+        if cycle % step == 0:
+            print(f'{cycle:>12} {len(channel.followers):>10} {rss_mib():>10.1f}')
+    elapsed = time.perf_counter() - start
+    print(f'{args.cycles / elapsed:,.0f} cycles/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+'''
+Benchmark of topic routing with `ChannelRegistry` in `behavioral/observer.py`.
+
+It builds a registry with many topics ('category.topic') and subscriptions
+(mostly exact, some 'category.*' and 'category.#' wildcards) and measures the
+time to resolve the subscribers of a topic, both uncached and cached.
+
+Run it from the repository root:
+    python benchmarks/observer_routing.py
+    python benchmarks/observer_routing.py --topics 10000 --subscriptions 1000000
+'''
+
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from observer import ChannelRegistry, Observer
+
+
+# A subscriber that does nothing. Only the routing cost is measured.
+class QuietObserver(Observer):
+    __slots__ = ()
+
+
+def build(topics: int, subscriptions: int, wildcard_ratio: float, categories: int) -> tuple:
+    registry = ChannelRegistry(cache_size=topics) # Room for every topic, so the cached pass below only hits.
+    names = [f'category{i % categories}.topic{i}' for i in range(topics)]
+    rng = random.Random(42)
+    observers = [QuietObserver() for _ in range(subscriptions)]
+    for observer in observers:
+        if rng.random() < wildcard_ratio:
+            category = rng.randrange(categories)
+            registry.subscribe(observer, f'category{category}.{rng.choice("*#")}')
+        else:
+            registry.subscribe(observer, rng.choice(names))
+    return registry, names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Observer topic routing benchmark.')
+    parser.add_argument('--topics', type=int, default=10_000)
+    parser.add_argument('--subscriptions', type=int, default=1_000_000)
+    parser.add_argument('--wildcard-ratio', type=float, default=0.001)
+    parser.add_argument('--categories', type=int, default=100)
+    parser.add_argument('--lookups', type=int, default=10_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    registry, names = build(args.topics, args.subscriptions, args.wildcard_ratio, args.categories)
+    print(f'build: {time.perf_counter() - start:.2f}s for {args.topics} topics and {args.subscriptions} subscriptions')
+
+    rng = random.Random(7)
+    lookups = [rng.choice(names) for _ in range(args.lookups)]
+
+    # Uncached lookups: clear the resolved cache before each one.
+    matched = 0
+    elapsed = 0.0
+    for topic in lookups:
+        registry._resolved.clear()
+        start = time.perf_counter()
+        matched += len(registry.resolve(topic))
+        elapsed += time.perf_counter() - start
+    print(f'uncached resolve: {elapsed / len(lookups) * 1e6:.1f} us/lookup (avg {matched / len(lookups):.0f} subscribers)')
+
+    # Cached lookups: the same topics again after a warm-up pass.
+    for topic in lookups:
+        registry.resolve(topic)
+    start = time.perf_counter()
+    for topic in lookups:
+        registry.resolve(topic)
+    elapsed = time.perf_counter() - start
+    print(f'cached resolve:   {elapsed / len(lookups) * 1e6:.2f} us/lookup')
+
+
+if __name__ == '__main__':
+    main()
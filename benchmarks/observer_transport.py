@@ -0,0 +1,148 @@
+'''
+Throughput and latency benchmark of `behavioral/observer_transport.py`.
+
+A Channel sends messages that carry their send time (`time.monotonic_ns()`, which is the same
+clock in every process on Linux). The followers are:
+- in-process: a local observer (the baseline);
+- unix socket: an observer in another process, subscribed through a ChannelServer;
+- shared memory: an observer in another process, reading a SharedMemoryRing.
+The script prints the messages/sec (from the first send to the last delivery) and the
+p50/p99 latency from send to delivery. By default the messages are sent as fast as possible,
+so the latency includes the time spent waiting in the queues. Use `--rate` to send at a fixed rate.
+
+Run it from the repository root:
+    python benchmarks/observer_transport.py
+    python benchmarks/observer_transport.py --messages 2000000 --batch-bytes 262144
+    python benchmarks/observer_transport.py --messages 100000 --rate 20000
+'''
+
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'behavioral'))
+
+from observer import Channel, Observer
+from observer_transport import ChannelClient, ChannelServer, RingFollower, RingSubscriber, SharedMemoryRing
+
+
+# Records the latency of every message. The message is its send time in nanoseconds.
+class LatencyObserver(Observer):
+    def __init__(self) -> None:
+        self.latencies = []
+        self.last = 0
+
+    def channel_updated(self, channel_name: str, message: str) -> None:
+        self.last = time.monotonic_ns()
+        self.latencies.append(self.last - int(message))
+
+
+def summary(observer: LatencyObserver) -> tuple:
+    latencies = sorted(observer.latencies)
+    return len(latencies), observer.last, latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)]
+
+
+def socket_subscriber(path: str, messages: int, results: object) -> None:
+    client = ChannelClient(path)
+    observer = LatencyObserver()
+    client.subscribe('bench', observer)
+    results.put('ready')
+    while len(observer.latencies) < messages and not client.closed:
+        client.poll(1.0)
+    results.put(summary(observer))
+    client.close()
+
+
+def ring_subscriber(name: str, messages: int, results: object) -> None:
+    subscriber = RingSubscriber(name)
+    observer = LatencyObserver()
+    subscriber.subscribe('bench', observer)
+    results.put('ready')
+    while len(observer.latencies) < messages:
+        subscriber.poll(1.0)
+    results.put(summary(observer))
+    subscriber.close()
+
+
+# Send the messages, at most `rate` per second if it is not 0. Returns the time of the first send.
+def publish(channel: Channel, messages: int, rate: int) -> int:
+    clock = time.monotonic_ns
+    start = clock()
+    interval = 10**9 // rate if rate else 0
+    for i in range(messages):
+        if interval:
+            delay = start + i * interval - clock()
+            if delay > 0:
+                time.sleep(delay / 1e9) # Not a busy loop: it would hold the GIL and delay the writer threads.
+        channel.send_message(str(clock()))
+    return start
+
+
+def in_process(messages: int, rate: int) -> tuple:
+    channel = Channel('bench')
+    observer = LatencyObserver()
+    channel.add_follower(observer)
+    start = publish(channel, messages, rate)
+    return start, summary(observer)
+
+
+def over_socket(messages: int, rate: int, batch_bytes: int) -> tuple:
+    path = os.path.join(tempfile.mkdtemp(), 'channels.sock')
+    results = multiprocessing.Queue()
+    channel = Channel('bench')
+    with ChannelServer(path, batch_bytes=batch_bytes) as server:
+        server.add_channel(channel)
+        process = multiprocessing.Process(target=socket_subscriber, args=(path, messages, results))
+        process.start()
+        results.get()
+        start = publish(channel, messages, rate)
+        server.flush()
+        result = results.get()
+        process.join()
+    return start, result
+
+
+def over_shared_memory(messages: int, rate: int, batch_bytes: int) -> tuple:
+    ring = SharedMemoryRing()
+    follower = RingFollower(ring, batch_bytes=batch_bytes)
+    channel = Channel('bench')
+    channel.add_follower(follower)
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=ring_subscriber, args=(ring.name, messages, results))
+    process.start()
+    results.get()
+    start = publish(channel, messages, rate)
+    follower.flush()
+    result = results.get()
+    process.join()
+    follower.close()
+    ring.close()
+    ring.unlink()
+    return start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Cross-process observer transport benchmark.')
+    parser.add_argument('--messages', type=int, default=500_000)
+    parser.add_argument('--batch-bytes', type=int, default=65536)
+    parser.add_argument('--rate', type=int, default=0, help='messages/sec to send (0: as fast as possible)')
+    args = parser.parse_args()
+
+    cases = [
+        ('in-process', lambda: in_process(args.messages, args.rate)),
+        ('unix socket', lambda: over_socket(args.messages, args.rate, args.batch_bytes)),
+        ('shared memory', lambda: over_shared_memory(args.messages, args.rate, args.batch_bytes)),
+    ]
+    print(f'{"transport":<14} {"msgs/sec":>12} {"p50 (us)":>10} {"p99 (us)":>10}')
+    for name, run in cases:
+        start, (received, last, p50, p99) = run()
+        assert received == args.messages, (name, received)
+        print(f'{name:<14} {received / ((last - start) / 1e9):>12,.0f} {p50 / 1e3:>10,.1f} {p99 / 1e3:>10,.1f}')
+
+
+if __name__ == '__main__':
+    main()
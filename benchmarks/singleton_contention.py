@@ -0,0 +1,119 @@
+'''
+Contention benchmark and stress check of the singletons in `creational/singleton.py`.
+
+The benchmark starts 64 threads that all get the instance in a loop and prints the
+accesses/sec of `SingletonMeta` and of the old `__new__`, which created a new `Lock()` on every call.
+
+The stress check closes the instance and releases 64 threads at once (with a
+`threading.Barrier`) into the first call, for many rounds. A slow `__init__` widens the race.
+It asserts that `SingletonMeta` creates exactly one instance per round and prints how many the
+old implementation created.
+
+Run it from the repository root:
+    python benchmarks/singleton_contention.py
+    python benchmarks/singleton_contention.py --threads 128 --accesses 200000 --rounds 500
+'''
+
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational'))
+
+from singleton import SingletonMeta
+
+
+# The old implementation: the lock is new on every call, and `_instance` is only set in `__init__`.
+class OldSingleton:
+    _instance = None
+    created = 0
+
+    def __new__(cls):
+        lock = threading.Lock()
+        with lock:
+            if cls._instance is None:
+                return super().__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if type(self)._instance is None:
+            time.sleep(0.0001)
+            type(self).created += 1
+            type(self)._instance = self
+
+
+class NewSingleton(metaclass=SingletonMeta):
+    created = 0
+
+    def __init__(self):
+        time.sleep(0.0001)
+        type(self).created += 1
+
+
+def run_threads(threads: int, target: object) -> float:
+    barrier = threading.Barrier(threads + 1)
+    def worker() -> None:
+        barrier.wait()
+        target()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def contention(cls: type, threads: int, accesses: int) -> float:
+    cls() # The instance exists, so only the access path is measured.
+    def access() -> None:
+        for _ in range(accesses):
+            cls()
+    return threads * accesses / run_threads(threads, access)
+
+
+# Returns the number of instances created in each round.
+def stress(cls: type, threads: int, rounds: int) -> list:
+    counts = []
+    for _ in range(rounds):
+        cls._instance = None
+        cls.created = 0
+        instances = []
+        run_threads(threads, lambda: instances.append(cls()))
+        assert len(instances) == threads
+        counts.append(len({id(instance) for instance in instances}))
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Singleton contention benchmark and stress check.')
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--accesses', type=int, default=50_000, help='instance accesses per thread')
+    parser.add_argument('--rounds', type=int, default=200, help='stress check rounds')
+    args = parser.parse_args()
+
+    print(f'{"case":<16} {"accesses/sec":>14}')
+    for name, cls in (('old __new__', OldSingleton), ('SingletonMeta', NewSingleton)):
+        print(f'{name:<16} {contention(cls, args.threads, args.accesses):>14,.0f}')
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6) # Switch threads as often as possible to provoke the race.
+    try:
+        old_counts = stress(OldSingleton, args.threads, args.rounds)
+        new_counts = stress(NewSingleton, args.threads, args.rounds)
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert new_counts == [1] * args.rounds, new_counts
+    assert NewSingleton.created == 1
+    print(f'stress: {args.rounds} rounds of {args.threads} threads')
+    print(f'  old __new__:   {sum(count > 1 for count in old_counts)} rounds with more than one instance '
+          f'(up to {max(old_counts)})')
+    print('  SingletonMeta: exactly one instance in every round')
+
+
+if __name__ == '__main__':
+    main()
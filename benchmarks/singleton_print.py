@@ -0,0 +1,80 @@
+'''
+Micro-benchmark of `SingletonDesignPattern.customized_print` in `creational/singleton.py`.
+
+There are two workloads:
+- repeated: texts drawn with a skewed (Zipf-like) distribution from a small set of banners;
+- unique: texts that are all different.
+For each workload the script prints the calls/sec of the old split/capitalize/join code,
+of `capitalize_words` without the cache, of `customized_print` (with the LRU cache) and
+of `customized_print_many`, and the hit rate of the cache (a batch looks up each distinct text once).
+
+Run it from the repository root:
+    python benchmarks/singleton_print.py
+    python benchmarks/singleton_print.py --calls 2000000 --banners 200
+'''
+
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational'))
+
+from singleton import SingletonDesignPattern, capitalize_words
+
+WORDS = ('welcome', 'to', 'the', 'smart', 'home', 'your', 'order', 'is', 'ready', 'hello', 'world!',
+         'mercedes', 'benz', 'truck', 'door', 'opened', 'lights', 'on', 'good', 'morning')
+
+
+def old_customized_print(text: str) -> str:
+    temp_list = text.split(' ')
+    temp_list = [ i.capitalize() for i in temp_list ]
+    result = ' '.join(temp_list)
+    return f'\n\n{result}\n\n'
+
+
+def make_texts(rng: random.Random, count: int) -> list:
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 8))) for _ in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='customized_print cache and kernel micro-benchmark.')
+    parser.add_argument('--calls', type=int, default=500_000)
+    parser.add_argument('--banners', type=int, default=50, help='distinct texts of the repeated workload')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    banners = make_texts(rng, args.banners)
+    weights = [1 / rank for rank in range(1, len(banners) + 1)]
+    workloads = {
+        'repeated': rng.choices(banners, weights, k=args.calls),
+        'unique': [f'{text} #{i}' for i, text in enumerate(make_texts(rng, args.calls))],
+    }
+
+    printer = SingletonDesignPattern()
+    print(f'{"workload":<10} {"case":<24} {"calls/sec":>14} {"hit rate":>9}')
+    for workload, texts in workloads.items():
+        expected = [old_customized_print(text) for text in texts[:1000]]
+        cases = [
+            ('old split/join', lambda texts: [old_customized_print(text) for text in texts]),
+            ('capitalize_words', lambda texts: [f'\n\n{capitalize_words(text)}\n\n' for text in texts]),
+            ('customized_print', lambda texts: [printer.customized_print(text) for text in texts]),
+            ('customized_print_many', printer.customized_print_many),
+        ]
+        for name, run in cases:
+            SingletonDesignPattern.configure_print_cache()
+            assert run(texts[:1000]) == expected
+            SingletonDesignPattern.configure_print_cache()
+            start = time.perf_counter()
+            run(texts)
+            elapsed = time.perf_counter() - start
+            stats = SingletonDesignPattern.print_cache_stats()
+            hit_rate = f'{stats.hit_rate:.3f}' if stats.hits + stats.misses else '-'
+            print(f'{workload:<10} {name:<24} {len(texts) / elapsed:>14,.0f} {hit_rate:>9}')
+    printer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+'''
+Benchmark of shared vs scoped singletons in `creational/singleton.py`.
+
+Many threads get a counter singleton and add to it in a loop. A shared instance
+(`LazySingleton`, `ProcessSingleton`) is updated under its lock, because every thread
+writes to it. A `ThreadLocalSingleton` or `ContextSingleton` gives each thread its own
+counter, which needs no lock. The script prints the updates/sec of each case and checks the totals.
+On systems with fork, it also checks that a forked child gets a new `ProcessSingleton` instance.
+
+Run it from the repository root:
+    python benchmarks/singleton_scopes.py
+    python benchmarks/singleton_scopes.py --threads 64 --updates 200000
+'''
+
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational'))
+
+from singleton import ContextSingleton, LazySingleton, ProcessSingleton, ThreadLocalSingleton
+
+
+class LockedCounter:
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount: int) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.value = 0
+
+    def add(self, amount: int) -> None:
+        self.value += amount
+
+
+def run(singleton: object, threads: int, updates: int) -> tuple:
+    totals = []
+    def worker() -> None:
+        get = singleton.get
+        for _ in range(updates):
+            get().add(1)
+        totals.append(get().value)
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * updates / (time.perf_counter() - start), totals
+
+
+def check_fork() -> str:
+    if not hasattr(os, 'fork'):
+        return 'skipped (no fork)'
+    singleton = ProcessSingleton(Counter)
+    parent_instance = singleton.get()
+    parent_instance.add(1)
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        child_instance = singleton.get()
+        os.write(write_end, b'1' if child_instance is not parent_instance and child_instance.value == 0 else b'0')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b'1', 'the child used the instance of the parent'
+    return 'the child created its own instance'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Shared vs thread-local singleton benchmark.')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--updates', type=int, default=100_000, help='updates per thread')
+    args = parser.parse_args()
+
+    cases = [
+        ('shared LazySingleton', LazySingleton(LockedCounter)),
+        ('shared ProcessSingleton', ProcessSingleton(LockedCounter)),
+        ('ThreadLocalSingleton', ThreadLocalSingleton(Counter)),
+        ('ContextSingleton', ContextSingleton(Counter)), # Every thread starts in its own context.
+    ]
+    print(f'{"case":<24} {"updates/sec":>14}')
+    for name, singleton in cases:
+        rate, totals = run(singleton, args.threads, args.updates)
+        if name.startswith('shared'):
+            assert max(totals) == args.threads * args.updates
+        else:
+            assert totals == [args.updates] * args.threads
+        print(f'{name:<24} {rate:>14,.0f}')
+    print(f'fork: {check_fork()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+'''
+The workloads of `python -m benchmarks`, one or more for each module of the repository.
+
+Every workload runs without `input()` and with the device and observer output sent to a
+NullSink. The parameters (e.g. the number of followers of a channel) can be changed from
+the command line with `--set name.param=value`.
+'''
+
+
+import array
+import contextlib
+import io
+import random
+import tempfile
+import threading
+
+from .harness import workload
+
+from event_sink import NullSink, set_sink
+from factory_method import create_vehicle, process_orders
+from iterator import PythonicIterator
+from mediator import AIAssistant, SensorEvent, SmartAC, SmartCurtains, SmartDoor, SmartHomeHub, SmartLights
+from observer import Channel, ChannelRegistry, Observer
+from observer_log import ChannelLog
+from singleton import SingletonDesignPattern, SingletonMeta
+from smart_home_scheduler import Scheduler, SimulatedClock
+
+VEHICLES = ('car', 'truck', 'bus', 'f1', 'bike')
+
+
+class CountingObserver(Observer):
+    __slots__ = ('received',)
+
+    def __init__(self) -> None:
+        self.received = 0
+
+    def channel_updated(self, channel_name: str, message: str) -> None:
+        self.received += 1
+
+
+@workload('observer.fanout', ops=lambda params: params['followers'], followers=1000)
+def observer_fanout(followers: int):
+    '''One message to a channel with `followers` followers(ops are deliveries).'''
+    set_sink(NullSink())
+    channel = Channel('benchmark')
+    observers = [CountingObserver() for _ in range(followers)]
+    for observer in observers:
+        channel.add_follower(observer)
+    def call() -> None:
+        channel.send_message('news')
+    call.followers = observers # The channel only keeps weak references to its followers.
+    return call
+
+
+@workload('observer.routing', ops=1000, topics=1000, subscriptions=10_000)
+def observer_routing(topics: int, subscriptions: int):
+    '''1000 publishes to random topics of a ChannelRegistry with exact and wildcard subscriptions.'''
+    rng = random.Random(42)
+    registry = ChannelRegistry()
+    names = [f'category{i % 10}.topic{i}' for i in range(topics)]
+    observers = [CountingObserver() for _ in range(subscriptions)]
+    for observer in observers:
+        pattern = f'category{rng.randrange(10)}.*' if rng.random() < 0.01 else rng.choice(names)
+        registry.subscribe(observer, pattern)
+    published = [rng.choice(names) for _ in range(1000)]
+    def call() -> None:
+        for topic in published:
+            registry.publish(topic, 'news')
+    call.followers = observers
+    return call
+
+
+@workload('observer.replay', ops=lambda params: params['messages'], messages=100_000)
+def observer_replay(messages: int):
+    '''Replay a ChannelLog of `messages` 32-byte messages from the start.'''
+    directory = tempfile.TemporaryDirectory()
+    log = ChannelLog(directory.name)
+    for start in range(0, messages, 1024):
+        log.append_many([f'{i:032d}' for i in range(start, min(start + 1024, messages))])
+    def call() -> None:
+        for _ in log.replay(0):
+            pass
+    call.directory = directory # The directory is removed when the workload is garbage collected.
+    return call
+
+
+@workload('mediator.events', ops=lambda params: params['events'], events=1000)
+def mediator_events(events: int):
+    '''`events` sensor events(temperature, time of day and presence) handled by a SmartHomeHub.'''
+    set_sink(NullSink())
+    rng = random.Random(42)
+    hub = SmartHomeHub(SmartDoor(), SmartAC(), SmartLights(), SmartCurtains(), AIAssistant())
+    sensor_events = []
+    for i in range(events):
+        roll = rng.random()
+        if roll < 0.7:
+            sensor_events.append(SensorEvent('temperature', round(rng.uniform(10, 35), 1), i))
+        elif roll < 0.9:
+            sensor_events.append(SensorEvent('time_of_day', rng.choice(('morning', 'night')), i))
+        else:
+            sensor_events.append(SensorEvent('presence', rng.choice(('home', 'away')), i))
+    def call() -> None:
+        for event in sensor_events:
+            hub.handle_event(event)
+    return call
+
+
+@workload('mediator.schedule', ops=lambda params: params['jobs'], jobs=10_000)
+def mediator_schedule(jobs: int):
+    '''One simulated day of a Scheduler with `jobs` daily jobs at 4 times of day(ops are dispatched jobs).'''
+    scheduler = Scheduler(SimulatedClock(0.0))
+    for i in range(jobs):
+        scheduler.daily(('06:00', '06:30', '07:00', '07:30')[i % 4], int)
+    def call() -> None:
+        scheduler.run_until(scheduler.time() + 86400)
+    return call
+
+
+@workload('iterator.chunks', ops=lambda params: params['items'], items=100_000, chunk=4096)
+def iterator_chunks(items: int, chunk: int):
+    '''Sum an array of `items` int32 items with `next_chunk(chunk)`.'''
+    data = array.array('i', range(items))
+    def call() -> None:
+        iterator = PythonicIterator(data)
+        while iterator.has_next():
+            sum(iterator.next_chunk(chunk))
+    return call
+
+
+@workload('iterator.pipeline', ops=lambda params: params['items'], items=100_000)
+def iterator_pipeline(items: int):
+    '''A map/filter/batch pipeline over `items` items.'''
+    data = list(range(items))
+    def call() -> None:
+        PythonicIterator(data).map(lambda x: x * 3).filter(lambda x: x & 1).batch(64).to_list()
+    return call
+
+
+@workload('factory.create', ops=1000, shared=False)
+def factory_create(shared: bool):
+    '''1000 vehicles created from the factory registry and ordered.'''
+    keys = [VEHICLES[i % 5] for i in range(1000)]
+    def call() -> None:
+        for key in keys:
+            create_vehicle(key, shared).order()
+    return call
+
+
+@workload('factory.orders', ops=lambda params: params['orders'], orders=10_000, batch_size=4096)
+def factory_orders(orders: int, batch_size: int):
+    '''`orders` orders processed in bulk by `process_orders`.'''
+    rng = random.Random(42)
+    keys = [rng.choice(VEHICLES) for _ in range(orders)]
+    def call() -> None:
+        for _ in process_orders(keys, batch_size):
+            pass
+    return call
+
+
+@workload('singleton.contention', ops=lambda params: params['threads'] * params['accesses'], threads=16, accesses=5000)
+def singleton_contention(threads: int, accesses: int):
+    '''`threads` threads that each get a SingletonMeta instance `accesses` times.'''
+    class Shared(metaclass=SingletonMeta):
+        pass
+    def access() -> None:
+        for _ in range(accesses):
+            Shared()
+    def call() -> None:
+        workers = [threading.Thread(target=access) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    return call
+
+
+@workload('singleton.print', ops=1000, banners=50)
+def singleton_print(banners: int):
+    '''1000 `customized_print` calls over `banners` distinct texts(mostly cache hits).'''
+    rng = random.Random(42)
+    texts = [f'welcome to the smart home number {i}' for i in range(banners)]
+    calls = [rng.choice(texts) for _ in range(1000)]
+    SingletonDesignPattern.configure_print_cache()
+    with contextlib.redirect_stdout(io.StringIO()): # Creating the instance prints a message.
+        printer = SingletonDesignPattern()
+    def call() -> None:
+        for text in calls:
+            printer.customized_print(text)
+    return call
@@ -7,15 +7,34 @@ but allows subclasses to alter the type of objects that will be created.
 
 You can read more about this Design Pattern from this url: 
 https://www.geeksforgeeks.org/factory-method-for-designing-pattern/
+
+The factories are registered once in a module-level registry(`register_factory`), so looking up a
+factory by its key is a single dictionary lookup and an unknown key raises `UnknownVehicleError`.
+The vehicles keep no state, so they can also be shared(`create_vehicle(key, shared=True)`) or
+recycled through a `VehiclePool` instead of allocating a new object for every order.
+
+Many orders can be processed at once with `process_orders()`(or `process_order_file()` for a
+JSON-lines file). The orders are read in chunks, grouped by vehicle inside each chunk and created
+with one `create_batch()` call per group, so the memory used does not grow with the number of orders.
+
+While the metrics of `behavioral/instrumentation.py` are enabled, `create_instance` of every factory counts the
+vehicles it creates and times them(sampled). This module does not import it: `instrument_factories()` is
+called with its METRICS object(see `instrumentation.INSTRUMENTED_MODULES`).
 '''
 
 
 # Importing `ABC` and `abstractmethod` to create abstract classes and methods.
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import islice, repeat
+import json
+import sys
 
 
 # Defining an abstract class that acts as an interface for all vehicle classes.
 class Vehicle(ABC):
+    __slots__ = () # The vehicles keep no state, so they do not need a `__dict__`.
+
     @abstractmethod
     def order(self):  # Abstract method (to be implemented in subclasses). It does nothing here.
         pass
@@ -23,91 +42,301 @@ class Vehicle(ABC):
 
 # Concrete class representing a Car, inheriting from `Vehicle`.
 class Car(Vehicle):
+    __slots__ = ()
+
     def order(self):
         return 'Your Mercedes Benz car is ready!'
     
 
 # Concrete class representing a Truck, inheriting from `Vehicle`.
 class Truck(Vehicle):
+    __slots__ = ()
+
     def order(self):
         return 'Your Mercedes Benz truck is ready!'
     
 
 # Concrete class representing a Bus, inheriting from `Vehicle`.
 class Bus(Vehicle):
+    __slots__ = ()
+
     def order(self):
         return 'Your Mercedes Benz bus is ready!'
     
 
 # Concrete class representing a Formula 1 car, inheriting from `Vehicle`.
 class Formula1(Vehicle):
+    __slots__ = ()
+
     def order(self):
         return 'Your Mercedes Benz Formula 1 is ready!'
     
 
 # Concrete class representing a Bicycle, inheriting from `Vehicle`.
 class Bicycle(Vehicle):
+    __slots__ = ()
+
     def order(self):
         return 'Your Mercedes Benz bicycle is ready!'
     
 
+# The error raised when no factory is registered for a key.
+class UnknownVehicleError(KeyError):
+    def __init__(self, key: str) -> None:
+        super().__init__(key)
+        self.key = key
+
+    def __str__(self) -> str:
+        return f'There is no vehicle factory registered for {self.key!r}.'
+
+
+# The registry of all the factories(key -> factory instance). It is filled once, when the module is imported.
+VEHICLE_FACTORIES = {}
+
+
+# Register a factory for a key. It can be used as a class decorator(`@register_factory('car')`),
+# then the class is instantiated once and the class itself is returned unchanged.
+def register_factory(key: str, factory: object=None) -> object:
+    def register(factory: object) -> object:
+        VEHICLE_FACTORIES[key.lower()] = factory() if isinstance(factory, type) else factory
+        _SHARED_VEHICLES.pop(key.lower(), None)
+        return factory
+    return register if factory is None else register(factory)
+
+
+def unregister_factory(key: str) -> None:
+    VEHICLE_FACTORIES.pop(key.lower(), None)
+    _SHARED_VEHICLES.pop(key.lower(), None)
+
+
+# Return the factory registered for a key(the key must be lower case).
+def get_factory(key: str) -> 'VehicleFactory':
+    try:
+        return VEHICLE_FACTORIES[key]
+    except KeyError:
+        raise UnknownVehicleError(key) from None
+
+
+# One shared vehicle per key(the flyweight mode), created on the first request.
+_SHARED_VEHICLES = {}
+
+
+# Create a vehicle by its key(in any case, like `register_factory`). With `shared=True` the same stateless
+# instance is returned every time.
+def create_vehicle(key: str, shared: bool=False) -> 'Vehicle':
+    key = key.lower() # The shared vehicles are cached, and evicted by (un)register_factory, by the lower case key.
+    if shared:
+        vehicle = _SHARED_VEHICLES.get(key)
+        if vehicle is None:
+            vehicle = _SHARED_VEHICLES[key] = get_factory(key).create_instance()
+        return vehicle
+    return get_factory(key).create_instance()
+
+
+# A pool of vehicles. `acquire()` returns a released vehicle of that key if there is one, otherwise
+# it creates a new one. At most `max_idle` released vehicles are kept per key, the rest are dropped.
+class VehiclePool:
+    def __init__(self, max_idle: int=64) -> None:
+        self.max_idle = max_idle
+        self._idle = {} # key -> list of released vehicles.
+        self._keys = {} # vehicle class -> key, to know where a released vehicle goes.
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, key: str) -> 'Vehicle':
+        idle = self._idle.get(key)
+        if idle:
+            self.reused += 1
+            return idle.pop()
+        vehicle = get_factory(key).create_instance()
+        self._keys[type(vehicle)] = key
+        self.created += 1
+        return vehicle
+
+    def release(self, vehicle: 'Vehicle') -> None:
+        key = self._keys.get(type(vehicle))
+        if key is None:
+            raise ValueError(f'{type(vehicle).__name__} was not acquired from this pool.')
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_idle:
+            idle.append(vehicle)
+
+    # Acquire a vehicle for the body of a `with` block and release it at the end.
+    @contextmanager
+    def borrow(self, key: str):
+        vehicle = self.acquire(key)
+        try:
+            yield vehicle
+        finally:
+            self.release(vehicle)
+
+    def clear(self) -> None:
+        self._idle.clear()
+
+
+_factory_metrics = None # (metrics, instances counter, time histogram) after `instrument_factories()`.
+
+
+# Register the instrumented `create_instance` of a concrete factory.
+def _instrument_factory(factory: type) -> None:
+    metrics, instances, seconds = _factory_metrics
+    metrics.patch(factory, 'create_instance', metrics.timed(factory.create_instance, instances, seconds, (factory.__name__,)))
+
+
 # Abstract Factory class that declares the method for creating vehicles.
 class VehicleFactory(ABC):
+    # The factories defined after `instrument_factories()` are instrumented too.
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if _factory_metrics is not None and 'create_instance' in cls.__dict__:
+            _instrument_factory(cls)
+
     @abstractmethod
     def create_instance(self) -> Vehicle:  # Abstract method to be implemented in subclasses.
         pass
 
+    # Create `n` vehicles at once(one list, one loop). Subclasses can override it with a faster version.
+    def create_batch(self, n: int) -> list:
+        create_instance = self.create_instance
+        return [create_instance() for _ in repeat(None, n)]
+
 
 # Factory class for creating Car objects.
+@register_factory('car')
 class CarFactory(VehicleFactory):
     def create_instance(self) -> Vehicle:
         return Car()
 
 
 # Factory class for creating Truck objects.
+@register_factory('truck')
 class TruckFactory(VehicleFactory):
     def create_instance(self) -> Vehicle:
         return Truck()
 
 
 # Factory class for creating Bus objects.
+@register_factory('bus')
 class BusFactory(VehicleFactory):
     def create_instance(self) -> Vehicle:
         return Bus()
 
 
 # Factory class for creating Formula 1 objects.
+@register_factory('f1')
 class Formula1Factory(VehicleFactory):
     def create_instance(self) -> Vehicle:
         return Formula1()
 
 
 # Factory class for creating Bicycle objects.
+@register_factory('bike')
 class BicycleFactory(VehicleFactory):
     def create_instance(self) -> Vehicle:
         return Bicycle()
 
 
-# Function to run the program.
-def run_code():
-    # Dictionary mapping user input strings to factory instances.
-    factory_dict = {
-        'car': CarFactory(),
-        'truck': TruckFactory(),
-        'bus': BusFactory(),
-        'f1': Formula1Factory(),
-        'bike': BicycleFactory(),
-    }
+# Register the instrumented `create_instance` of every concrete factory with `metrics`(the METRICS object of
+# `behavioral/instrumentation.py`). The instrumented methods are only installed while the metrics are enabled.
+def instrument_factories(metrics: object) -> None:
+    global _factory_metrics
+    if _factory_metrics is not None:
+        return
+    _factory_metrics = (
+        metrics,
+        metrics.counter('factory_instances_total', 'Vehicles created by a factory.', ('factory',)),
+        metrics.histogram('factory_instance_seconds', 'Time of one create_instance call (sampled).', ('factory',)),
+    )
+    factories = VehicleFactory.__subclasses__()
+    while factories:
+        factory = factories.pop()
+        factories.extend(factory.__subclasses__())
+        if 'create_instance' in factory.__dict__:
+            _instrument_factory(factory)
+
+
+# If `instrumentation` was imported first, it could not find this module: register the factories now.
+if 'instrumentation' in sys.modules:
+    sys.modules['instrumentation'].METRICS.instrument_modules()
+
+
+INVALID_ORDER = '!! Invalid Input !!'
+
+
+# Read the orders of a JSON-lines file one by one, e.g. `{"id": 1, "vehicle": "car"}`. Empty lines are skipped.
+def read_orders(path: str):
+    with open(path, encoding='utf-8') as orders_file:
+        for line in orders_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+# Process the orders(vehicle keys, or dicts with a 'vehicle' key and an optional 'id') and yield
+# `(order_id, result)` in the order of the input. An order without an id gets its position as the id.
+# An order of another type(e.g. None or a number) is an invalid order, like an unknown vehicle key.
+# Only `batch_size` orders are in memory at a time.
+def process_orders(orders: object, batch_size: int=4096):
+    orders = iter(orders)
+    position = 0
+    while True:
+        chunk = list(islice(orders, batch_size))
+        if not chunk:
+            return
+        ids = [order.get('id', index) if isinstance(order, dict) else index for index, order in enumerate(chunk, position)]
+        groups = {} # vehicle key -> the positions of its orders in the chunk.
+        for index, order in enumerate(chunk):
+            if isinstance(order, str):
+                key = order
+            elif isinstance(order, dict):
+                key = str(order.get('vehicle', ''))
+            else: # e.g. None or a number from a JSON-lines file: no factory has the empty key.
+                key = ''
+            positions = groups.get(key)
+            if positions is None:
+                positions = groups[key] = []
+            positions.append(index)
+        results = [INVALID_ORDER] * len(chunk)
+        for key, indexes in groups.items():
+            factory = VEHICLE_FACTORIES.get(key.lower())
+            if factory is not None:
+                for index, vehicle in zip(indexes, factory.create_batch(len(indexes))):
+                    results[index] = vehicle.order()
+        position += len(chunk)
+        yield from zip(ids, results)
+
+
+# Process the orders of a JSON-lines file and write one `{"id": ..., "result": ...}` line per order.
+# Returns the number of orders.
+def process_order_file(input_path: str, output_path: str, batch_size: int=4096) -> int:
+    count = 0
+    dumps = json.dumps
+    encoded = {} # The results are a few distinct strings, so each is encoded only once.
+    results = process_orders(read_orders(input_path), batch_size)
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        while True:
+            lines = []
+            for order_id, result in islice(results, batch_size):
+                encoded_result = encoded.get(result)
+                if encoded_result is None:
+                    encoded_result = encoded[result] = dumps(result)
+                lines.append(f'{{"id": {dumps(order_id)}, "result": {encoded_result}}}\n')
+            if not lines:
+                return count
+            output_file.writelines(lines)
+            count += len(lines)
+
 
+# Function to run the program. The vehicle is asked from the user if it is not given.
+def run_code(vehicle_input: str=None, shared: bool=False):
     # Taking input from the user. 
-    vehicle_input = input('What vehicle do you need? ').lower()
+    if vehicle_input is None:
+        vehicle_input = input('What vehicle do you need? ')
 
     # Validating input and creating the corresponding object.
     try:
-        instance = factory_dict.get(vehicle_input)
-        result = instance.create_instance()
-    except:
-        return '!! Invalid Input !!'
+        result = create_vehicle(vehicle_input.lower(), shared)
+    except UnknownVehicleError:
+        return INVALID_ORDER
 
     # Returning the result of the `order` method (e.g., "Your Mercedes Benz ... is ready!").
     return result.order()
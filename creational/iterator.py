@@ -5,15 +5,56 @@ This is going to be a very simple example to show using the Iterator Design Patt
 The Iterator Design Pattern is a widely used Design Pattern in software development that provides a way to access the elements of an aggregate object (such as a list or collection) sequentially without exposing its underlying  representation.
 Note: This is going to be Iterator Design Pattern, it means all the classes in this file are iterator(not iterable). So you can just run while loops on them(not for loops).
 
+Both iterators also have a `next_chunk(n)` method that returns up to n items at once. When the items
+support the buffer protocol (bytes, bytearray, `array.array`, `mmap`, NumPy arrays, ...) the chunks are
+`memoryview` slices, so no item is copied(release a chunk when you are done with it, e.g. before resizing
+a bytearray). MappedFileIterator walks a binary file through `mmap`, so files larger than the memory can be iterated.
+
+`seek(pos)` and `tell()` move and read the position in O(1). `save_checkpoint()` and `load_checkpoint()`
+store the position of any of the iterators in a small file, so a long batch job can continue where it stopped.
+LineFileIterator walks the lines of a text file and keeps a sparse index of line offsets, so seeking to
+line N does not read the file from the beginning again.
+
+PythonicIterator also has lazy pipeline operators(`map`, `filter`, `take`, `batch`, `window`, `flat_map`).
+They only describe a Pipeline. When the Pipeline is consumed, its stages are chained as iterators that pass one
+item at a time(no intermediate lists), so the memory use does not depend on the input length. The index of the
+iterator moves forward by the items the pipeline read, so a `take` leaves it right after the last item it needed.
+
 You can read more about this Design Pattern from this url: https://www.geeksforgeeks.org/system-design/iterator-pattern/
 '''
 
 
+import json
+import mmap
+import os
+import struct
+from collections import deque
+from itertools import chain, islice
+
+
+# Return True if the items support the buffer protocol(bytes, bytearray, `array.array`, NumPy arrays, ...).
+def _has_buffer(items: object) -> bool:
+    try:
+        memoryview(items).release()
+    except TypeError: # Lists, tuples and other plain sequences.
+        return False
+    return True
+
+
+# Return the items from `start` to `stop` as a memoryview slice(no copy). The view of the whole items is released
+# before returning, so only the chunk keeps the buffer exported(a bytearray can be resized once the chunks are released).
+# The slice is taken on the first dimension, like `len(items)` and `items[i]`: the chunks of a 2-D NumPy array are rows.
+def _buffer_chunk(items: object, start: int, stop: int) -> memoryview:
+    with memoryview(items) as view:
+        return view[start:stop]
+
+
 # This is a class that is used to make iterator objects(So this is using the iterator design pattern).
 class Iterator:
     def __init__(self, items: list | tuple) -> None:
         self.items = items # All the items that should be iterated.
         self.index = 0 # The index of the specific item(that is being iterated).
+        self._buffer = _has_buffer(items) # The chunks are zero-copy memoryviews (not for lists and tuples).
 
     # A method to return the next item from the items list(or tuple or set).
     def next(self) -> any:
@@ -22,6 +63,18 @@ class Iterator:
             return self.items[self.index - 1]
         else:
             raise StopIteration('The iterations has stopped.') # If there is not more items, then this error will be raised.
+
+    # A method to return the next `n` items at once(fewer at the end). A memoryview slice for buffers, otherwise a slice of the items.
+    def next_chunk(self, n: int) -> memoryview | list | tuple:
+        if n < 1:
+            raise ValueError('The chunk size must be at least 1.')
+        start = self.index
+        if start >= len(self.items):
+            raise StopIteration('The iterations has stopped.')
+        self.index = min(start + n, len(self.items))
+        if self._buffer:
+            return _buffer_chunk(self.items, start, self.index) # A view on the same memory(no copy).
+        return self.items[start:self.index]
         
     def has_next(self):
         if self.index < len(self.items):
@@ -31,6 +84,16 @@ class Iterator:
     # A method to reset the index(for more iterations from the object).
     def reset(self) -> None:
         self.index = 0
+
+    # A method to move the index to any position in O(1). `pos == len(items)` means the end.
+    def seek(self, pos: int) -> None:
+        if not 0 <= pos <= len(self.items):
+            raise IndexError(f'The position {pos} is out of range.')
+        self.index = pos
+
+    # A method to return the current position(the index of the next item).
+    def tell(self) -> int:
+        return self.index
     
 
 # Testing the Iterator class.
@@ -53,10 +116,7 @@ if __name__ == '__main__':
     while obj1.has_next():
         print(obj1.next())
     # print(obj1.next()) # If we run the code with this line, we are going to get an StopIteration error(Raised from Iterator.next()).
-
-
-
-print('\n\n')
+    print('\n\n')
 
 
 
@@ -65,6 +125,7 @@ class PythonicIterator:
     def __init__(self, items: list | tuple) -> None:
         self.items = items
         self.index = 0
+        self._buffer = _has_buffer(items)
 
     # Using the `__iter__()` dunder method is exactly like this. See: https://www.geeksforgeeks.org/python/python-__iter__-__next__-converting-object-iterator/
     def __iter__(self):
@@ -72,11 +133,24 @@ class PythonicIterator:
     
     # Using the `__next__()` dunder method allows you to run the `next()` builtin function on the object. This way is more recommended if you are programming in python.
     def __next__(self):
-        if self.has_next():
-            self.index += 1
-            return self.items[self.index - 1]
+        index = self.index # The same check as `has_next()`, without the extra method call.
+        if index < len(self.items):
+            self.index = index + 1
+            return self.items[index]
         else:
             raise StopIteration('The iterations has stopped.')
+
+    # The same as `Iterator.next_chunk()`.
+    def next_chunk(self, n: int) -> memoryview | list | tuple:
+        if n < 1:
+            raise ValueError('The chunk size must be at least 1.')
+        start = self.index
+        if start >= len(self.items):
+            raise StopIteration('The iterations has stopped.')
+        self.index = min(start + n, len(self.items))
+        if self._buffer:
+            return _buffer_chunk(self.items, start, self.index)
+        return self.items[start:self.index]
         
     def has_next(self):
         if self.index < len(self.items):
@@ -85,6 +159,34 @@ class PythonicIterator:
         
     def reset(self):
         self.index = 0
+
+    # The same as `Iterator.seek()` and `Iterator.tell()`.
+    def seek(self, pos: int) -> None:
+        if not 0 <= pos <= len(self.items):
+            raise IndexError(f'The position {pos} is out of range.')
+        self.index = pos
+
+    def tell(self) -> int:
+        return self.index
+
+    # The lazy pipeline operators. Each one returns a Pipeline that reads from this iterator when it is consumed.
+    def map(self, function: object) -> 'Pipeline':
+        return Pipeline(self).map(function)
+
+    def filter(self, predicate: object) -> 'Pipeline':
+        return Pipeline(self).filter(predicate)
+
+    def take(self, n: int) -> 'Pipeline':
+        return Pipeline(self).take(n)
+
+    def batch(self, size: int) -> 'Pipeline':
+        return Pipeline(self).batch(size)
+
+    def window(self, size: int) -> 'Pipeline':
+        return Pipeline(self).window(size)
+
+    def flat_map(self, function: object) -> 'Pipeline':
+        return Pipeline(self).flat_map(function)
     
 
 # Testing the PythonicIterator class.
@@ -105,3 +207,295 @@ if __name__ == '__main__':
         print(next(obj2))
     # print(next(obj2)) # If we run the code with this line, we are going to get an StopIteration error(Raised from PythonicIterator.__next__()).
     print('\n\n\n')
+
+
+
+# This class walks the items of a binary file through `mmap`, so the file is never loaded into memory at once.
+# `item_format` is a `struct` format character('B' for bytes, 'i' for int32, 'd' for float64, ...).
+# Call `close()`(or use a `with` block) when you are done. Release the chunks you got from `next_chunk()` before that.
+class MappedFileIterator(PythonicIterator):
+    def __init__(self, path: str, item_format: str='B') -> None:
+        self.path = path
+        self.item_format = item_format
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # An empty file can't be mapped.
+            self._map = None
+        raw = memoryview(self._map if self._map is not None else b'')
+        item_size = struct.calcsize(item_format)
+        # A trailing partial item(if the file size is not a multiple of the item size) is ignored.
+        super().__init__(raw[:len(raw) - len(raw) % item_size].cast(item_format))
+
+    def close(self) -> None:
+        self.items.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# The stages of a pipeline. Each one takes the iterator of the previous stage and returns a new iterator.
+# `map`, `filter` and `flat_map` use the builtins(the loop runs in C). `take` uses `islice`, which stops
+# after its last item without reading one more from the previous stage.
+def _batch(items: object, size: int) -> object:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch: # The partial batch at the end of the input.
+        yield batch
+
+
+def _window(items: object, size: int) -> object:
+    window = deque(maxlen=size)
+    for item in items:
+        window.append(item)
+        if len(window) == size:
+            yield tuple(window)
+
+
+_STAGES = {
+    'map': lambda items, function: map(function, items),
+    'filter': lambda items, predicate: filter(predicate, items),
+    'take': islice,
+    'batch': _batch,
+    'window': _window,
+    'flat_map': lambda items, function: chain.from_iterable(map(function, items)),
+}
+
+
+# Read the items of a PythonicIterator from its current index. The index moves forward as each item is read,
+# so it always counts the items that went into the pipeline(a `take` reads no item after its last one).
+# Iterators with a `stop` index(see parallel_iterator.PartitionedIterator) end there. The items are read by
+# index, so a pipeline that starts in the middle(after `seek`, `next_chunk` or on a partition) does not walk
+# the items before it; items without indexing are walked with `islice`.
+def _read(iterator: PythonicIterator) -> object:
+    items = iterator.items
+    index = iterator.index
+    stop = getattr(iterator, 'stop', None)
+    if not hasattr(items, '__getitem__'):
+        for item in islice(items, index, stop):
+            index += 1
+            iterator.index = index
+            yield item
+        return
+    for index in range(index, len(items) if stop is None else stop):
+        iterator.index = index + 1
+        yield items[index]
+
+
+# Compose the stages of a pipeline into a single iterator over the items of `source`(one item at a time,
+# no intermediate lists).
+def _fuse(source: PythonicIterator, stages: tuple) -> object:
+    items = _read(source)
+    for kind, argument in stages:
+        items = _STAGES[kind](items, argument)
+    return items
+
+
+# This class is a lazy chain of operators on a PythonicIterator. Nothing runs until it is consumed(e.g. in a for loop).
+# Every operator returns a new Pipeline, so a Pipeline can be reused as the start of several others.
+class Pipeline:
+    def __init__(self, source: PythonicIterator, stages: tuple=()) -> None:
+        self.source = source
+        self.stages = stages # A tuple of (kind, argument) pairs.
+
+    def _then(self, kind: str, argument: object) -> 'Pipeline':
+        return Pipeline(self.source, self.stages + ((kind, argument),))
+
+    # Apply `function` to every item.
+    def map(self, function: object) -> 'Pipeline':
+        return self._then('map', function)
+
+    # Keep only the items for which `predicate` returns a true value.
+    def filter(self, predicate: object) -> 'Pipeline':
+        return self._then('filter', predicate)
+
+    # Stop after `n` items.
+    def take(self, n: int) -> 'Pipeline':
+        if n < 0:
+            raise ValueError('n must not be negative.')
+        return self._then('take', n)
+
+    # Group the items into lists of `size` items(the last list may be shorter).
+    def batch(self, size: int) -> 'Pipeline':
+        if size < 1:
+            raise ValueError('The batch size must be at least 1.')
+        return self._then('batch', size)
+
+    # Yield every run of `size` consecutive items as a tuple(a sliding window).
+    def window(self, size: int) -> 'Pipeline':
+        if size < 1:
+            raise ValueError('The window size must be at least 1.')
+        return self._then('window', size)
+
+    # Apply `function` to every item and yield the items of the iterable it returns.
+    def flat_map(self, function: object) -> 'Pipeline':
+        return self._then('flat_map', function)
+
+    def __iter__(self):
+        return _fuse(self.source, self.stages)
+
+    def to_list(self) -> list:
+        return list(self)
+
+
+# This class walks the lines of a text file(one record per line, without the line ending).
+# Every `stride` lines it remembers the byte offset of the line, so `seek(n)` jumps to the nearest known
+# offset and reads at most `stride - 1` lines, instead of reading the file from the beginning.
+class LineFileIterator:
+    def __init__(self, path: str, stride: int=1024, encoding: str='utf-8') -> None:
+        if stride < 1:
+            raise ValueError('stride must be at least 1.')
+        self.path = path
+        self.stride = stride
+        self.encoding = encoding
+        self._file = open(path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._offsets = [0] # The byte offset of line k * stride is self._offsets[k].
+        self._offset = 0 # The byte offset of the next line.
+        self.index = 0 # The number of the next line.
+
+    def __iter__(self):
+        return self
+
+    # Read the next line as bytes and remember its offset if it starts a new stride.
+    def _read_line(self) -> bytes:
+        line = self._file.readline()
+        if not line:
+            raise StopIteration('The iterations has stopped.')
+        self.index += 1
+        self._offset += len(line)
+        if self.index % self.stride == 0 and self.index // self.stride == len(self._offsets):
+            self._offsets.append(self._offset)
+        return line
+
+    def __next__(self) -> str:
+        line = self._read_line()
+        if line.endswith(b'\n'):
+            line = line[:-2] if line.endswith(b'\r\n') else line[:-1]
+        return line.decode(self.encoding)
+
+    def has_next(self) -> bool:
+        return self._offset < self._size
+
+    def reset(self) -> None:
+        self._move(0, 0)
+
+    def _move(self, index: int, offset: int) -> None:
+        self._file.seek(offset)
+        self._offset = offset
+        self.index = index
+
+    def seek(self, pos: int) -> None:
+        if pos < 0:
+            raise IndexError(f'The position {pos} is out of range.')
+        block = min(pos // self.stride, len(self._offsets) - 1)
+        if not block * self.stride <= self.index <= pos: # Reading on from the current line is not shorter.
+            self._move(block * self.stride, self._offsets[block])
+        while self.index < pos:
+            try:
+                self._read_line()
+            except StopIteration:
+                raise IndexError(f'The position {pos} is out of range.') from None
+
+    def tell(self) -> int:
+        return self.index
+
+    # The state saved by save_checkpoint: the line number, its byte offset and the sparse offset index.
+    def cursor_state(self) -> dict:
+        return {'index': self.index, 'offset': self._offset, 'stride': self.stride, 'offsets': self._offsets}
+
+    # Continue from a saved state in O(1), without reading the lines before it.
+    def restore_cursor(self, state: dict) -> None:
+        if state['offset'] > self._size:
+            raise ValueError('The checkpoint does not match this file(it is shorter than the saved offset).')
+        if state.get('stride') == self.stride and len(state.get('offsets', ())) > len(self._offsets):
+            self._offsets = list(state['offsets'])
+        self._move(state['index'], state['offset'])
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# Save the position of an iterator in a small JSON file. The file is replaced atomically,
+# so a crash while saving never leaves a broken checkpoint behind.
+def save_checkpoint(iterator: object, path: str) -> None:
+    state = iterator.cursor_state() if hasattr(iterator, 'cursor_state') else {'index': iterator.tell()}
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as checkpoint_file:
+        json.dump(state, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+
+# Move an iterator to the position saved by save_checkpoint. Returns False if there is no checkpoint yet.
+def load_checkpoint(iterator: object, path: str) -> bool:
+    try:
+        with open(path, encoding='utf-8') as checkpoint_file:
+            state = json.load(checkpoint_file)
+    except FileNotFoundError:
+        return False
+    if hasattr(iterator, 'restore_cursor'):
+        iterator.restore_cursor(state)
+    else:
+        iterator.seek(state['index'])
+    return True
+
+
+# Testing the chunked iteration and the MappedFileIterator class.
+if __name__ == '__main__':
+    import array
+    import tempfile
+
+    obj3 = PythonicIterator(array.array('i', range(10))) # An array supports the buffer protocol.
+    while obj3.has_next():
+        chunk = obj3.next_chunk(4) # A memoryview on the array's memory(no copy).
+        print(chunk.tolist())
+
+    path = os.path.join(tempfile.mkdtemp(), 'numbers.bin')
+    with open(path, 'wb') as binary_file:
+        binary_file.write(array.array('d', [0.5, 1.5, 2.5, 3.5, 4.5]).tobytes())
+    with MappedFileIterator(path, 'd') as obj4:
+        print(next(obj4))
+        chunk = obj4.next_chunk(10)
+        print(chunk.tolist())
+        chunk.release()
+
+    # Testing the lazy pipeline operators. Nothing is computed until `to_list()` is called.
+    obj5 = PythonicIterator(range(1, 1_000_000_000))
+    pipeline = obj5.map(lambda x: x * x).filter(lambda x: x % 2 == 1).window(2).take(4)
+    print(pipeline.to_list())
+    obj5.reset()
+    print(obj5.map(str).flat_map(list).batch(3).take(3).to_list())
+
+    # Testing a resumable job over a text file: it stops after 3 lines, then continues from the checkpoint.
+    lines_path = os.path.join(tempfile.mkdtemp(), 'records.txt')
+    with open(lines_path, 'w') as text_file:
+        text_file.write(''.join(f'record {i}\n' for i in range(10)))
+    checkpoint_path = lines_path + '.checkpoint'
+    with LineFileIterator(lines_path, stride=4) as obj6:
+        for _ in range(3):
+            print(next(obj6))
+        save_checkpoint(obj6, checkpoint_path)
+    with LineFileIterator(lines_path, stride=4) as obj7:
+        load_checkpoint(obj7, checkpoint_path)
+        print(obj7.tell(), next(obj7))
+        obj7.seek(8)
+        print(next(obj7))
+    print('\n\n\n')
@@ -0,0 +1,183 @@
+'''
+In this module, we split the work of an iterator(see `iterator.py`) over several CPU cores.
+
+PartitionedIterator is a PythonicIterator over the index range [start, stop) of a sequence.
+`split(k)` divides its remaining range into k independent cursors, without copying any item.
+
+parallel_map and parallel_reduce run the partitions in a process pool:
+- The sequence is sent to every worker process only once(when the pool starts; with the 'fork'
+  start method it is not even copied). A MappedFileIterator is re-opened in each worker from its path.
+- Each task only carries an index range, never the items themselves.
+- The results can be merged in order(ordered=True) or as soon as each partition is done(ordered=False).
+
+The functions given to parallel_map/parallel_reduce must be picklable(defined at module level).
+'''
+
+
+import functools
+import multiprocessing
+import os
+
+from iterator import MappedFileIterator, PythonicIterator, _buffer_chunk
+
+
+# This class is a PythonicIterator that only walks the items between `start` and `stop`.
+class PartitionedIterator(PythonicIterator):
+    def __init__(self, items: object, start: int=0, stop: int=None) -> None:
+        super().__init__(items)
+        length = len(items)
+        self.stop = length if stop is None else min(stop, length)
+        if not 0 <= start <= self.stop:
+            raise ValueError(f'Invalid range: start={start}, stop={self.stop}.')
+        self.start = start
+        self.index = start
+
+    def __next__(self):
+        index = self.index
+        if index < self.stop:
+            self.index = index + 1
+            return self.items[index]
+        raise StopIteration('The iterations has stopped.')
+
+    def next_chunk(self, n: int) -> object:
+        if n < 1:
+            raise ValueError('The chunk size must be at least 1.')
+        start = self.index
+        if start >= self.stop:
+            raise StopIteration('The iterations has stopped.')
+        self.index = min(start + n, self.stop)
+        if self._buffer:
+            return _buffer_chunk(self.items, start, self.index)
+        return self.items[start:self.index]
+
+    def has_next(self) -> bool:
+        return self.index < self.stop
+
+    def reset(self) -> None:
+        self.index = self.start
+
+    # Positions are indexes of the whole sequence, between `start` and `stop`.
+    def seek(self, pos: int) -> None:
+        if not self.start <= pos <= self.stop:
+            raise IndexError(f'The position {pos} is out of range.')
+        self.index = pos
+
+    def __len__(self) -> int:
+        # The number of items left.
+        return self.stop - self.index
+
+    # Split the remaining items into k cursors over contiguous ranges of(almost) the same size.
+    def split(self, k: int) -> list:
+        if k < 1:
+            raise ValueError('k must be at least 1.')
+        remaining = self.stop - self.index
+        size, extra = divmod(remaining, k)
+        parts = []
+        start = self.index
+        for part in range(k):
+            stop = start + size + (1 if part < extra else 0)
+            parts.append(PartitionedIterator(self.items, start, stop))
+            start = stop
+        return parts
+
+
+# Return a PartitionedIterator over the remaining items of any PythonicIterator(or a sequence).
+def partitioned(source: object) -> PartitionedIterator:
+    if isinstance(source, PartitionedIterator):
+        return source
+    if isinstance(source, PythonicIterator):
+        return PartitionedIterator(source.items, source.index)
+    return PartitionedIterator(source)
+
+
+# The items of the current worker process. They are set once, when the worker starts.
+_worker_items = None
+
+
+def _init_worker(source: tuple) -> None:
+    global _worker_items
+    kind, value = source
+    if kind == 'mmap': # Map the file again in this process instead of sending its content.
+        _worker_items = MappedFileIterator(*value).items
+    else:
+        _worker_items = value
+
+
+def _map_range(task: tuple) -> tuple:
+    function, start, stop = task
+    items = _worker_items
+    return start, [function(items[index]) for index in range(start, stop)]
+
+
+def _reduce_range(task: tuple) -> tuple:
+    function, map_function, initial, start, stop = task
+    items = _worker_items
+    values = (items[index] for index in range(start, stop))
+    if map_function is not None:
+        values = map(map_function, values)
+    return start, functools.reduce(function, values, initial)
+
+
+# Describe the items so a worker process can get them: a MappedFileIterator by its path, anything else as it is.
+def _source_of(source: object) -> tuple:
+    if isinstance(source, MappedFileIterator):
+        return 'mmap', (source.path, source.item_format)
+    return 'items', source.items if isinstance(source, PythonicIterator) else source
+
+
+def _partitions(iterator: PartitionedIterator, processes: int, partitions: int) -> list:
+    return [part for part in iterator.split(partitions or processes * 4) if part.start < part.stop]
+
+
+# Apply `function` to every remaining item in a process pool and return the results as a list.
+# With ordered=False the partitions are merged in the order they finish(faster when they take different times).
+# The iterator is moved to its end.
+def parallel_map(function: object, source: object, processes: int=None, partitions: int=None, ordered: bool=True) -> list:
+    processes = processes or os.cpu_count() or 1
+    iterator = partitioned(source)
+    tasks = [(function, part.start, part.stop) for part in _partitions(iterator, processes, partitions)]
+    results = []
+    if tasks:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(_source_of(source),)) as pool:
+            runner = pool.imap if ordered else pool.imap_unordered
+            for _, values in runner(_map_range, tasks):
+                results.extend(values)
+    if isinstance(source, PythonicIterator):
+        source.index = iterator.stop
+    return results
+
+
+# Reduce the remaining items with `function` in a process pool. Each partition is reduced in a worker,
+# then the partial results are reduced in this process. `function` must be associative and `initial`
+# must be its identity value(e.g. 0 for addition). With ordered=False `function` must also be commutative.
+# `map_function`(optional) is applied to every item before the reduction. The iterator is moved to its end.
+def parallel_reduce(function: object, source: object, initial: object, map_function: object=None, processes: int=None, partitions: int=None, ordered: bool=True) -> object:
+    processes = processes or os.cpu_count() or 1
+    iterator = partitioned(source)
+    tasks = [(function, map_function, initial, part.start, part.stop) for part in _partitions(iterator, processes, partitions)]
+    result = initial
+    if tasks:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(_source_of(source),)) as pool:
+            runner = pool.imap if ordered else pool.imap_unordered
+            for _, partial in runner(_reduce_range, tasks):
+                result = function(result, partial)
+    if isinstance(source, PythonicIterator):
+        source.index = iterator.stop
+    return result
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+def _add(a: int, b: int) -> int:
+    return a + b
+
+
+# A short example: square a million numbers and sum them on every CPU core.
+if __name__ == '__main__':
+    obj = PartitionedIterator(range(1_000_000))
+    print([(part.start, part.stop) for part in obj.split(4)])
+    print(parallel_map(_square, PartitionedIterator(range(10)), processes=2))
+    print(parallel_reduce(_add, obj, 0, map_function=_square))
+    print(sum(x * x for x in range(1_000_000)))
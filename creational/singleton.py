@@ -6,26 +6,330 @@ The Singleton Method Design Pattern ensures a class has only one instance and pr
 access point to it.
 
 You can read more about this Design Pattern from this url: https://www.geeksforgeeks.org/system-design/singleton-design-pattern/ 
+
+`SingletonMeta` can make any class a thread-safe singleton: write `class Config(metaclass=SingletonMeta)`.
+`LazySingleton` and `AsyncLazySingleton` create their instance only on the first access(the second
+one for costly resources that are initialized with `async`), and `WarmupRegistry` can create selected
+singletons in the background after the program has started. Importing this module does no work.
+
+There are scoped variants too: `ProcessSingleton` creates a new instance in a forked child process
+instead of using the parent's one, `ThreadLocalSingleton` has one instance per thread(no sharing, no
+contention) and `ContextSingleton` has one instance per `contextvars` context, e.g. per asyncio task.
+
+`customized_print` remembers its recent results in a bounded LRU cache(`FormatCache`, optionally with
+a time to live), because the same few banners are printed again and again.
 '''
 
 
-from threading import Lock
+from contextvars import ContextVar
+from functools import lru_cache
+import os
+import re
+from threading import Lock, RLock, Thread, local
+import time
+from weakref import WeakSet
+
+
+# The objects whose lock must be replaced in a forked child(another thread may have held it during the fork,
+# and that thread does not exist in the child, so the lock would never be released).
+_fork_locked = WeakSet()
+_process_singletons = WeakSet()
+
+
+def _after_fork_in_child() -> None:
+    for owner in list(_fork_locked):
+        owner._singleton_lock = RLock()
+    for singleton in list(_process_singletons):
+        singleton._instance = _MISSING
+
+
+if hasattr(os, 'register_at_fork'): # Not available on Windows, where there is no fork.
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+# A metaclass that makes each class using it a singleton. Every class gets its own lock and its own
+# `_instance`. Once the instance exists, calling the class only reads `cls._instance`(no lock at all).
+# Before that, the callers are serialized by the class lock and the instance is checked again inside it
+# (double-checked locking), so only one of them creates the instance.
+class SingletonMeta(type):
+    def __init__(cls, name: str, bases: tuple, namespace: dict) -> None:
+        super().__init__(name, bases, namespace)
+        cls._instance = None
+        cls._singleton_lock = RLock() # Reentrant, so `__init__` may use the class again.
+        _fork_locked.add(cls)
+
+    def __call__(cls, *args, **kwargs):
+        instance = cls._instance # The lock-free fast path.
+        if instance is None:
+            with cls._singleton_lock:
+                instance = cls._instance
+                if instance is None: # Nobody created it while we were waiting for the lock.
+                    instance = super().__call__(*args, **kwargs)
+                    cls._instance = instance
+        return instance
+
+    # Forget the instance, so the next call creates a new one. Returns the old instance(or None).
+    def reset_instance(cls) -> object:
+        with cls._singleton_lock:
+            instance, cls._instance = cls._instance, None
+            return instance
+
+
+_MISSING = object() # The value of a lazy singleton that is not created yet(None can be a valid instance).
+
+
+# A singleton that is created by `factory()` on the first `get()`, with the same double-checked locking
+# as `SingletonMeta`. Creating the object does nothing, so it is free to define at module level.
+class LazySingleton:
+    def __init__(self, factory: object) -> None:
+        self.factory = factory
+        self._instance = _MISSING
+        self._singleton_lock = RLock()
+        _fork_locked.add(self)
+
+    def get(self) -> object:
+        instance = self._instance
+        if instance is _MISSING:
+            with self._singleton_lock:
+                instance = self._instance
+                if instance is _MISSING:
+                    instance = self._instance = self.factory()
+        return instance
+
+    @property
+    def created(self) -> bool:
+        return self._instance is not _MISSING
+
+    # Forget the instance, so the next `get()` creates a new one. Returns the old instance(or None).
+    def reset(self) -> object:
+        with self._singleton_lock:
+            instance, self._instance = self._instance, _MISSING
+        return None if instance is _MISSING else instance
+
+    # Like `SingletonDesignPattern.close()`: forget the instance, or raise if there is none.
+    def close(self) -> None:
+        with self._singleton_lock:
+            if self._instance is _MISSING:
+                raise RuntimeError('This object has already closed.')
+            self._instance = _MISSING
+
+
+# A `LazySingleton` for one process. A forked child does not use the instance it inherited from the parent
+# (with its state, locks and handles), it creates its own one on the first `get()`.
+class ProcessSingleton(LazySingleton):
+    def __init__(self, factory: object) -> None:
+        super().__init__(factory)
+        _process_singletons.add(self)
+
+
+# One instance per thread. Each thread creates its own instance on its first `get()`, so there is no lock
+# and nothing is shared between the threads.
+class ThreadLocalSingleton:
+    def __init__(self, factory: object) -> None:
+        self.factory = factory
+        self._local = local()
+
+    def get(self) -> object:
+        try:
+            return self._local.instance
+        except AttributeError:
+            instance = self._local.instance = self.factory()
+            return instance
+
+    @property
+    def created(self) -> bool:
+        return hasattr(self._local, 'instance')
+
+    # Close the instance of the current thread only.
+    def close(self) -> None:
+        try:
+            del self._local.instance
+        except AttributeError:
+            raise RuntimeError('This object has already closed.') from None
+
+
+# One instance per `contextvars` context. Every asyncio task runs in a copy of the context it was created in,
+# so a task that calls `get()` first gets its own instance, and an instance created before the tasks is shared.
+class ContextSingleton:
+    def __init__(self, factory: object, name: str='context_singleton') -> None:
+        self.factory = factory
+        self._variable = ContextVar(name)
+
+    def get(self) -> object:
+        instance = self._variable.get(_MISSING)
+        if instance is _MISSING:
+            instance = self.factory()
+            self._variable.set(instance)
+        return instance
+
+    @property
+    def created(self) -> bool:
+        return self._variable.get(_MISSING) is not _MISSING
+
+    # Close the instance of the current context only.
+    def close(self) -> None:
+        if self._variable.get(_MISSING) is _MISSING:
+            raise RuntimeError('This object has already closed.')
+        self._variable.set(_MISSING)
+
+
+# The same as `LazySingleton` for an `async` factory(e.g. a connection that must be opened).
+# The callers that arrive while the factory is running wait for the same task instead of starting another one.
+# If the factory raises, every waiting caller gets the error and the next `get()` tries again.
+class AsyncLazySingleton:
+    def __init__(self, factory: object) -> None:
+        self.factory = factory
+        self._instance = _MISSING
+        self._task = None
+
+    async def get(self) -> object:
+        instance = self._instance
+        if instance is not _MISSING:
+            return instance
+        import asyncio # Imported here, so importing this module does not pay for asyncio.
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._create())
+        # Shielded: a caller that is cancelled while it waits does not cancel the creation for the other callers.
+        return await asyncio.shield(self._task)
+
+    async def _create(self) -> object:
+        try:
+            self._instance = await self.factory()
+            return self._instance
+        finally:
+            self._task = None
+
+    @property
+    def created(self) -> bool:
+        return self._instance is not _MISSING
+
+    def reset(self) -> object:
+        instance, self._instance = self._instance, _MISSING
+        return None if instance is _MISSING else instance
+
+
+# A registry of lazy singletons that should be created before they are needed, so the first request does not
+# pay for them. `warm()` creates them in a background thread and `warm_async()` creates the async ones concurrently.
+class WarmupRegistry:
+    def __init__(self) -> None:
+        self._singletons = {}
+
+    def register(self, name: str, singleton: LazySingleton | AsyncLazySingleton) -> LazySingleton | AsyncLazySingleton:
+        self._singletons[name] = singleton
+        return singleton
+
+    def get(self, name: str) -> LazySingleton | AsyncLazySingleton:
+        return self._singletons[name]
+
+    def _selected(self, names: list | None, kind: type) -> list:
+        names = self._singletons if names is None else names
+        return [self._singletons[name] for name in names if isinstance(self._singletons[name], kind)]
+
+    # Create the selected(by default all) `LazySingleton`s. With `background=True` it returns the daemon
+    # thread that does the work(`join()` it to wait), otherwise it returns None when they are all created.
+    def warm(self, names: list | None=None, background: bool=True) -> Thread | None:
+        singletons = self._selected(names, LazySingleton)
+        def create_all() -> None:
+            for singleton in singletons:
+                singleton.get()
+        if not background:
+            create_all()
+            return None
+        thread = Thread(target=create_all, name='singleton-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    # Create the selected(by default all) `AsyncLazySingleton`s concurrently in the running event loop.
+    async def warm_async(self, names: list | None=None) -> None:
+        import asyncio
+        await asyncio.gather(*(singleton.get() for singleton in self._selected(names, AsyncLazySingleton)))
+
+
+# The registry used by the application(it is empty until singletons are registered).
+warmup_registry = WarmupRegistry()
+
+
+# Matches a letter that follows a character which is neither a space nor a letter(e.g. "2nd", "don't").
+_TITLE_BREAK = re.compile(r'[^ A-Za-z][A-Za-z]')
+
+
+# Capitalize every word of the text(the words are separated by single spaces). For ASCII text where each
+# run of letters starts a word, `str.title()` gives the same result in one pass over the text.
+def capitalize_words(text: str) -> str:
+    if text.isascii() and _TITLE_BREAK.search(text) is None:
+        return text.title()
+    return ' '.join([word.capitalize() for word in text.split(' ')])
+
+
+class CacheStats:
+    def __init__(self, hits: int, misses: int, size: int) -> None:
+        self.hits = hits
+        self.misses = misses
+        self.size = size
+
+    # Every miss stores a result, so the results that are not in the cache anymore were evicted.
+    @property
+    def evictions(self) -> int:
+        return self.misses - self.size
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def __repr__(self) -> str:
+        return (f'CacheStats(hits={self.hits}, misses={self.misses}, size={self.size}, '
+                f'evictions={self.evictions}, hit_rate={self.hit_rate:.3f})')
+
+
+# A bounded LRU cache of `function(key)`, built on `functools.lru_cache`(thread-safe, implemented in C).
+# With a `ttl`(in seconds) the time is cut into windows of `ttl` seconds and the window is part of the key,
+# so a result is never used after the window it was computed in(it is never older than `ttl`).
+# The results of old windows are not used anymore and leave the cache like any least recently used result.
+class FormatCache:
+    def __init__(self, function: object, maxsize: int=1024, ttl: float | None=None, clock: object=time.monotonic) -> None:
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be a positive number of seconds(or None).')
+        self.function = function
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        if ttl is None:
+            self._cached = lru_cache(maxsize)(function)
+        else:
+            self._cached = lru_cache(maxsize)(lambda key, window: function(key))
+
+    # The result of `function(key)`.
+    def get(self, key: object) -> object:
+        if self.ttl is None:
+            return self._cached(key)
+        return self._cached(key, self.clock() // self.ttl)
+
+    @property
+    def stats(self) -> CacheStats:
+        info = self._cached.cache_info()
+        return CacheStats(info.hits, info.misses, info.currsize)
+
+    def __len__(self) -> int:
+        return self._cached.cache_info().currsize
+
+    # Drop every result and reset the statistics.
+    def clear(self) -> None:
+        self._cached.cache_clear()
+
+
+def _banner(text: str) -> str:
+    return f'\n\n{capitalize_words(text)}\n\n'
 
 
 # This is a class that is used to print an important text prettier. This class is using the singleton Design Pattern. 
-class SingletonDesignPattern:
-    _instance = None
+class SingletonDesignPattern(metaclass=SingletonMeta):
     _initialized = False
+    _print_cache = FormatCache(_banner)
 
-    def __new__(cls):
-        lock = Lock()
-        # Using `threading.Lock` will help the class to run correctly when using multithreading.
-        with lock:
-            if cls._instance is None: # If the class has no instance(`cls._instance` will be None).
-                return super().__new__(cls)
-            # If the class has one instance, the new one will be assigned to the first instance.
-            return cls._instance 
-    
+    # `SingletonMeta` calls it only once, when the instance is created.
     def __init__(self):
         if self._initialized is False: # If the object isn't already initialized,
             self.set_obj(self)
@@ -41,21 +345,35 @@ class SingletonDesignPattern:
     # A method to do the main task of the class.
     def customized_print(self, text: str):
         if self._instance and self._initialized: 
-            temp_list = text.split(' ')
-            temp_list = [ i.capitalize() for i in temp_list ]
-            result = ' '.join(temp_list)
-            return f'\n\n{result}\n\n'
+            return self._print_cache.get(text)
+
+    # The same as `customized_print` for many texts at once. Each distinct text is formatted(or looked up) once.
+    def customized_print_many(self, texts: list) -> list | None:
+        if self._instance and self._initialized:
+            get = self._print_cache.get
+            results = {text: get(text) for text in dict.fromkeys(texts)}
+            return [results[text] for text in texts]
+
+    # Replace the cache of `customized_print`(e.g. with another size or a time to live).
+    @classmethod
+    def configure_print_cache(cls, maxsize: int=1024, ttl: float | None=None) -> None:
+        cls._print_cache = FormatCache(_banner, maxsize, ttl)
+
+    @classmethod
+    def print_cache_stats(cls) -> CacheStats:
+        return cls._print_cache.stats
 
     # A method to close the instance.
     # This is a classmethod to be able to access the `cls`.
     @classmethod
     def close(cls):
-        if cls._instance is not None: # If the instance isn't already closed,
-            print(f'\n** Object with id {id(cls._instance)} closed successfully **\n')
-            cls._instance = None
-            cls._initialized = False
-        else: # The instance is already closed.
-            raise RuntimeError('This object has already closed.')
+        with cls._singleton_lock:
+            if cls._instance is not None: # If the instance isn't already closed,
+                print(f'\n** Object with id {id(cls._instance)} closed successfully **\n')
+                cls._instance = None
+                cls._initialized = False
+            else: # The instance is already closed.
+                raise RuntimeError('This object has already closed.')
         
     def __str__(self):
         if self._instance is not None:
@@ -64,11 +382,20 @@ class SingletonDesignPattern:
             return '!! Closed object !!'
     
 
-obj1 = SingletonDesignPattern() # The first object from the class(It's accepted).
-obj2 = SingletonDesignPattern() # The second object from the class(Not accepted, will be `obj1`).
+# Running the example in the main module(importing the module creates nothing and prints nothing).
+if __name__ == '__main__':
+    obj1 = SingletonDesignPattern() # The first object from the class(It's accepted).
+    obj2 = SingletonDesignPattern() # The second object from the class(Not accepted, will be `obj1`).
+
+    print(obj1.customized_print('hello world!')) # Running a method from the class(using the object).
+    print(obj1 is obj2) # This line shows that both `obj1` and `obj2` are exactly the same.
 
-print(obj1.customized_print('hello world!')) # Running a method from the class(using the object).
-print(obj1 is obj2) # This line shows that both `obj1` and `obj2` are exactly the same.
+    obj1.close() # Closing `obj1`.
+    # obj2.close() # If we run the code with this line, we are going to receive a RuntimeError(close method, raise part).
 
-obj1.close() # Closing `obj1`.
-# obj2.close() # If we run the code with this line, we are going to receive a RuntimeError(close method, raise part).
+    # A lazy printer: nothing is created until it is warmed up or used.
+    printer = warmup_registry.register('printer', LazySingleton(SingletonDesignPattern))
+    print(printer.created)
+    warmup_registry.warm(['printer']).join()
+    print(printer.created, printer.get().customized_print('warmed up in the background'))
+    printer.get().close()
@@ -0,0 +1,7 @@
+# The examples are plain modules in their folders(they import each other by name), so the folders go on sys.path.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ('behavioral', 'creational'):
+    sys.path.insert(0, os.path.join(ROOT, folder))
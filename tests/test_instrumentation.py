@@ -0,0 +1,87 @@
+import pytest
+
+from instrumentation import METRICS, Metrics, timed_method
+
+
+class Greeter:
+    def greet(self, name: str) -> str:
+        return f'Hello {name}'
+
+
+def test_patched_methods_are_installed_only_while_enabled() -> None:
+    metrics = Metrics()
+    calls = metrics.counter('greet_total', 'Greetings.', ('method',))
+    seconds = metrics.histogram('greet_seconds', 'Time of one greeting.', ('method',))
+    original = Greeter.__dict__['greet']
+    metrics.patch(Greeter, 'greet', timed_method(metrics, original, calls, seconds, ('greet',)))
+    try:
+        assert Greeter.__dict__['greet'] is original
+        metrics.enable(1.0)
+        assert Greeter.__dict__['greet'] is not original
+        assert Greeter().greet('Ada') == 'Hello Ada'
+        assert calls.value('greet') == 1
+        assert seconds.totals('greet')[0] == 1
+        metrics.disable()
+        assert Greeter.__dict__['greet'] is original
+        Greeter().greet('Bob')
+        assert calls.value('greet') == 1
+    finally:
+        metrics.disable()
+
+
+@pytest.mark.parametrize('sample_rate, expected', [(0.0, 0), (0.25, 25), (0.5, 50), (1.0, 100)])
+def test_sampled_returns_true_for_the_sample_rate_share_of_calls(sample_rate: float, expected: int) -> None:
+    metrics = Metrics()
+    metrics.enable(sample_rate)
+    assert sum(metrics.sampled() for _ in range(100)) == expected
+
+
+def test_enable_rejects_a_rate_outside_0_and_1() -> None:
+    with pytest.raises(ValueError):
+        Metrics().enable(1.5)
+
+
+def test_to_prometheus_exports_counters_and_cumulative_buckets() -> None:
+    metrics = Metrics()
+    metrics.counter('jobs_total', 'Jobs run.', ('queue',)).inc('fast', amount=2)
+    latency = metrics.histogram('job_seconds', 'Time of one job.', buckets=(0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5.0)
+    assert metrics.to_prometheus().splitlines() == [
+        '# HELP jobs_total Jobs run.',
+        '# TYPE jobs_total counter',
+        'jobs_total{queue="fast"} 2',
+        '# HELP job_seconds Time of one job.',
+        '# TYPE job_seconds histogram',
+        'job_seconds_bucket{le="0.1"} 1',
+        'job_seconds_bucket{le="1.0"} 2',
+        'job_seconds_bucket{le="+Inf"} 3',
+        'job_seconds_sum 5.55',
+        'job_seconds_count 3',
+    ]
+    metrics.reset()
+    assert all(line.startswith('#') for line in metrics.to_prometheus().splitlines())
+
+
+def test_a_metric_name_cannot_be_registered_as_two_kinds() -> None:
+    metrics = Metrics()
+    assert metrics.counter('events', 'Events.') is metrics.counter('events', 'Events.')
+    with pytest.raises(ValueError):
+        metrics.histogram('events', 'Events.')
+
+
+def test_the_factories_are_instrumented_by_the_shared_metrics() -> None:
+    from factory_method import CarFactory
+
+    instances = METRICS.counter('factory_instances_total', 'Vehicles created by a factory.', ('factory',))
+    original = CarFactory.__dict__['create_instance']
+    before = instances.value('CarFactory')
+    METRICS.enable(1.0)
+    try:
+        assert CarFactory.__dict__['create_instance'] is not original
+        CarFactory().create_instance()
+        assert instances.value('CarFactory') == before + 1
+    finally:
+        METRICS.disable()
+    assert CarFactory.__dict__['create_instance'] is original
@@ -0,0 +1,71 @@
+import array
+
+import pytest
+
+from iterator import Iterator, PythonicIterator
+from parallel_iterator import PartitionedIterator
+
+
+def test_take_leaves_the_index_after_the_last_item_it_needed() -> None:
+    iterator = PythonicIterator(range(10))
+    assert iterator.map(lambda x: x * 2).take(3).to_list() == [0, 2, 4]
+    assert iterator.index == 3
+    assert iterator.take(0).to_list() == []
+    assert iterator.index == 3
+
+
+def test_batch_then_take_consumes_only_the_taken_batch() -> None:
+    iterator = PythonicIterator(range(10))
+    assert iterator.batch(3).take(1).to_list() == [[0, 1, 2]]
+    assert iterator.index == 3
+    assert iterator.batch(3).to_list() == [[3, 4, 5], [6, 7, 8], [9]]
+
+
+def test_flat_map_then_take_counts_the_item_that_was_used() -> None:
+    iterator = PythonicIterator(range(10))
+    assert iterator.flat_map(lambda x: [x, x]).take(3).to_list() == [0, 0, 1]
+    assert iterator.index == 2
+    iterator = PythonicIterator(range(10))
+    assert iterator.flat_map(lambda x: [x] * 3).take(3).to_list() == [0, 0, 0]
+    assert iterator.index == 1
+
+
+def test_filter_then_take_reads_no_item_after_the_last_one() -> None:
+    iterator = PythonicIterator(range(10))
+    assert iterator.filter(lambda x: x % 2 == 0).take(2).to_list() == [0, 2]
+    assert iterator.index == 3
+
+
+def test_pipeline_of_a_partition_stops_at_its_end() -> None:
+    iterator = PartitionedIterator(list(range(10)), 2, 6)
+    assert iterator.window(2).map(sum).to_list() == [5, 7, 9]
+    assert iterator.index == 6
+
+
+def test_pipeline_starts_at_the_index_after_seek_and_next_chunk() -> None:
+    iterator = PythonicIterator(list(range(100)))
+    iterator.seek(90)
+    assert iterator.take(3).to_list() == [90, 91, 92]
+    iterator.next_chunk(5)
+    assert iterator.map(int).to_list() == [98, 99]
+    assert iterator.index == 100
+
+
+def test_next_chunk_does_not_keep_the_buffer_exported() -> None:
+    items = bytearray(b'abcdef')
+    iterator = Iterator(items)
+    chunk = iterator.next_chunk(4)
+    assert bytes(chunk) == b'abcd'
+    chunk.release()
+    items.extend(b'gh') # Fails with BufferError while a view of the items exists.
+    assert bytes(iterator.next_chunk(10)) == b'efgh'
+    with pytest.raises(StopIteration):
+        iterator.next_chunk(1)
+
+
+def test_next_chunk_of_a_2d_buffer_returns_rows() -> None:
+    rows = memoryview(array.array('i', range(12))).cast('B').cast('i', (3, 4))
+    iterator = PythonicIterator(rows)
+    assert iterator.next_chunk(2).tolist() == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert iterator.next_chunk(2).tolist() == [[8, 9, 10, 11]]
+    assert not iterator.has_next()
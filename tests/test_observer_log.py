@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+
+from observer import Observer
+from observer_log import ChannelLog, LoggedChannel
+
+MESSAGES = [f'message {i}' + ('\nwith a newline' if i % 97 == 0 else '') for i in range(3000)]
+
+
+def open_log(directory: object) -> ChannelLog:
+    return ChannelLog(str(directory), segment_bytes=20_000, index_interval=512, batch_messages=100)
+
+
+def replayed(log: ChannelLog, offset: int=0, **kwargs) -> list:
+    return [message for _, batch in log.replay(offset, **kwargs) for message in batch]
+
+
+def write(directory: object) -> None:
+    with open_log(directory) as log:
+        for message in MESSAGES[:1000]:
+            log.append(message)
+        log.append_many(MESSAGES[1000:])
+
+
+def test_replay_from_any_offset(tmp_path) -> None:
+    write(tmp_path)
+    with open_log(tmp_path) as log:
+        assert log.end_offset == len(MESSAGES)
+        assert log.segment_count > 1
+        for offset in (0, 1, 99, 100, 1500, 2999, 3000):
+            assert replayed(log, offset) == MESSAGES[offset:]
+        batches = list(log.replay(0, batch_size=7))
+        assert all(later[0] - earlier[0] == len(earlier[1]) for earlier, later in zip(batches, batches[1:]))
+
+
+def segment_files(directory: object, suffix: str) -> list:
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(suffix))
+
+
+def test_recovery_truncates_a_torn_tail(tmp_path) -> None:
+    write(tmp_path)
+    last = segment_files(tmp_path, '.log')[-1]
+    size = os.path.getsize(last)
+    with open(last, 'ab') as segment_file:
+        segment_file.write(b'\x01' * 40) # Half of a record, as after a crash during a write.
+    with open_log(tmp_path) as log:
+        assert os.path.getsize(last) == size
+        assert log.end_offset == len(MESSAGES)
+        assert replayed(log) == MESSAGES
+        log.append('after the crash')
+        assert replayed(log, len(MESSAGES)) == ['after the crash']
+
+
+def test_recovery_rebuilds_a_missing_index(tmp_path) -> None:
+    write(tmp_path)
+    for index_path in segment_files(tmp_path, '.index'):
+        os.remove(index_path)
+    with open_log(tmp_path) as log:
+        assert replayed(log, 1234) == MESSAGES[1234:]
+
+
+def test_offset_at_a_timestamp(tmp_path) -> None:
+    with open_log(tmp_path) as log:
+        log.append_many(MESSAGES[:10])
+        time.sleep(0.01)
+        middle = time.time()
+        time.sleep(0.01)
+        log.append_many(MESSAGES[10:20])
+        assert log.offset_at(0) == 0
+        assert log.offset_at(middle) == 10
+        assert log.offset_at(middle + 3600) == 20
+
+
+class Collector(Observer):
+    def __init__(self) -> None:
+        self.messages = []
+
+    def channel_updated(self, channel_name: str, message: str) -> None:
+        self.messages.append(message)
+
+
+def test_subscribe_replays_then_follows_without_gaps(tmp_path) -> None:
+    with ChannelLog(str(tmp_path), segment_bytes=1 << 16, batch_messages=64) as log:
+        channel = LoggedChannel('numbers', log)
+        for i in range(5000):
+            channel.send_message(str(i))
+        stop = threading.Event()
+        def send() -> None:
+            i = 5000
+            while not stop.is_set():
+                channel.send_message(str(i))
+                i += 1
+        sender = threading.Thread(target=send)
+        sender.start()
+        collector = Collector()
+        try:
+            channel.subscribe(collector, offset=10)
+            while len(collector.messages) < 6000:
+                stop.wait(0.001)
+        finally:
+            stop.set()
+            sender.join()
+        assert collector.messages == [str(i) for i in range(10, 10 + len(collector.messages))]
+        assert int(collector.messages[-1]) == log.end_offset - 1
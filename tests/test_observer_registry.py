@@ -0,0 +1,40 @@
+import pytest
+
+from observer import ChannelRegistry, Observer
+
+
+class Recorder(Observer):
+    def __init__(self) -> None:
+        self.messages = []
+
+    def channel_updated(self, channel_name: str, message: str) -> None:
+        self.messages.append((channel_name, message))
+
+
+def test_resolve_matches_exact_and_wildcard_patterns() -> None:
+    registry = ChannelRegistry()
+    exact, single, multi = Recorder(), Recorder(), Recorder()
+    registry.subscribe(exact, 'sports.f1')
+    registry.subscribe(single, 'sports.*')
+    registry.subscribe(multi, 'sports.#')
+    assert set(registry.resolve('sports.f1')) == {exact, single, multi}
+    assert set(registry.resolve('sports')) == {multi}
+    registry.publish('sports.tennis', 'final')
+    assert single.messages == multi.messages == [('sports.tennis', 'final')]
+    assert exact.messages == []
+
+
+def test_the_resolved_cache_keeps_the_most_recent_topics() -> None:
+    registry = ChannelRegistry(cache_size=2)
+    registry.subscribe(Recorder(), 'news.#')
+    for topic in ('news.a', 'news.b', 'news.a', 'news.c'):
+        registry.resolve(topic)
+    assert list(registry._resolved) == ['news.a', 'news.c']
+
+
+@pytest.mark.parametrize('topic', ['news.*', 'news.#', '#', 'news.a*'])
+def test_a_published_topic_cannot_contain_wildcards(topic: str) -> None:
+    registry = ChannelRegistry()
+    registry.subscribe(Recorder(), '#')
+    with pytest.raises(ValueError):
+        registry.publish(topic, 'message')
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from observer import Channel, Observer
+from observer_transport import MESSAGE, ChannelClient, ChannelServer, RingFollower, RingSubscriber, SharedMemoryRing, encode_frame
+
+
+class Collector(Observer):
+    def __init__(self) -> None:
+        self.messages = []
+
+    def channel_updated(self, channel_name: str, message: str) -> None:
+        self.messages.append((channel_name, message))
+
+
+def wait_for(condition: object, timeout: float=5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = ChannelServer(str(tmp_path / 'channels.sock'))
+    for name in ('news', 'sports'):
+        server.add_channel(Channel(name, []))
+    yield server
+    server.close()
+
+
+def test_subscribe_with_a_reader_thread_while_messages_arrive(server) -> None:
+    client = ChannelClient(server.path)
+    client.start()
+    try:
+        news = Collector()
+        client.subscribe('news', news)
+        sender = threading.Thread(target=lambda: [server.channels['news'].send_message(str(i)) for i in range(2000)])
+        sender.start()
+        sports = Collector()
+        client.subscribe('sports', sports) # Answered while the reader thread receives the news.
+        second = Collector()
+        client.subscribe('news', second)
+        with pytest.raises(KeyError):
+            client.subscribe('weather', Collector())
+        sender.join()
+        server.channels['sports'].send_message('goal')
+        server.flush()
+        assert wait_for(lambda: len(news.messages) == 2000 and sports.messages)
+        assert [message for _, message in news.messages] == [str(i) for i in range(2000)]
+        assert sports.messages == [('sports', 'goal')]
+        with pytest.raises(RuntimeError):
+            client.poll(0) # Only the reader thread receives after start().
+    finally:
+        client.close()
+
+
+def test_subscribe_without_a_reader_thread_polls_by_itself(server) -> None:
+    client = ChannelClient(server.path)
+    try:
+        news = Collector()
+        client.subscribe('news', news)
+        server.channels['news'].send_message('hello')
+        server.flush()
+        assert wait_for(lambda: client.poll(0.05) or news.messages)
+        assert news.messages == [('news', 'hello')]
+        client.unsubscribe('news', news)
+        assert wait_for(lambda: not server.channels['news'].followers)
+    finally:
+        client.close()
+
+
+def test_a_disconnected_client_is_removed_from_its_channels(server) -> None:
+    client = ChannelClient(server.path)
+    client.subscribe('news', Collector())
+    client.subscribe('sports', Collector())
+    assert wait_for(lambda: len(server.followers) == 1)
+    client.close()
+    assert wait_for(lambda: not server.followers)
+    assert not server.channels['news'].followers and not server.channels['sports'].followers
+    server.channels['news'].send_message('nobody listens') # Nothing is sent to the closed connection.
+    server.flush()
+
+
+def test_ring_write_times_out_while_the_ring_is_full() -> None:
+    ring = SharedMemoryRing(size=1024)
+    try:
+        frame = encode_frame(MESSAGE, b'ticks', b'x' * 100)
+        written = 0
+        while ring.write(frame, timeout=0.05):
+            written += 1
+        assert 0 < written < 1024 // len(frame) + 1
+        assert len(ring.read()) == written # Reading frees the ring.
+        assert ring.write(frame, timeout=0.05)
+        assert ring.read() == [(MESSAGE, b'ticks', b'x' * 100)]
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_ring_messages_reach_the_subscriber() -> None:
+    ring = SharedMemoryRing(size=1 << 16)
+    subscriber = RingSubscriber(ring.name)
+    try:
+        follower = RingFollower(ring, max_buffer=1 << 14) # Small buffer: the publisher waits for the writer.
+        channel = Channel('ticks', [follower])
+        collector = Collector()
+        subscriber.subscribe('ticks', collector)
+        subscriber.start()
+        for i in range(20_000):
+            channel.send_message(f'{i:040d}')
+        follower.close()
+        assert wait_for(lambda: len(collector.messages) == 20_000)
+        assert follower.sent == 20_000 and follower.dropped == 0
+    finally:
+        subscriber.close()
+        ring.close()
+        ring.unlink()
+
+
+def test_ring_follower_gives_up_when_nobody_reads() -> None:
+    ring = SharedMemoryRing(size=1 << 16)
+    try:
+        follower = RingFollower(ring, write_timeout=0.1)
+        channel = Channel('ticks', [follower])
+        for i in range(20_000):
+            channel.send_message(f'{i:040d}')
+        start = time.monotonic()
+        follower.close()
+        assert time.monotonic() - start < 5
+        assert follower.disconnected
+        assert follower.sent + follower.dropped == 20_000 and follower.dropped > 0
+    finally:
+        ring.close()
+        ring.unlink()
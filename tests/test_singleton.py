@@ -0,0 +1,155 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from singleton import AsyncLazySingleton, FormatCache, LazySingleton, SingletonMeta, WarmupRegistry
+
+CREATIONAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'creational')
+
+
+class SlowSingleton(metaclass=SingletonMeta):
+    created = 0
+
+    def __init__(self) -> None:
+        time.sleep(0.0001) # Widens the race between the threads.
+        type(self).created += 1
+
+
+def test_concurrent_first_calls_create_one_instance() -> None:
+    threads, rounds = 32, 20
+    for _ in range(rounds):
+        SlowSingleton.reset_instance()
+        SlowSingleton.created = 0
+        barrier = threading.Barrier(threads)
+        instances = []
+        def worker() -> None:
+            barrier.wait()
+            instances.append(SlowSingleton())
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        assert SlowSingleton.created == 1
+        assert len({id(instance) for instance in instances}) == 1
+
+
+class Base(metaclass=SingletonMeta):
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 'base'
+
+
+class Child(Base):
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.value += '+child'
+
+
+def test_subclasses_have_their_own_instance_and_keep_super_and_slots() -> None:
+    assert Child().value == 'base+child'
+    assert Base() is not Child()
+    assert Child() is Child()
+    assert not hasattr(Child(), '__dict__')
+
+
+@pytest.mark.parametrize('ttl', [0, -1.0])
+def test_format_cache_rejects_a_non_positive_ttl(ttl: float) -> None:
+    with pytest.raises(ValueError):
+        FormatCache(str.upper, ttl=ttl)
+
+
+def test_format_cache_ttl_windows() -> None:
+    now = [0.0]
+    cache = FormatCache(lambda key: (key, now[0]), ttl=10, clock=lambda: now[0])
+    assert cache.get('a') == ('a', 0.0)
+    now[0] = 5.0
+    assert cache.get('a') == ('a', 0.0)
+    now[0] = 10.0
+    assert cache.get('a') == ('a', 10.0)
+    assert cache.stats.hits == 1
+
+
+def test_a_cancelled_caller_does_not_cancel_the_async_creation() -> None:
+    async def scenario() -> tuple:
+        started = asyncio.Event()
+        async def connect() -> str:
+            started.set()
+            await asyncio.sleep(0.01)
+            return 'connection'
+        singleton = AsyncLazySingleton(connect)
+        first = asyncio.ensure_future(singleton.get())
+        second = asyncio.ensure_future(singleton.get())
+        await started.wait()
+        first.cancel()
+        return await second, first.cancelled(), singleton.created
+    assert asyncio.run(scenario()) == ('connection', True, True)
+
+
+def test_importing_the_modules_prints_nothing_and_creates_nothing() -> None:
+    # A new interpreter, so the modules are really imported(not taken from this process' sys.modules).
+    code = (
+        'import sys\n'
+        'import iterator, singleton\n'
+        'assert singleton.SingletonDesignPattern._instance is None\n'
+        'assert singleton.warmup_registry._singletons == {}\n'
+        "assert 'asyncio' not in sys.modules\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=CREATIONAL, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == result.stderr == ''
+
+
+def test_concurrent_async_gets_create_one_instance() -> None:
+    created = []
+    async def connect() -> object:
+        await asyncio.sleep(0.01)
+        created.append(object())
+        return created[-1]
+    async def scenario() -> list:
+        singleton = AsyncLazySingleton(connect)
+        return await asyncio.gather(*(singleton.get() for _ in range(10)))
+    instances = asyncio.run(scenario())
+    assert len(created) == 1
+    assert all(instance is created[0] for instance in instances)
+
+
+def test_a_failed_async_creation_is_retried_by_the_next_get() -> None:
+    attempts = []
+    async def connect() -> str:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('unreachable')
+        return 'connection'
+    async def scenario() -> tuple:
+        singleton = AsyncLazySingleton(connect)
+        with pytest.raises(ConnectionError):
+            await singleton.get()
+        created_after_failure = singleton.created
+        return created_after_failure, await singleton.get(), singleton.created
+    assert asyncio.run(scenario()) == (False, 'connection', True)
+    assert len(attempts) == 2
+
+
+def test_warmup_registry_creates_the_selected_singletons() -> None:
+    async def connect() -> str:
+        return 'connection'
+    registry = WarmupRegistry()
+    config = registry.register('config', LazySingleton(dict))
+    cache = registry.register('cache', LazySingleton(list))
+    connection = registry.register('connection', AsyncLazySingleton(connect))
+    registry.warm(['config']).join()
+    assert (config.created, cache.created) == (True, False)
+    assert registry.warm(background=False) is None
+    assert cache.created and not connection.created
+    asyncio.run(registry.warm_async())
+    assert connection.created
+    assert registry.get('config') is config
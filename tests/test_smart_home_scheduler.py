@@ -0,0 +1,86 @@
+import time
+
+from smart_home_scheduler import Scheduler, SimulatedClock
+
+START = time.mktime((2025, 1, 1, 12, 0, 0, 0, 0, -1))
+
+
+def make_scheduler() -> tuple:
+    clock = SimulatedClock(START)
+    return clock, Scheduler(clock)
+
+
+def test_debounce_runs_the_last_call_after_a_quiet_window() -> None:
+    clock, scheduler = make_scheduler()
+    calls = []
+    for i in range(5):
+        scheduler.debounce('ac', 10, calls.append, i)
+        clock.advance(3)
+    scheduler.run_until(clock.time() + 5)
+    assert calls == []
+    scheduler.run_until(clock.time() + 10)
+    assert calls == [4]
+    assert scheduler.stats.debounced == 4
+    scheduler.debounce('ac', 10, calls.append, 9)
+    scheduler.run_until(clock.time() + 11)
+    assert calls == [4, 9]
+
+
+def test_debounce_keys_are_independent() -> None:
+    clock, scheduler = make_scheduler()
+    calls = []
+    scheduler.debounce('ac', 10, calls.append, 'ac')
+    scheduler.debounce('lights', 10, calls.append, 'lights')
+    scheduler.run_until(clock.time() + 10)
+    assert sorted(calls) == ['ac', 'lights']
+
+
+def test_throttle_runs_at_most_one_call_per_window() -> None:
+    clock, scheduler = make_scheduler()
+    calls = []
+    accepted = []
+    for i in range(10):
+        accepted.append(scheduler.throttle('ac', 5, calls.append, i))
+        clock.advance(2)
+    assert calls == [0, 3, 6, 9]
+    assert accepted.count(True) == 4
+    assert scheduler.stats.throttled == 6
+
+
+def test_jobs_run_in_deadline_order_and_failures_are_counted() -> None:
+    clock, scheduler = make_scheduler()
+    order = []
+    scheduler.call_at(START + 5, order.append, 'b')
+    scheduler.call_at(START + 1, order.append, 'a')
+    scheduler.call_at(START + 5, order.append, 'c')
+    scheduler.call_later(3, lambda: 1 / 0)
+    assert scheduler.run_until(START + 10) == 4
+    assert order == ['a', 'b', 'c']
+    assert scheduler.stats.failed == 1
+
+
+def test_an_interval_job_skips_the_runs_it_missed() -> None:
+    clock, scheduler = make_scheduler()
+    deadlines = []
+    def slow() -> None:
+        deadlines.append(job.when)
+        clock.advance(25) # Longer than the interval.
+    job = scheduler.every(10, slow)
+    scheduler.run_until(clock.time() + 100)
+    assert len(set(deadlines)) == len(deadlines) < 6
+    assert all((deadline - deadlines[0]) % 10 == 0 for deadline in deadlines)
+    job.cancel()
+    runs = len(deadlines)
+    scheduler.run_until(clock.time() + 100)
+    assert len(deadlines) == runs
+
+
+def test_a_cancelled_debounced_job_does_not_block_its_key() -> None:
+    clock, scheduler = make_scheduler()
+    calls = []
+    scheduler.debounce('ac', 10, calls.append, 'first').cancel()
+    assert 'ac' not in scheduler._debounced
+    scheduler.debounce('ac', 10, calls.append, 'second')
+    scheduler.run_until(clock.time() + 10)
+    assert calls == ['second']
+    assert not scheduler._debounced